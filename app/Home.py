@@ -1,7 +1,20 @@
 # app/Home.py
 
+import sys
+from pathlib import Path
+
+# Add project root to Python path for Streamlit Cloud
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
 import streamlit as st
 
+from src.cache import cache_stats
+from src.figure_cache import figure_cache_stats
+from src.shared_cache import get_backend
+from src.warmup import start_warmup
+
 st.set_page_config(
     page_title="Bradford Weather Analytics",
     page_icon="🌦️",
@@ -12,7 +25,8 @@ st.title("🌦️ Bradford Weather Analytics Dashboard")
 st.markdown("""
 Welcome to the **Bradford Weather Analytics** dashboard.
 
-Use the navigation on the left to explore:
+Every page shows one station of the network; pick it in the sidebar (the
+choice is kept when switching pages). Use the navigation on the left to explore:
 
 1. **Overview** – high-level KPIs & calendar view  
 2. **Time Series Explorer** – zoom into specific periods & variables  
@@ -20,4 +34,56 @@ Use the navigation on the left to explore:
 4. **Dimensionality Reduction** – PCA, t-SNE, UMAP embeddings  
 5. **Weather Regimes** – discovered clusters of typical weather days  
 6. **Extreme Events** – storms, heavy rain, strong wind episodes  
+7. **Trends** – rolling averages, LOESS and multi-year changes  
 """)
+
+# Nạp trước dataset dùng chung trong thread nền (một lần mỗi process)
+warmup = start_warmup()
+
+@st.fragment(run_every=1)
+def warmup_progress():
+    if not warmup.running:
+        st.rerun()  # vẽ lại trạng thái cuối, không poll nữa
+    st.progress(
+        warmup.progress(),
+        text=f"Warming up data caches… {warmup.elapsed:.1f}s",
+    )
+
+if warmup.running:
+    warmup_progress()
+elif warmup.state == "done":
+    st.caption(f"✅ Data caches warmed up in {warmup.elapsed:.1f}s.")
+else:
+    st.caption(
+        f"⚠️ Cache warm-up stopped after {warmup.elapsed:.1f}s "
+        f"(budget {warmup.budget_s:.0f}s); remaining data loads on first view."
+    )
+
+with st.expander("Data cache statistics"):
+    st.caption("Warm-up steps")
+    st.dataframe(warmup.results(), hide_index=True)
+    stats = cache_stats()
+    if stats.empty:
+        st.caption("No pages have loaded data in this process yet.")
+    else:
+        st.dataframe(
+            stats.assign(
+                mb=stats["bytes"] / 1024 ** 2,
+                budget_mb=stats["budget"] / 1024 ** 2,
+            ).drop(columns=["bytes", "budget"]),
+            hide_index=True,
+        )
+    fig_stats = figure_cache_stats()
+    if not fig_stats.empty:
+        st.caption("Rendered figures (keyed by dataset version and widget values)")
+        st.dataframe(
+            fig_stats.assign(mb=fig_stats["bytes"] / 1024 ** 2).drop(columns=["bytes", "budget"]),
+            hide_index=True,
+        )
+    disk_stats = get_backend().stats()
+    if not disk_stats.empty:
+        st.caption("Shared on-disk cache (all replicas on this host)")
+        st.dataframe(
+            disk_stats.assign(mb=disk_stats["bytes"] / 1024 ** 2).drop(columns=["bytes"]),
+            hide_index=True,
+        )
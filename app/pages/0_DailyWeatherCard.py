@@ -11,9 +11,13 @@ if str(project_root) not in sys.path:
 import streamlit as st
 import pandas as pd
 from sqlalchemy import text
-from datetime import timedelta
 
 from src.db_utils import get_engine
+from src.cache import bounded_cache
+from src.loaders import load_daily
+from src.constants import CONDITIONS, ANALOG_K
+from src.analogs import get_analog_index
+from src.station_picker import select_station
 
 st.set_page_config(
     page_title="Daily Weather Card",
@@ -106,27 +110,31 @@ CARD_CSS = """
 st.markdown(CARD_CSS, unsafe_allow_html=True)
 
 
-@st.cache_data(show_spinner=False)
-def load_daily():
-    engine = get_engine()
-    df = pd.read_sql("SELECT * FROM weather_daily ORDER BY date;", engine, parse_dates=["date"])
-    return df
-
+@bounded_cache()
+def load_analog_index(station_id, space="features"):
+    """KD-tree analog index của dataset hiện tại (persist trong EMBEDDINGS_DIR)."""
+    return get_analog_index(load_daily(station_id), space, station_id)
 
-def classify_condition(row) -> tuple[str, str]:
-    rain = row.get("total_rain", 0) or 0
-    solar = row.get("mean_solar", 0) or 0
-    wind = row.get("mean_wind_speed", 0) or 0
 
-    if rain > 10:
-        return "🌧️", "Heavy Rain"
-    if rain > 0.5:
-        return "🌦️", "Rain Showers"
-    if solar > 250 and rain == 0:
-        return "☀️", "Clear Sky"
-    if wind > 8:
-        return "💨", "Windy"
-    return "⛅", "Partly Cloudy"
+@bounded_cache()
+def load_forecast(station_id, issue_date):
+    """Dự báo lead 1..6 phát hành tại issue_date (etl_build_forecasts.py), tra theo PK."""
+    engine = get_engine()
+    q = """
+        SELECT lead_days, target_date, max_temp, min_temp, total_rain, condition_code
+        FROM weather_forecasts
+        WHERE station_id = :s AND issue_date = :d
+        ORDER BY lead_days
+    """
+    return pd.read_sql(text(q), engine, params={"s": station_id, "d": issue_date},
+                       parse_dates=["target_date"])
+
+
+@bounded_cache()
+def load_forecast_skill(station_id):
+    engine = get_engine()
+    q = "SELECT * FROM weather_forecast_skill WHERE station_id = :s ORDER BY variable, lead_days;"
+    return pd.read_sql(text(q), engine, params={"s": station_id})
 
 
 def weekday_short(date: pd.Timestamp) -> str:
@@ -135,7 +143,8 @@ def weekday_short(date: pd.Timestamp) -> str:
 
 st.title("🌤️ Daily Weather Card")
 
-df_daily = load_daily()
+station, city_name = select_station()
+df_daily = load_daily(station)
 if df_daily.empty:
     st.warning("No daily data available.")
     st.stop()
@@ -152,8 +161,6 @@ with st.sidebar:
         max_value=max_date,
     )
 
-city_name = "Bradford, UK"
-
 # Lấy row của ngày được chọn
 row = df_daily[df_daily["date"] == pd.to_datetime(selected_date)]
 if row.empty:
@@ -163,7 +170,7 @@ row = row.iloc[0]
 
 date_str_pretty = pd.to_datetime(selected_date).strftime("%a, %d %b %Y")
 
-icon, status_text = classify_condition(row)
+icon, status_text = CONDITIONS[int(row["condition_code"])]
 
 current_temp = row["mean_temp"]
 wind = row["mean_wind_speed"]
@@ -171,16 +178,12 @@ precip_rate = row["total_rain"]
 pressure = row["mean_pressure"]
 
 # ---------- Forecast row HTML ----------
-start = pd.to_datetime(selected_date)
-end = start + timedelta(days=6)
-
-df_forecast = df_daily[(df_daily["date"] >= start) & (df_daily["date"] <= end)].copy()
-df_forecast = df_forecast.sort_values("date")
+df_forecast = load_forecast(station, selected_date)
 
 forecast_html_parts = ['<div class="forecast-row">']
 for _, r in df_forecast.iterrows():
-    f_icon, _ = classify_condition(r)
-    day_label = weekday_short(r["date"])
+    f_icon, _ = CONDITIONS[int(r["condition_code"])]
+    day_label = weekday_short(r["target_date"])
     max_t = r["max_temp"]
     min_t = r["min_temp"]
     forecast_html_parts.append(
@@ -193,3 +196,51 @@ forecast_html = "".join(forecast_html_parts)
 card_html = f'<div class="weather-card"><div class="weather-header"><div><div class="weather-city">{city_name}</div><div class="weather-date">{date_str_pretty}</div><div class="weather-main-temp">{current_temp:.1f}°C</div><div class="weather-main-status">{status_text}</div></div><div class="weather-right"><div class="weather-icon">{icon}</div><div>Wind: {wind:.1f} m/s</div><div>Precip: {precip_rate:.1f} mm/day</div><div>Pressure: {pressure:.0f} mb</div></div></div>{forecast_html}</div>'
 
 st.markdown(card_html, unsafe_allow_html=True)
+
+if df_forecast.empty:
+    st.caption("No forecast stored for this date. Run `python db/etl_build_forecasts.py`.")
+else:
+    st.caption("6-day strip: seasonal autoregressive forecast issued on the selected date.")
+
+# ---------- Similar past days ----------
+st.subheader("Similar past days")
+
+analog_index = load_analog_index(station)
+with st.expander("Analog feature weights"):
+    st.caption("Higher weight = the feature counts more when matching days (features are standardized).")
+    wcols = st.columns(3)
+    weights = {
+        feat: wcols[i % 3].slider(feat, 0.0, 3.0, 1.0, 0.5, key=f"analog_w_{feat}")
+        for i, feat in enumerate(analog_index.columns)
+    }
+
+analogs = analog_index.query_many([selected_date], k=ANALOG_K, weights=weights)
+if analogs.empty:
+    st.info("This day has missing features, no analogs available.")
+else:
+    analogs = analogs.merge(
+        df_daily[["date", "mean_temp", "max_temp", "min_temp", "total_rain", "condition_code"]]
+        .rename(columns={"date": "analog_date"}),
+        on="analog_date",
+        how="left",
+    )
+    analogs["condition"] = [" ".join(CONDITIONS[int(c)]) for c in analogs["condition_code"]]
+    st.dataframe(
+        analogs.drop(columns=["date", "condition_code"]),
+        hide_index=True,
+        column_config={
+            "analog_date": st.column_config.DateColumn("Analog day"),
+            "distance": st.column_config.NumberColumn("Distance", format="%.2f"),
+        },
+    )
+
+with st.expander("Forecast skill (hold-out period)"):
+    df_skill = load_forecast_skill(station)
+    if df_skill.empty:
+        st.info("No skill scores available.")
+    else:
+        st.caption("Skill = 1 − MSE(model) / MSE(reference); > 0 means the forecast beats the reference.")
+        st.dataframe(
+            df_skill[df_skill["variable"].isin(["max_temp", "min_temp", "total_rain"])],
+            hide_index=True,
+        )
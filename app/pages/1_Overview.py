@@ -13,62 +13,34 @@ import pandas as pd
 from sqlalchemy import text
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import date
 
 from src.db_utils import get_engine
+from src.cache import bounded_cache
+from src.loaders import load_daily, load_hourly_for_day
+from src.climatology import DailyNormals
+from src.constants import CONDITIONS
+from src.page_loader import PageLoader
+from src.figure_cache import plotly_chart
+from src.station_picker import select_station
 
 st.set_page_config(page_title="Overview", page_icon="📊", layout="wide")
 
 # ---------- Helpers & data loaders ----------
 
-@st.cache_data(show_spinner=False)
-def load_daily():
+@bounded_cache()
+def load_daily_normals(station_id: str):
+    """Normals theo day-of-year (weather_clim_daily) dạng array để lookup."""
     engine = get_engine()
-    df = pd.read_sql("SELECT * FROM weather_daily ORDER BY date;", engine, parse_dates=["date"])
-    return df
+    q = "SELECT * FROM weather_clim_daily WHERE station_id = :s;"
+    df = pd.read_sql(text(q), engine, params={"s": station_id})
+    return DailyNormals(df) if not df.empty else None
 
-@st.cache_data(show_spinner=False)
-def load_hourly_for_day(d: date):
-    """Lấy dữ liệu theo giờ cho một ngày cụ thể từ weather_raw."""
+@bounded_cache()
+def load_diurnal_normals(station_id: str, month: int):
+    """Normals theo giờ của một tháng (weather_clim_diurnal)."""
     engine = get_engine()
-    q = """
-        SELECT timestamp, date,
-               temp_out, out_hum,
-               wind_speed, bar, solar_rad, rain
-        FROM weather_raw
-        WHERE date = :d
-        ORDER BY timestamp;
-    """
-    params = {"d": d}
-    df = pd.read_sql(text(q), engine, params=params, parse_dates=["timestamp", "date"])
-    if not df.empty:
-        # resample 1H
-        df = (
-            df.set_index("timestamp")
-              .resample("1H")
-              .mean()
-              .reset_index()
-        )
-    return df
-
-def classify_condition(total_rain, mean_solar, mean_wind):
-    if pd.isna(total_rain):
-        total_rain = 0
-    if pd.isna(mean_solar):
-        mean_solar = 0
-    if pd.isna(mean_wind):
-        mean_wind = 0
-
-    if total_rain > 10:
-        return "🌧️ Heavy Rain"
-    if total_rain > 0.5:
-        return "🌦️ Rain Showers"
-    if mean_solar > 250 and total_rain == 0:
-        return "☀️ Clear Sky"
-    if mean_wind > 8:
-        return "💨 Windy"
-    return "⛅ Partly Cloudy"
-
+    q = "SELECT * FROM weather_clim_diurnal WHERE station_id = :s AND month = :m ORDER BY variable, hour;"
+    return pd.read_sql(text(q), engine, params={"s": station_id, "m": month})
 
 def get_temp_color(temp, min_temp=-10, max_temp=35):
     """Trả về màu từ xanh (lạnh) đến đỏ (nóng) dựa trên nhiệt độ"""
@@ -146,7 +118,23 @@ def get_humidity_color(humidity):
 
 st.title("📊 Overview")
 
-df_daily = load_daily()
+# station chọn ở sidebar (ngoài fragment); date widgets có key riêng theo trạm
+# vì mỗi trạm có khoảng ngày riêng
+station, city_name = select_station()
+FOCUS_KEY = f"overview_focus_date:{station}"
+RANGE_KEY = f"overview_date_range:{station}"
+
+# Khai báo query của trang: daily + hourly của focus date hiện tại (nếu đã
+# có trong session) chạy song song trên pool
+loader = PageLoader()
+loader.submit("daily", load_daily, station)
+loader.submit("daily normals", load_daily_normals, station)
+prev_focus = st.session_state.get(FOCUS_KEY)
+if prev_focus is not None:
+    loader.submit(f"hourly {prev_focus}", load_hourly_for_day, station, prev_focus)
+    loader.submit(f"diurnal {prev_focus.month}", load_diurnal_normals, station, prev_focus.month)
+
+df_daily = loader.result("daily")
 if df_daily.empty:
     st.warning("No daily data available.")
     st.stop()
@@ -154,161 +142,172 @@ if df_daily.empty:
 min_date = df_daily["date"].min().date()
 max_date = df_daily["date"].max().date()
 
-with st.sidebar:
-    st.header("Global Filters")
-
-    # Focus date dùng cho Today card & gauge
+PAGE = "overview"
+
+# Trang được chia thành các fragment độc lập: widget nằm trong fragment chỉ
+# chạy lại phần phụ thuộc vào nó (focus date -> card/gauge/hourly, date range
+# -> highlights/normal/heatmap). Widget trong fragment không được đặt trong
+# st.sidebar nên filter nằm ngay trên section tương ứng.
+
+
+def add_normal_band(fig, normals: pd.DataFrame, x, name: str, band: bool = True):
+    """Vẽ normal (mean) và dải p10–p90 phía sau trace chính."""
+    if band:
+        fig.add_trace(go.Scatter(
+            x=x, y=normals["p90"], mode="lines", line=dict(width=0),
+            hoverinfo="skip", showlegend=False,
+        ))
+        fig.add_trace(go.Scatter(
+            x=x, y=normals["p10"], mode="lines", line=dict(width=0),
+            fill="tonexty", fillcolor="rgba(150,150,150,0.25)",
+            name=f"{name} p10–p90",
+        ))
+    fig.add_trace(go.Scatter(
+        x=x, y=normals["mean"], mode="lines",
+        line=dict(color="gray", dash="dash"), name=f"{name} mean",
+    ))
+    # đưa trace dữ liệu lên trên cùng
+    fig.data = fig.data[1:] + fig.data[:1]
+
+
+# ---------- Section 1: Today card + gauges + hourly chart ----------
+
+@st.fragment
+def today_section():
     focus_date = st.date_input(
         "Focus date (for 'Today' view)",
         value=max_date,
         min_value=min_date,
         max_value=max_date,
+        key=FOCUS_KEY,
     )
 
-    # Date range cho các chart tổng thể
-    dr = st.date_input(
-        "Date range (for charts)",
-        value=(min_date, max_date),
-        min_value=min_date,
-        max_value=max_date,
-    )
-    if isinstance(dr, tuple) and len(dr) == 2:
-        date_from, date_to = dr
-    else:
-        date_from, date_to = min_date, max_date
-
-city_name = "Bradford, UK"
-
-# lọc daily cho range
-mask = (df_daily["date"] >= pd.to_datetime(date_from)) & (df_daily["date"] <= pd.to_datetime(date_to))
-df_range = df_daily[mask].copy()
-if df_range.empty:
-    st.warning("No data in selected range.")
-    st.stop()
-
-# row của focus date
-row_focus = df_daily[df_daily["date"] == pd.to_datetime(focus_date)]
-if row_focus.empty:
-    st.warning("Focus date not found in daily table.")
-    st.stop()
-row_focus = row_focus.iloc[0]
-
-
-# ---------- Hàng 1: Today card + gauges ----------
-
-c1, c2, c3, c4 = st.columns([1.4, 1, 1, 1])
-
-with c1:
-    # Today card
-    date_str_pretty = pd.to_datetime(focus_date).strftime("%a, %d %b %Y")
-    mean_temp = row_focus["mean_temp"]
-    cond_text = classify_condition(
-        row_focus["total_rain"],
-        row_focus["mean_solar"],
-        row_focus["mean_wind_speed"],
-    )
-
-    st.markdown(
-        f"""
-        <div style="
-            background: linear-gradient(135deg,#4CAF50,#81C784);
-            border-radius: 20px;
-            padding: 20px 24px;
-            color: white;
-            box-shadow: 0 6px 16px rgba(0,0,0,0.2);
-        ">
-          <div style="font-size: 22px; font-weight: 600;">{city_name}</div>
-          <div style="font-size: 14px; opacity: 0.9; margin-top: 4px;">{date_str_pretty}</div>
-          <div style="font-size: 42px; font-weight: 700; margin-top: 16px;">{mean_temp:.1f}°C</div>
-          <div style="font-size: 20px; margin-top: 8px;">{cond_text}</div>
-          <div style="margin-top: 16px; font-size: 14px;">
-            High: {row_focus['max_temp']:.1f}°C &nbsp;&nbsp;•&nbsp;&nbsp;
-            Low: {row_focus['min_temp']:.1f}°C &nbsp;&nbsp;•&nbsp;&nbsp;
-            Rain: {row_focus['total_rain']:.1f} mm
-          </div>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    # bắt đầu query hourly ngay, song song với phần render card/gauge
+    hourly_future = loader.submit(f"hourly {focus_date}", load_hourly_for_day, station, focus_date)
+    diurnal_future = loader.submit(f"diurnal {focus_date.month}", load_diurnal_normals,
+                                   station, focus_date.month)
+
+    # row của focus date
+    row_focus = df_daily[df_daily["date"] == pd.to_datetime(focus_date)]
+    if row_focus.empty:
+        st.warning("Focus date not found in daily table.")
+        return
+    row_focus = row_focus.iloc[0]
+
+    c1, c2, c3, c4 = st.columns([1.4, 1, 1, 1])
+
+    with c1:
+        # Today card
+        date_str_pretty = pd.to_datetime(focus_date).strftime("%a, %d %b %Y")
+        mean_temp = row_focus["mean_temp"]
+        cond_text = " ".join(CONDITIONS[int(row_focus["condition_code"])])
+
+        st.markdown(
+            f"""
+            <div style="
+                background: linear-gradient(135deg,#4CAF50,#81C784);
+                border-radius: 20px;
+                padding: 20px 24px;
+                color: white;
+                box-shadow: 0 6px 16px rgba(0,0,0,0.2);
+            ">
+              <div style="font-size: 22px; font-weight: 600;">{city_name}</div>
+              <div style="font-size: 14px; opacity: 0.9; margin-top: 4px;">{date_str_pretty}</div>
+              <div style="font-size: 42px; font-weight: 700; margin-top: 16px;">{mean_temp:.1f}°C</div>
+              <div style="font-size: 20px; margin-top: 8px;">{cond_text}</div>
+              <div style="margin-top: 16px; font-size: 14px;">
+                High: {row_focus['max_temp']:.1f}°C &nbsp;&nbsp;•&nbsp;&nbsp;
+                Low: {row_focus['min_temp']:.1f}°C &nbsp;&nbsp;•&nbsp;&nbsp;
+                Rain: {row_focus['total_rain']:.1f} mm
+              </div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
 
-with c2:
-    # Temperature gauge (so sánh với toàn bộ range)
-    temp_min_all = df_daily["min_temp"].min()
-    temp_max_all = df_daily["max_temp"].max()
-
-    fig_temp_gauge = go.Figure(
-        go.Indicator(
-            mode="gauge+number",
-            value=float(mean_temp),
-            title={"text": "Mean Temp (°C)"},
-            gauge={
-                "axis": {"range": [temp_min_all, temp_max_all]},
-            },
+    with c2:
+        # Temperature gauge (so sánh với toàn bộ range)
+        temp_min_all = df_daily["min_temp"].min()
+        temp_max_all = df_daily["max_temp"].max()
+
+        fig_temp_gauge = go.Figure(
+            go.Indicator(
+                mode="gauge+number",
+                value=float(mean_temp),
+                title={"text": "Mean Temp (°C)"},
+                gauge={
+                    "axis": {"range": [temp_min_all, temp_max_all]},
+                },
+            )
         )
-    )
-    fig_temp_gauge.update_layout(height=200, margin=dict(l=20, r=20, t=40, b=20))
-    st.plotly_chart(fig_temp_gauge, use_container_width=True)
-
-with c3:
-    # Humidity gauge
-    mean_hum = row_focus["mean_humidity"]
-
-    fig_hum_gauge = go.Figure(
-        go.Indicator(
-            mode="gauge+number",
-            value=float(mean_hum),
-            title={"text": "Humidity (%)"},
-            gauge={"axis": {"range": [0, 100]}},
+        fig_temp_gauge.update_layout(height=200, margin=dict(l=20, r=20, t=40, b=20))
+        st.plotly_chart(fig_temp_gauge, use_container_width=True)
+
+    with c3:
+        # Humidity gauge
+        mean_hum = row_focus["mean_humidity"]
+
+        fig_hum_gauge = go.Figure(
+            go.Indicator(
+                mode="gauge+number",
+                value=float(mean_hum),
+                title={"text": "Humidity (%)"},
+                gauge={"axis": {"range": [0, 100]}},
+            )
         )
-    )
-    fig_hum_gauge.update_layout(height=200, margin=dict(l=20, r=20, t=40, b=20))
-    st.plotly_chart(fig_hum_gauge, use_container_width=True)
-
-with c4:
-    # Wind Speed gauge
-    mean_wind = row_focus["mean_wind_speed"]
-    max_wind = row_focus["max_wind_speed"]
-    wind_max_all = df_daily["max_wind_speed"].max()
-
-    fig_wind_gauge = go.Figure(
-        go.Indicator(
-            mode="gauge+number",
-            value=float(mean_wind),
-            title={"text": "Wind Speed (m/s)"},
-            gauge={
-                "axis": {"range": [0, max(20, wind_max_all * 1.2)]},
-            },
+        fig_hum_gauge.update_layout(height=200, margin=dict(l=20, r=20, t=40, b=20))
+        st.plotly_chart(fig_hum_gauge, use_container_width=True)
+
+    with c4:
+        # Wind Speed gauge
+        mean_wind = row_focus["mean_wind_speed"]
+        max_wind = row_focus["max_wind_speed"]
+        wind_max_all = df_daily["max_wind_speed"].max()
+
+        fig_wind_gauge = go.Figure(
+            go.Indicator(
+                mode="gauge+number",
+                value=float(mean_wind),
+                title={"text": "Wind Speed (m/s)"},
+                gauge={
+                    "axis": {"range": [0, max(20, wind_max_all * 1.2)]},
+                },
+            )
+        )
+        fig_wind_gauge.update_layout(height=200, margin=dict(l=20, r=20, t=40, b=20))
+        st.plotly_chart(fig_wind_gauge, use_container_width=True)
+
+        # Hiển thị max wind speed bên dưới gauge
+        st.markdown(
+            f"""
+            <div style="
+                margin-top: 8px;
+                text-align: center;
+                font-size: 13px;
+                color: rgba(255, 255, 255, 0.7);
+            ">
+              Max: {max_wind:.1f} m/s
+            </div>
+            """,
+            unsafe_allow_html=True,
         )
-    )
-    fig_wind_gauge.update_layout(height=200, margin=dict(l=20, r=20, t=40, b=20))
-    st.plotly_chart(fig_wind_gauge, use_container_width=True)
-    
-    # Hiển thị max wind speed bên dưới gauge
-    st.markdown(
-        f"""
-        <div style="
-            margin-top: 8px;
-            text-align: center;
-            font-size: 13px;
-            color: rgba(255, 255, 255, 0.7);
-        ">
-          Max: {max_wind:.1f} m/s
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
 
+    st.subheader("Today – Hourly Profile")
 
-# ---------- Hàng 2: Today hourly chart ----------
+    # placeholder hiện ngay; chart thay vào khi query hourly xong
+    slot = st.empty()
+    if not hourly_future.done():
+        slot.caption(f"⏳ Loading hourly data for {focus_date}…")
+    df_hourly = hourly_future.result()
+    df_diurnal = diurnal_future.result()
+    if df_hourly.empty:
+        slot.info("No hourly raw data available for this day.")
+        return
 
-st.subheader("Today – Hourly Profile")
+    # normal của tháng theo giờ, đặt lên trục thời gian của focus date
+    hours_x = pd.to_datetime(focus_date) + pd.to_timedelta(range(24), unit="h")
 
-df_hourly = load_hourly_for_day(focus_date)
-if df_hourly.empty:
-    st.info("No hourly raw data available for this day.")
-else:
-    col_ts1, col_ts2 = st.columns(2)
-    with col_ts1:
+    def build_temp():
         fig_ht = px.line(
             df_hourly,
             x="timestamp",
@@ -316,8 +315,12 @@ else:
             title="Temperature by hour",
             labels={"timestamp": "Time", "temp_out": "Temp (°C)"},
         )
-        st.plotly_chart(fig_ht, use_container_width=True)
-    with col_ts2:
+        if not df_diurnal.empty:
+            n_temp = df_diurnal[df_diurnal["variable"] == "temp_out"].set_index("hour").reindex(range(24))
+            add_normal_band(fig_ht, n_temp, hours_x, "Normal")
+        return fig_ht
+
+    def build_rain():
         fig_hr = px.bar(
             df_hourly,
             x="timestamp",
@@ -325,114 +328,206 @@ else:
             title="Rainfall by hour",
             labels={"timestamp": "Time", "rain": "Rain (mm)"},
         )
-        st.plotly_chart(fig_hr, use_container_width=True)
-
-
-# ---------- Hàng 3: Highlights for selected range ----------
-
-st.subheader("Highlights over selected period")
-
-c_h1, c_h2, c_h3, c_h4 = st.columns(4)
-
-# Tính toán các giá trị
-avg_temp = df_range['mean_temp'].mean()
-min_temp = df_range['min_temp'].min()
-max_temp = df_range['max_temp'].max()
-total_rain = df_range['total_rain'].sum()
-rainy_days = int((df_range['total_rain'] > 0.5).sum())
-avg_wind = df_range['mean_wind_speed'].mean()
-max_wind = df_range['max_wind_speed'].max()
-avg_pressure = df_range['mean_pressure'].mean()
-avg_humidity = df_range['mean_humidity'].mean()
-
-# Tính toán màu sắc
-temp_color = get_temp_color(avg_temp)
-min_temp_color = get_temp_color(min_temp)
-max_temp_color = get_temp_color(max_temp)
-rain_color = get_rain_color(total_rain)
-wind_color = get_wind_color(avg_wind)
-max_wind_color = get_wind_color(max_wind)
-pressure_color = get_pressure_color(avg_pressure)
-humidity_color = get_humidity_color(avg_humidity)
-
-with c_h1:
-    st.markdown(
-        f"""
-        <div style="margin-bottom: 20px;">
-            <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Average Temp (°C)</div>
-            <div style="font-size: 32px; font-weight: 600; color: {temp_color};">{avg_temp:.1f}</div>
-        </div>
-        <div>
-            <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Temp range (min / max)</div>
-            <div style="font-size: 20px; font-weight: 600;">
-                <span style="color: {min_temp_color};">{min_temp:.1f}°</span> / 
-                <span style="color: {max_temp_color};">{max_temp:.1f}°</span>
+        if not df_diurnal.empty:
+            # cột rain theo giờ là mean của các giá trị 30-min (load_hourly_for_day),
+            # cùng thang với mean của diurnal normals
+            n_rain = df_diurnal[df_diurnal["variable"] == "rain"].set_index("hour").reindex(range(24))
+            add_normal_band(fig_hr, n_rain[["mean"]], hours_x, "Normal", band=False)
+        return fig_hr
+
+    widgets = {"station": station, "focus_date": focus_date}
+    with slot.container():
+        col_ts1, col_ts2 = st.columns(2)
+        with col_ts1:
+            plotly_chart(PAGE, "hourly temp", build_temp, widgets, use_container_width=True)
+        with col_ts2:
+            plotly_chart(PAGE, "hourly rain", build_rain, widgets, use_container_width=True)
+
+
+# ---------- Section 2: selected period (highlights, normal, heatmap) ----------
+
+def highlights(df_range: pd.DataFrame):
+    st.subheader("Highlights over selected period")
+
+    c_h1, c_h2, c_h3, c_h4 = st.columns(4)
+
+    # Tính toán các giá trị
+    avg_temp = df_range['mean_temp'].mean()
+    min_temp = df_range['min_temp'].min()
+    max_temp = df_range['max_temp'].max()
+    total_rain = df_range['total_rain'].sum()
+    rainy_days = int((df_range['total_rain'] > 0.5).sum())
+    avg_wind = df_range['mean_wind_speed'].mean()
+    max_wind = df_range['max_wind_speed'].max()
+    avg_pressure = df_range['mean_pressure'].mean()
+    avg_humidity = df_range['mean_humidity'].mean()
+
+    # Tính toán màu sắc
+    temp_color = get_temp_color(avg_temp)
+    min_temp_color = get_temp_color(min_temp)
+    max_temp_color = get_temp_color(max_temp)
+    rain_color = get_rain_color(total_rain)
+    wind_color = get_wind_color(avg_wind)
+    max_wind_color = get_wind_color(max_wind)
+    pressure_color = get_pressure_color(avg_pressure)
+    humidity_color = get_humidity_color(avg_humidity)
+
+    with c_h1:
+        st.markdown(
+            f"""
+            <div style="margin-bottom: 20px;">
+                <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Average Temp (°C)</div>
+                <div style="font-size: 32px; font-weight: 600; color: {temp_color};">{avg_temp:.1f}</div>
             </div>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+            <div>
+                <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Temp range (min / max)</div>
+                <div style="font-size: 20px; font-weight: 600;">
+                    <span style="color: {min_temp_color};">{min_temp:.1f}°</span> / 
+                    <span style="color: {max_temp_color};">{max_temp:.1f}°</span>
+                </div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
 
-with c_h2:
-    st.markdown(
-        f"""
-        <div style="margin-bottom: 20px;">
-            <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Total Rain (mm)</div>
-            <div style="font-size: 32px; font-weight: 600; color: {rain_color};">{total_rain:.1f}</div>
-        </div>
-        <div>
-            <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Rainy days</div>
-            <div style="font-size: 32px; font-weight: 600; color: {rain_color};">{rainy_days}</div>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    with c_h2:
+        st.markdown(
+            f"""
+            <div style="margin-bottom: 20px;">
+                <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Total Rain (mm)</div>
+                <div style="font-size: 32px; font-weight: 600; color: {rain_color};">{total_rain:.1f}</div>
+            </div>
+            <div>
+                <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Rainy days</div>
+                <div style="font-size: 32px; font-weight: 600; color: {rain_color};">{rainy_days}</div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
 
-with c_h3:
-    st.markdown(
-        f"""
-        <div style="margin-bottom: 20px;">
-            <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Avg Wind Speed (m/s)</div>
-            <div style="font-size: 32px; font-weight: 600; color: {wind_color};">{avg_wind:.1f}</div>
-        </div>
-        <div>
-            <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Max Wind Speed (m/s)</div>
-            <div style="font-size: 32px; font-weight: 600; color: {max_wind_color};">{max_wind:.1f}</div>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    with c_h3:
+        st.markdown(
+            f"""
+            <div style="margin-bottom: 20px;">
+                <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Avg Wind Speed (m/s)</div>
+                <div style="font-size: 32px; font-weight: 600; color: {wind_color};">{avg_wind:.1f}</div>
+            </div>
+            <div>
+                <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Max Wind Speed (m/s)</div>
+                <div style="font-size: 32px; font-weight: 600; color: {max_wind_color};">{max_wind:.1f}</div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+
+    with c_h4:
+        st.markdown(
+            f"""
+            <div style="margin-bottom: 20px;">
+                <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Avg Pressure (mb)</div>
+                <div style="font-size: 32px; font-weight: 600; color: {pressure_color};">{avg_pressure:.0f}</div>
+            </div>
+            <div>
+                <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Avg Humidity (%)</div>
+                <div style="font-size: 32px; font-weight: 600; color: {humidity_color};">{avg_humidity:.0f}</div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
 
-with c_h4:
-    st.markdown(
-        f"""
-        <div style="margin-bottom: 20px;">
-            <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Avg Pressure (mb)</div>
-            <div style="font-size: 32px; font-weight: 600; color: {pressure_color};">{avg_pressure:.0f}</div>
-        </div>
-        <div>
-            <div style="font-size: 14px; color: rgba(255,255,255,0.7); margin-bottom: 4px;">Avg Humidity (%)</div>
-            <div style="font-size: 32px; font-weight: 600; color: {humidity_color};">{avg_humidity:.0f}</div>
-        </div>
-        """,
-        unsafe_allow_html=True,
+
+def compared_with_normal(df_range: pd.DataFrame, widgets: dict):
+    """Anomalies vs climatology; bỏ qua nếu ETL climatology chưa chạy."""
+    slot = st.empty()
+    if not loader.submit("daily normals", load_daily_normals, station).done():
+        slot.caption("⏳ Loading daily normals…")
+    normals = loader.result("daily normals")
+    if normals is None:
+        slot.empty()
+        return
+
+    with slot.container():
+        st.subheader("Compared with normal")
+
+        # một lần lookup cho cả range
+        anom = normals.anomalies(df_range, ["mean_temp", "total_rain"])
+        a1, a2 = st.columns(2)
+        a1.metric("Mean temp anomaly", f"{anom['mean_temp'].mean():+.1f} °C")
+        a2.metric("Rain anomaly (total)", f"{anom['total_rain'].sum():+.1f} mm")
+
+        def build():
+            band = pd.DataFrame({
+                stat: normals.lookup("mean_temp", df_range["date"], stat)
+                for stat in ("mean", "p10", "p90")
+            })
+            fig_norm = px.line(
+                df_range,
+                x="date",
+                y="mean_temp",
+                title="Daily mean temperature vs normal (p10–p90)",
+                labels={"date": "Date", "mean_temp": "Mean Temp (°C)"},
+            )
+            add_normal_band(fig_norm, band, df_range["date"], "Normal")
+            return fig_norm
+
+        plotly_chart(PAGE, "temp vs normal", build, widgets, use_container_width=True)
+
+
+def calendar_heatmap(df_range: pd.DataFrame, widgets: dict):
+    """Calendar-like heatmap cho cả range."""
+    st.subheader("Calendar-style temperature heatmap")
+
+    def build():
+        df_cal = df_range.copy()
+        df_cal["day"] = df_cal["date"].dt.day
+        df_cal["month_name"] = df_cal["date"].dt.month_name().str.slice(stop=3)
+
+        return px.density_heatmap(
+            df_cal,
+            x="day",
+            y="month_name",
+            z="mean_temp",
+            color_continuous_scale="Turbo",
+            labels={"day": "Day", "month_name": "Month", "mean_temp": "Mean Temp (°C)"},
+            title="Daily mean temperature",
+        )
+
+    plotly_chart(PAGE, "calendar heatmap", build, widgets, use_container_width=True)
+
+
+@st.fragment
+def period_section():
+    # Date range cho các chart tổng thể
+    dr = st.date_input(
+        "Date range (for charts)",
+        value=(min_date, max_date),
+        min_value=min_date,
+        max_value=max_date,
+        key=RANGE_KEY,
     )
+    if isinstance(dr, tuple) and len(dr) == 2:
+        date_from, date_to = dr
+    else:
+        date_from, date_to = min_date, max_date
+
+    # lọc daily cho range
+    mask = (df_daily["date"] >= pd.to_datetime(date_from)) & (df_daily["date"] <= pd.to_datetime(date_to))
+    df_range = df_daily[mask].copy()
+    if df_range.empty:
+        st.warning("No data in selected range.")
+        return
 
-# ---------- Bonus: calendar-like heatmap for the whole range ----------
+    # figure được cache theo (dataset version, range)
+    widgets = {"station": station, "date_from": date_from, "date_to": date_to}
+    highlights(df_range)
+    compared_with_normal(df_range, widgets)
+    calendar_heatmap(df_range, widgets)
 
-st.subheader("Calendar-style temperature heatmap")
 
-df_cal = df_range.copy()
-df_cal["day"] = df_cal["date"].dt.day
-df_cal["month_name"] = df_cal["date"].dt.month_name().str.slice(stop=3)
+today_section()
+st.divider()
+period_section()
 
-fig_cal = px.density_heatmap(
-    df_cal,
-    x="day",
-    y="month_name",
-    z="mean_temp",
-    color_continuous_scale="Turbo",
-    labels={"day": "Day", "month_name": "Month", "mean_temp": "Mean Temp (°C)"},
-    title="Daily mean temperature",
-)
-st.plotly_chart(fig_cal, use_container_width=True)
+with st.expander("Query timings"):
+    st.caption(f"Page run time: {loader.elapsed:.2f}s (queries run concurrently)")
+    st.dataframe(loader.timings(), hide_index=True)
@@ -8,37 +8,24 @@ project_root = Path(__file__).resolve().parents[2]
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
+from functools import cache
+
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from sqlalchemy import text
-from src.db_utils import get_engine
+from src.raw_blocks import load_raw_range
+from src.figure_cache import plotly_chart
+from src.station_picker import select_station
 
 st.set_page_config(page_title="Time Series Explorer", page_icon="⏱️", layout="wide")
 
-@st.cache_data(show_spinner=False)
-def load_raw(date_from=None, date_to=None):
-    engine = get_engine()
-    base = """
-        SELECT timestamp, date,
-               temp_out, out_hum,
-               wind_speed, bar, solar_rad, rain_rate
-        FROM weather_raw
-        WHERE timestamp IS NOT NULL
-    """
-    params = {}
-    if date_from:
-        base += " AND date >= :date_from"
-        params["date_from"] = date_from
-    if date_to:
-        base += " AND date <= :date_to"
-        params["date_to"] = date_to
-    base += " ORDER BY timestamp"
-    df = pd.read_sql(text(base), engine, params=params, parse_dates=["timestamp", "date"])
-    return df
+def load_raw(station_id, date_from=None, date_to=None):
+    # raw 30-min được phục vụ từ cache block theo tháng (src/raw_blocks.py)
+    return load_raw_range(station_id, date_from, date_to)
 
 st.title("⏱️ Time Series Explorer")
 
+station, _ = select_station()
+
 with st.sidebar:
     st.header("Filters")
     date_range = st.date_input("Date range", [])
@@ -50,40 +37,46 @@ with st.sidebar:
     agg_level = st.selectbox("Aggregation", ["Raw (30-min)", "Hourly", "Daily"])
 
 if len(date_range) == 2:
-    df_raw = load_raw(date_from=date_range[0], date_to=date_range[1])
+    df_raw = load_raw(station, date_from=date_range[0], date_to=date_range[1])
 else:
-    df_raw = load_raw()
+    df_raw = load_raw(station)
 
 if df_raw.empty:
     st.warning("No data for selected filters.")
     st.stop()
 
-df_plot = df_raw.copy()
-if agg_level == "Hourly":
-    df_plot = (
-        df_plot
-        .set_index("timestamp")
-        .resample("1H")
-        .mean()
-        .reset_index()
-    )
-elif agg_level == "Daily":
-    df_plot = (
-        df_plot
-        .set_index("timestamp")
-        .resample("1D")
-        .mean()
-        .reset_index()
-    )
+@cache
+def plot_frame():
+    # chỉ resample khi có figure chưa được cache
+    df_plot = df_raw.copy()
+    if agg_level == "Hourly":
+        df_plot = (
+            df_plot
+            .set_index("timestamp")
+            .resample("1h")
+            .mean()
+            .reset_index()
+        )
+    elif agg_level == "Daily":
+        df_plot = (
+            df_plot
+            .set_index("timestamp")
+            .resample("1D")
+            .mean()
+            .reset_index()
+        )
+    return df_plot
 
 st.subheader("Selected Time Series")
 
+widgets = {"station": station, "date_range": tuple(date_range), "agg_level": agg_level}
 for var in variables:
-    fig = px.line(
-        df_plot,
-        x="timestamp",
-        y=var,
-        title=var,
-        labels={"timestamp": "Time", var: var},
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    def build(var=var):
+        return px.line(
+            plot_frame(),
+            x="timestamp",
+            y=var,
+            title=var,
+            labels={"timestamp": "Time", var: var},
+        )
+    plotly_chart("time_series", var, build, widgets, use_container_width=True)
@@ -13,10 +13,11 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 from sqlalchemy import text
-from pandas.plotting import andrews_curves
-import matplotlib.pyplot as plt
 
 from src.db_utils import get_engine
+from src.cache import bounded_cache
+from src.plotting import adaptive_scatter
+from src.station_picker import select_station
 
 st.set_page_config(
     page_title="Multivariate Analysis",
@@ -24,11 +25,11 @@ st.set_page_config(
     layout="wide",
 )
 
-@st.cache_data(show_spinner=False)
-def load_daily(date_from=None, date_to=None, season=None):
+@bounded_cache("load_daily_filtered")
+def load_daily(station_id, date_from=None, date_to=None, season=None):
     engine = get_engine()
-    base = "SELECT * FROM weather_daily WHERE 1=1"
-    params = {}
+    base = "SELECT * FROM weather_daily WHERE station_id = :station_id"
+    params = {"station_id": station_id}
     if date_from:
         base += " AND date >= :date_from"
         params["date_from"] = date_from
@@ -44,15 +45,17 @@ def load_daily(date_from=None, date_to=None, season=None):
 
 st.title("📐 Multivariate Analysis")
 
+station, _ = select_station()
+
 with st.sidebar:
     st.header("Filters")
     date_range = st.date_input("Date range", [])
     season = st.selectbox("Season", ["All", "Winter", "Spring", "Summer", "Autumn"])
 
 if len(date_range) == 2:
-    df = load_daily(date_from=date_range[0], date_to=date_range[1], season=season)
+    df = load_daily(station, date_from=date_range[0], date_to=date_range[1], season=season)
 else:
-    df = load_daily(season=season)
+    df = load_daily(station, season=season)
 
 if df.empty:
     st.warning("No data for selected filters.")
@@ -103,7 +106,7 @@ with c3:
 df_plot = df.copy()
 color_arg = None if color_by == "None" else color_by
 
-fig_scatter = px.scatter(
+fig_scatter = adaptive_scatter(
     df_plot,
     x=x_var,
     y=y_var,
@@ -173,7 +176,13 @@ st.markdown(
 andrews_cols_default = ["mean_temp", "mean_humidity", "total_rain", "mean_wind_speed", "mean_pressure", "mean_solar"]
 andrews_cols = [c for c in andrews_cols_default if c in df.columns]
 
-if len(andrews_cols) >= 3:
+if len(andrews_cols) < 3:
+    st.info("Not enough numeric columns available for Andrews curves.")
+elif st.toggle("Show Andrews curves", value=False):
+    # matplotlib chỉ được import khi section này thật sự chạy
+    import matplotlib.pyplot as plt
+    from pandas.plotting import andrews_curves
+
     df_andrews = df[andrews_cols + ["season"]].dropna().copy()
     # Giới hạn số points để plot không quá nặng
     max_curves = st.slider("Max number of curves", 50, 400, 200)
@@ -184,5 +193,4 @@ if len(andrews_cols) >= 3:
     andrews_curves(df_andrews, "season", ax=ax)
     ax.set_title("Andrews curves grouped by season")
     st.pyplot(fig)
-else:
-    st.info("Not enough numeric columns available for Andrews curves.")
+    plt.close(fig)
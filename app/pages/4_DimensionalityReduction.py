@@ -1,6 +1,7 @@
 # app/pages/4_DimensionalityReduction.py
 
 import sys
+import time
 from pathlib import Path
 
 # Add project root to Python path for Streamlit Cloud
@@ -9,11 +10,21 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from sqlalchemy import text
 
-from src.db_utils import get_engine
+from src.cache import bounded_cache
+from src.loaders import load_embeddings, load_feature_store
+from src.constants import CLUSTER_KS, TSNE_PERPLEXITIES, UMAP_N_NEIGHBORS, UMAP_MIN_DISTS
+from src.dim_reduction import prepare_matrix
+from src.plotting import adaptive_scatter
+from src.sweeps import RUNNER
+from src.station_picker import select_station
+
+# tham số của các embedding đã lưu trong weather_serving (etl_build_embeddings)
+STORED_PARAMS = {
+    "t-SNE": {"perplexity": 30.0},
+    "UMAP": {"n_neighbors": 15, "min_dist": 0.1},
+}
+SWEEP_METHOD = {"t-SNE": "tsne", "UMAP": "umap"}
 
 st.set_page_config(
     page_title="Dimensionality Reduction",
@@ -21,21 +32,45 @@ st.set_page_config(
     layout="wide",
 )
 
-@st.cache_data(show_spinner=False)
-def load_embeddings():
-    engine = get_engine()
-    q = """
-        SELECT e.*, d.season, d.total_rain, d.mean_temp, d.mean_wind_speed
-        FROM weather_embeddings e
-        JOIN weather_daily d ON e.date = d.date
-        ORDER BY e.date
-    """
-    df = pd.read_sql(text(q), engine, parse_dates=["date"])
-    return df
+@bounded_cache()
+def load_feature_matrix(station_id):
+    """Ma trận features đã chuẩn hoá, cùng thứ tự dòng với load_embeddings(station_id)."""
+    store = load_feature_store(station_id)
+    if store is not None:
+        # memmap của etl_build_embeddings: không scale lại, dùng chung page cache
+        return store.X
+    X_scaled, _, _, _ = prepare_matrix(load_embeddings(station_id))
+    return X_scaled
+
+@st.fragment(run_every=2)
+def wait_for_sweep(key: str, label: str):
+    """Poll job nền; khi xong thì rerun cả trang để vẽ từ cache đĩa."""
+    job = RUNNER.job(key)
+    if job is None or job["state"] == "done":
+        st.rerun()
+    elif job["state"] == "failed":
+        st.error(f"{label} failed: {job['error']}")
+    else:
+        elapsed = time.time() - job["submitted"]
+        st.info(f"Computing {label} in the background… {elapsed:.0f}s elapsed. "
+                "The stored embedding is shown meanwhile.")
+
+@st.fragment(run_every=2)
+def sweep_progress(keys: list[str]):
+    done = sum(RUNNER.cache.contains(k) for k in keys)
+    failed = sum((RUNNER.job(k) or {}).get("state") == "failed" for k in keys)
+    if done + failed == len(keys):
+        # xong hết -> bỏ keys và rerun trang để fragment không poll nữa
+        del st.session_state["sweep_keys"]
+        st.toast(f"Sweep finished: {done}/{len(keys)} settings computed"
+                 + (f", {failed} failed" if failed else ""))
+        st.rerun()
+    st.progress(done / len(keys), text=f"Sweep: {done}/{len(keys)} settings computed")
 
 st.title("🧬 Dimensionality Reduction: PCA, t-SNE, UMAP")
 
-df = load_embeddings()
+station, _ = select_station()
+df = load_embeddings(station)
 if df.empty:
     st.warning("No embeddings found. Run etl_build_embeddings.py first.")
     st.stop()
@@ -45,13 +80,31 @@ with st.sidebar:
     method = st.selectbox("Method", ["PCA", "t-SNE", "UMAP"])
     color_by = st.selectbox(
         "Color by",
-        ["season", "cluster_kmeans", "extreme_label", "total_rain", "mean_temp", "mean_wind_speed"],
+        ["season", "cluster_kmeans"]
+        + [f"cluster_k{k}" for k in CLUSTER_KS]
+        + ["extreme_label", "total_rain", "mean_temp", "mean_wind_speed"],
     )
     size_by = st.selectbox(
         "Size by",
         ["None", "total_rain", "mean_wind_speed"],
     )
 
+    params = None
+    if method in STORED_PARAMS:
+        st.header(f"{method} parameters")
+        if method == "t-SNE":
+            params = {"perplexity": float(st.select_slider(
+                "Perplexity", TSNE_PERPLEXITIES, value=30))}
+        else:
+            params = {
+                "n_neighbors": st.select_slider("n_neighbors", UMAP_N_NEIGHBORS, value=15),
+                "min_dist": st.select_slider("min_dist", UMAP_MIN_DISTS, value=0.1),
+            }
+        run_sweep = st.button(
+            f"Precompute all {'perplexities' if method == 't-SNE' else 'n_neighbors'}",
+            help="Queue every setting in the background; results are cached on disk.",
+        )
+
 # chọn cặp chiều
 if method == "PCA":
     x_col, y_col = "pca1", "pca2"
@@ -63,9 +116,32 @@ else:
 color_arg = color_by
 size_arg = None if size_by == "None" else size_by
 
-st.subheader(f"{method} embedding")
-
-fig = px.scatter(
+# tham số khác với bản đã lưu -> lấy từ cache đĩa hoặc fit trong process nền
+pending = None
+if params is not None and params != STORED_PARAMS[method]:
+    X = load_feature_matrix(station)
+    key, coords = RUNNER.request(X, SWEEP_METHOD[method], params)
+    if coords is not None:
+        df = df.assign(**{x_col: coords[:, 0], y_col: coords[:, 1]})
+    else:
+        pending = key
+
+if params is not None and run_sweep:
+    X = load_feature_matrix(station)
+    if method == "t-SNE":
+        grid = [{"perplexity": float(p)} for p in TSNE_PERPLEXITIES]
+    else:
+        grid = [{"n_neighbors": n, "min_dist": params["min_dist"]} for n in UMAP_N_NEIGHBORS]
+    st.session_state["sweep_keys"] = [RUNNER.request(X, SWEEP_METHOD[method], p)[0] for p in grid]
+
+params_txt = "" if params is None else " (" + ", ".join(f"{k}={v}" for k, v in params.items()) + ")"
+st.subheader(f"{method} embedding{params_txt}")
+if pending is not None:
+    wait_for_sweep(pending, f"{method}{params_txt}")
+if st.session_state.get("sweep_keys"):
+    sweep_progress(st.session_state["sweep_keys"])
+
+fig = adaptive_scatter(
     df,
     x=x_col,
     y=y_col,
@@ -85,7 +161,7 @@ timeline_color_by = st.selectbox(
     index=0,
 )
 
-fig_t = px.scatter(
+fig_t = adaptive_scatter(
     df,
     x="date",
     y="mean_temp",
@@ -95,3 +171,13 @@ fig_t = px.scatter(
     title="Daily mean temperature timeline (size = rain, color = selected label)",
 )
 st.plotly_chart(fig_t, use_container_width=True)
+
+with st.expander("Background embedding jobs"):
+    st.caption(
+        "Fits run in a separate process pool; results are cached on disk by a hash "
+        "of the feature matrix and parameters (least recently used files are evicted)."
+    )
+    cache_info = RUNNER.cache.stats()
+    st.write(f"Disk cache: {cache_info['files']} results, "
+             f"{cache_info['bytes'] / 1024 ** 2:.1f} / {cache_info['max_bytes'] / 1024 ** 2:.0f} MB")
+    st.dataframe(RUNNER.status(), hide_index=True)
@@ -16,6 +16,11 @@ import plotly.graph_objects as go
 from sqlalchemy import text
 
 from src.db_utils import get_engine
+from src.cache import bounded_cache
+from src.constants import CLUSTER_KS, DEFAULT_CLUSTER_K
+from src.page_loader import PageLoader
+from src.plotting import adaptive_scatter
+from src.station_picker import select_station
 
 st.set_page_config(
     page_title="Weather Regimes",
@@ -23,33 +28,61 @@ st.set_page_config(
     layout="wide",
 )
 
-@st.cache_data(show_spinner=False)
-def load_regimes():
+@bounded_cache()
+def load_regimes(station_id):
     engine = get_engine()
-    q = """
-        SELECT e.date, e.cluster_kmeans, e.extreme_label,
-               d.season, d.total_rain, d.mean_temp, d.mean_humidity,
-               d.mean_wind_speed, d.max_wind_speed, d.mean_pressure,
-               d.mean_solar, d.temp_range, d.humidity_range
-        FROM weather_embeddings e
-        JOIN weather_daily d ON e.date = d.date
-        ORDER BY e.date
+    cluster_cols = ", ".join(f"cluster_k{k}" for k in CLUSTER_KS)
+    q = f"""
+        SELECT date, {cluster_cols}, extreme_label,
+               season, total_rain, mean_temp, mean_humidity,
+               mean_wind_speed, max_wind_speed, mean_pressure,
+               mean_solar, temp_range, humidity_range
+        FROM weather_serving
+        WHERE station_id = :s
+        ORDER BY date
     """
-    df = pd.read_sql(text(q), engine, parse_dates=["date"])
+    df = pd.read_sql(text(q), engine, params={"s": station_id}, parse_dates=["date"])
+    return df
+
+@bounded_cache()
+def load_pca_coords(station_id):
+    engine = get_engine()
+    cluster_cols = ", ".join(f"cluster_k{k}" for k in CLUSTER_KS)
+    q = f"""
+        SELECT date, {cluster_cols}, season, pca1, pca2
+        FROM weather_serving
+        WHERE station_id = :s
+        ORDER BY date
+    """
+    df = pd.read_sql(text(q), engine, params={"s": station_id}, parse_dates=["date"])
     return df
 
 st.title("🌐 Weather Regimes (Clusters)")
 
-df = load_regimes()
+station, _ = select_station()
+
+# hai query của trang chạy song song
+loader = PageLoader()
+loader.submit("regimes", load_regimes, station)
+loader.submit("pca", load_pca_coords, station)
+
+df = loader.result("regimes")
 if df.empty:
     st.warning("No regime data. Run etl_build_embeddings.py first.")
     st.stop()
 
-df["cluster_kmeans"] = df["cluster_kmeans"].astype(int)
+with st.sidebar:
+    st.header("Filters")
+    n_regimes = st.selectbox(
+        "Number of regimes (k)",
+        CLUSTER_KS,
+        index=CLUSTER_KS.index(DEFAULT_CLUSTER_K),
+    )
+
+df["cluster_kmeans"] = df[f"cluster_k{n_regimes}"].astype(int)
 cluster_ids = sorted(df["cluster_kmeans"].unique())
 
 with st.sidebar:
-    st.header("Filters")
     cluster_sel = st.multiselect(
         "Select clusters",
         cluster_ids,
@@ -96,27 +129,14 @@ st.dataframe(summary.style.format({
 # --- PCA-like scatter with clusters (reuse pca from embeddings table) ---
 st.subheader("Regimes in PCA space")
 
-# load PCA coordinates
-engine = get_engine()
-df_pca = pd.read_sql(
-    text("""
-        SELECT e.date, e.cluster_kmeans, d.season,
-               e.pca1, e.pca2
-        FROM weather_embeddings e
-        JOIN weather_daily d ON e.date = d.date
-        ORDER BY e.date
-    """),
-    engine,
-    parse_dates=["date"],
-)
-
-df_pca["cluster_kmeans"] = df_pca["cluster_kmeans"].astype(int)
+df_pca = loader.result("pca")
+df_pca["cluster_kmeans"] = df_pca[f"cluster_k{n_regimes}"].astype(int)
 df_pca = df_pca[
     df_pca["cluster_kmeans"].isin(cluster_sel)
     & df_pca["season"].isin(season_sel)
 ]
 
-fig_sc = px.scatter(
+fig_sc = adaptive_scatter(
     df_pca,
     x="pca1",
     y="pca2",
@@ -200,3 +220,7 @@ fig_month = px.bar(
     title="Number of days per regime over months",
 )
 st.plotly_chart(fig_month, use_container_width=True)
+
+with st.expander("Query timings"):
+    st.caption(f"Page run time: {loader.elapsed:.2f}s (queries run concurrently)")
+    st.dataframe(loader.timings(), hide_index=True)
@@ -14,6 +14,17 @@ import plotly.express as px
 from sqlalchemy import text
 
 from src.db_utils import get_engine
+from src.cache import bounded_cache
+from src.loaders import load_daily
+from src.constants import EXTREME_TYPES, EXTREME_VALUES, EXTREME_QUANTILES
+from src.raw_blocks import load_raw_range, prefetch_event_windows
+from src.sketches import load_sketches, seasonal_thresholds
+from src.analogs import get_analog_index
+from src.figure_cache import plotly_chart
+from src.station_picker import select_station
+
+MAX_WINDOW_DAYS = 5  # max của slider before/after, cũng là span được prefetch
+PAGE = "extreme_events"  # namespace của page trong figure cache
 
 st.set_page_config(
     page_title="Extreme Events",
@@ -21,52 +32,56 @@ st.set_page_config(
     layout="wide",
 )
 
-@st.cache_data(show_spinner=False)
-def load_daily():
+@bounded_cache()
+def load_events(station_id, event_type):
+    """Episodes của một event type từ weather_events (etl_build_events.py)."""
     engine = get_engine()
-    df = pd.read_sql("SELECT * FROM weather_daily ORDER BY date;", engine, parse_dates=["date"])
-    return df
-
-@st.cache_data(show_spinner=False)
-def load_raw_for_window(date_center, days_before=2, days_after=2):
-    engine = get_engine()
-    start = date_center - pd.Timedelta(days=days_before)
-    end = date_center + pd.Timedelta(days=days_after)
     q = """
-        SELECT timestamp, date,
-               temp_out, out_hum,
-               wind_speed, bar, solar_rad, rain_rate
-        FROM weather_raw
-        WHERE date BETWEEN :start AND :end
-        ORDER BY timestamp;
+        SELECT event_id, start_date, end_date, duration_days,
+               peak_date, peak_value, total_value, return_period_years
+        FROM weather_events
+        WHERE station_id = :s AND event_type = :event_type
+        ORDER BY return_period_years DESC NULLS LAST
     """
-    params = {"start": start.date(), "end": end.date()}
-    df = pd.read_sql(text(q), engine, params=params, parse_dates=["timestamp", "date"])
+    df = pd.read_sql(
+        text(q), engine, params={"s": station_id, "event_type": event_type},
+        parse_dates=["start_date", "end_date", "peak_date"],
+    )
     return df
 
+@bounded_cache()
+def load_quantile_sketches(station_id):
+    sketches, _ = load_sketches(get_engine(), station_id)
+    return sketches
+
+@bounded_cache()
+def load_analog_index(station_id, space="features"):
+    """KD-tree analog index của dataset hiện tại (persist trong EMBEDDINGS_DIR)."""
+    return get_analog_index(load_daily(station_id), space, station_id)
+
+def load_raw_for_window(station_id, event_start, event_end, days_before=2, days_after=2):
+    start = event_start - pd.Timedelta(days=days_before)
+    end = event_end + pd.Timedelta(days=days_after)
+    # các cửa sổ chồng nhau dùng chung block tháng trong cache
+    return load_raw_range(station_id, start.date(), end.date())
+
 st.title("⚠️ Extreme Events")
 
-df_daily = load_daily()
+station, _ = select_station()
+df_daily = load_daily(station)
 if df_daily.empty:
     st.warning("No daily data available.")
     st.stop()
 
-df_daily["date_str"] = df_daily["date"].dt.strftime("%Y-%m-%d")
-
-# xác định extreme type
-df_daily["heavy_rain"] = df_daily["rain_flag"]
-df_daily["strong_wind"] = df_daily["wind_flag"]
-# simple heatwave/coldspell definition (top/bottom 5%)
-temp_hi_thr = df_daily["max_temp"].quantile(0.95)
-temp_lo_thr = df_daily["min_temp"].quantile(0.05)
-df_daily["heatwave"] = df_daily["max_temp"] >= temp_hi_thr
-df_daily["cold_spell"] = df_daily["min_temp"] <= temp_lo_thr
+# flags của từng extreme type được tính sẵn trong etl_build_daily (label_extremes)
+for event_name, flag_col in EXTREME_TYPES.items():
+    df_daily[event_name] = df_daily[flag_col].fillna(False).astype(bool)
 
 with st.sidebar:
     st.header("Event type")
     event_type = st.selectbox(
         "Choose extreme type",
-        ["heavy_rain", "strong_wind", "heatwave", "cold_spell"],
+        list(EXTREME_TYPES),
         format_func=lambda x: {
             "heavy_rain": "Heavy rain",
             "strong_wind": "Strong wind",
@@ -75,102 +90,208 @@ with st.sidebar:
         }[x],
     )
 
-    candidates = df_daily[df_daily[event_type]].copy()
-    if candidates.empty:
-        st.error(f"No events detected for {event_type}.")
+    events = load_events(station, event_type)
+    if events.empty:
+        st.error(f"No events detected for {event_type}. Run etl_build_events.py first.")
         st.stop()
 
-    event_date_str = st.selectbox(
-        "Select an extreme day",
-        candidates["date_str"].tolist(),
+    # kiểu "min" (cold spell): peak càng thấp càng extreme
+    peak_desc = EXTREME_VALUES[event_type][1] == "max"
+    rank_options = {
+        "Return period": ("return_period_years", False),
+        "Peak": ("peak_value", not peak_desc),
+        "Duration": ("duration_days", False),
+        "Accumulated total": ("total_value", not peak_desc),
+        "Date": ("start_date", True),
+    }
+    rank_by = st.selectbox("Rank events by", list(rank_options))
+    rank_col, ascending = rank_options[rank_by]
+    events = events.sort_values(rank_col, ascending=ascending, na_position="last", ignore_index=True)
+
+    def event_label(i):
+        ev = events.loc[i]
+        span = ev["start_date"].strftime("%Y-%m-%d")
+        if ev["duration_days"] > 1:
+            span += f" → {ev['end_date']:%Y-%m-%d}"
+        rp = ev["return_period_years"]
+        rp_txt = f", T≈{rp:.1f}y" if pd.notna(rp) and rp != float("inf") else ""
+        return f"{span} ({ev['duration_days']}d, peak {ev['peak_value']:.1f}{rp_txt})"
+
+    event_idx = st.selectbox(
+        "Select an event",
+        events.index.tolist(),
+        format_func=event_label,
     )
-    days_before = st.slider("Days before", 1, 5, 2)
-    days_after = st.slider("Days after", 1, 5, 2)
+    days_before = st.slider("Days before", 1, MAX_WINDOW_DAYS, 2)
+    days_after = st.slider("Days after", 1, MAX_WINDOW_DAYS, 2)
 
-event_date = pd.to_datetime(event_date_str)
+# Prefetch cửa sổ raw của mọi event (span lớn nhất) trong background,
+# để chuyển giữa các sự kiện không phải query lại
+windows_future = prefetch_event_windows(
+    station,
+    list(zip(events["start_date"], events["end_date"])),
+    MAX_WINDOW_DAYS,
+    MAX_WINDOW_DAYS,
+)
 
-st.subheader(f"Selected event: {event_type} on {event_date.date()}")
+event = events.loc[event_idx]
+event_start = event["start_date"]
+event_end = event["end_date"]
 
-# --- Daily comparison: extreme vs non-extreme ---
-st.markdown("### Distribution comparison (extreme vs non-extreme days)")
+st.subheader(
+    f"Selected event: {event_type} {event_start.date()}"
+    + (f" → {event_end.date()}" if event_end > event_start else "")
+)
+
+st.markdown("### Ranked events")
+st.dataframe(
+    events.drop(columns=["event_id"]).head(20),
+    hide_index=True,
+    column_config={
+        "start_date": st.column_config.DateColumn("Start"),
+        "end_date": st.column_config.DateColumn("End"),
+        "peak_date": st.column_config.DateColumn("Peak day"),
+        "return_period_years": st.column_config.NumberColumn("Return period (y)", format="%.1f"),
+    },
+)
 
-ext_mask = df_daily[event_type]
-df_ext = df_daily[ext_mask]
-df_non = df_daily[~ext_mask]
+value_col = EXTREME_VALUES[event_type][0]
 
-long = pd.concat([
-    df_ext.assign(group="extreme"),
-    df_non.assign(group="non_extreme"),
-])
+# --- Analog days of the event peak ---
+st.markdown("### Similar past days (analogs of the peak day)")
+
+analog_index = load_analog_index(station)
+analogs = analog_index.query_many([event["peak_date"]], k=10)
+if analogs.empty:
+    st.info("Peak day has missing features, no analogs available.")
+else:
+    # mỗi analog có phải cũng là ngày extreme cùng loại không
+    analogs = analogs.merge(
+        df_daily[["date", value_col, event_type]].rename(columns={"date": "analog_date"}),
+        on="analog_date",
+        how="left",
+    )
+    n_ext = int(analogs[event_type].sum())
+    st.caption(f"{n_ext} of {len(analogs)} nearest analog days were also flagged as {event_type}.")
+    st.dataframe(
+        analogs.drop(columns=["date"]),
+        hide_index=True,
+        column_config={
+            "analog_date": st.column_config.DateColumn("Analog day"),
+            "distance": st.column_config.NumberColumn("Distance", format="%.2f"),
+            event_type: st.column_config.CheckboxColumn("Extreme"),
+        },
+    )
+
+# --- Thresholds from the stored quantile sketches ---
+q = EXTREME_QUANTILES[event_type]
+sketches = load_quantile_sketches(station)
+if (value_col, "all") in sketches:
+    with st.expander(f"Thresholds: {value_col} at q={q:.2f} (overall and by season)"):
+        thr = {"All year": float(sketches[(value_col, "all")].quantile(q))}
+        thr.update(seasonal_thresholds(sketches, value_col, q))
+        st.dataframe(
+            pd.DataFrame({"scope": list(thr), "threshold": list(thr.values())}),
+            hide_index=True,
+        )
+
+# --- Daily comparison: extreme vs non-extreme ---
+st.markdown("### Distribution comparison (extreme vs non-extreme days)")
 
 metrics = ["mean_temp", "total_rain", "mean_wind_speed", "mean_pressure"]
+box_var = st.selectbox("Variable to compare", metrics, index=0)
 
-fig_box = px.box(
-    long,
-    x="group",
-    y=st.selectbox("Variable to compare", metrics, index=0),
-    points="all",
-    title="Extreme vs non-extreme distribution",
-)
-st.plotly_chart(fig_box, use_container_width=True)
+def build_box():
+    ext_mask = df_daily[event_type]
+    long = pd.concat([
+        df_daily[ext_mask].assign(group="extreme"),
+        df_daily[~ext_mask].assign(group="non_extreme"),
+    ])
+    return px.box(
+        long,
+        x="group",
+        y=box_var,
+        points="all",
+        title="Extreme vs non-extreme distribution",
+    )
+
+plotly_chart(PAGE, "box", build_box, {"station": station, "event_type": event_type, "variable": box_var},
+             use_container_width=True)
 
 # --- Time window around event ---
 st.markdown("### Time window around the event")
 
-df_window = load_raw_for_window(event_date, days_before=days_before, days_after=days_after)
+if windows_future.done() and windows_future.exception() is None:
+    df_window = windows_future.result().window(event_start, days_before, days_after)
+else:
+    # prefetch chưa xong: đọc riêng cửa sổ này qua cache block tháng
+    df_window = load_raw_for_window(station, event_start, event_end,
+                                    days_before=days_before, days_after=days_after)
 
 if df_window.empty:
     st.warning("No raw data for selected window.")
 else:
     ts_vars = ["temp_out", "out_hum", "wind_speed", "bar"]
     tabs = st.tabs(ts_vars)
+    window_widgets = {
+        "station": station, "event_start": event_start, "event_end": event_end,
+        "days_before": days_before, "days_after": days_after,
+    }
+
+    def build_window(var):
+        fig_ts = px.line(
+            df_window,
+            x="timestamp",
+            y=var,
+            title=f"{var} around event",
+            labels={"timestamp": "Time", var: var},
+        )
+        # highlight the episode (start 00:00 -> end + 1 day)
+        # Use add_shape instead of add_vrect to avoid Timestamp arithmetic issues
+        y_max = df_window[var].max()
+        fig_ts.add_shape(
+            type="rect",
+            x0=event_start,
+            x1=event_end + pd.Timedelta(days=1),
+            y0=0,
+            y1=1,
+            yref="paper",
+            fillcolor="red",
+            opacity=0.12,
+            line=dict(dash="dash", color="red", width=1),
+        )
+        # Add annotation for event start
+        fig_ts.add_annotation(
+            x=event_start,
+            y=y_max,
+            yref="y",
+            text="Event",
+            showarrow=True,
+            arrowhead=2,
+            arrowcolor="red",
+            bgcolor="white",
+            bordercolor="red",
+        )
+        return fig_ts
+
     for var, tab in zip(ts_vars, tabs):
         with tab:
-            fig_ts = px.line(
-                df_window,
-                x="timestamp",
-                y=var,
-                title=f"{var} around event",
-                labels={"timestamp": "Time", var: var},
-            )
-            # highlight event day
-            # Use add_shape instead of add_vline to avoid Timestamp arithmetic issues
-            event_datetime = pd.to_datetime(event_date)
-            y_min = df_window[var].min()
-            y_max = df_window[var].max()
-            fig_ts.add_shape(
-                type="line",
-                x0=event_datetime,
-                x1=event_datetime,
-                y0=y_min,
-                y1=y_max,
-                yref="y",
-                line=dict(dash="dash", color="red", width=2),
-            )
-            # Add annotation for event day
-            fig_ts.add_annotation(
-                x=event_datetime,
-                y=y_max,
-                yref="y",
-                text="Event day",
-                showarrow=True,
-                arrowhead=2,
-                arrowcolor="red",
-                bgcolor="white",
-                bordercolor="red",
-            )
-            st.plotly_chart(fig_ts, use_container_width=True)
+            plotly_chart(PAGE, f"window {var}", lambda var=var: build_window(var), window_widgets,
+                         use_container_width=True)
 
 # --- Simple daily timeline marking all events of this type ---
 st.markdown("### All detected events of this type")
 
-fig_timeline = px.scatter(
-    df_daily,
-    x="date",
-    y="mean_temp",
-    color=df_daily[event_type].map({True: "event", False: "other"}),
-    size="total_rain",
-    title="Timeline with highlighted extreme days",
-    labels={"mean_temp": "Mean temp (°C)"},
-)
-st.plotly_chart(fig_timeline, use_container_width=True)
+def build_timeline():
+    return px.scatter(
+        df_daily,
+        x="date",
+        y="mean_temp",
+        color=df_daily[event_type].map({True: "event", False: "other"}),
+        size="total_rain",
+        title="Timeline with highlighted extreme days",
+        labels={"mean_temp": "Mean temp (°C)"},
+    )
+
+plotly_chart(PAGE, "timeline", build_timeline, {"station": station, "event_type": event_type},
+             use_container_width=True)
@@ -0,0 +1,208 @@
+# app/pages/7_Trends.py
+
+import sys
+from pathlib import Path
+
+# Add project root to Python path for Streamlit Cloud
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from sqlalchemy import text
+
+from src.db_utils import get_engine
+from src.cache import bounded_cache
+from src.constants import TREND_VARIABLES, TREND_WINDOWS
+from src.page_loader import PageLoader
+from src.station_picker import select_station
+
+st.set_page_config(
+    page_title="Trends",
+    page_icon="📈",
+    layout="wide",
+)
+
+VARIABLE_LABELS = {
+    "mean_temp": "Mean temperature (°C)",
+    "max_temp": "Max temperature (°C)",
+    "min_temp": "Min temperature (°C)",
+    "total_rain": "Rainfall (mm)",
+    "mean_wind_speed": "Mean wind speed (m/s)",
+    "max_wind_speed": "Max wind speed (m/s)",
+    "mean_humidity": "Mean humidity (%)",
+    "mean_pressure": "Mean pressure (mb)",
+}
+
+@bounded_cache()
+def load_daily_variable(station_id, variable):
+    engine = get_engine()
+    q = f"SELECT date, {variable} AS value FROM weather_daily WHERE station_id = :s ORDER BY date;"
+    return pd.read_sql(text(q), engine, params={"s": station_id}, parse_dates=["date"])
+
+@bounded_cache()
+def load_trends(station_id, variable):
+    """Rolling stats đã tính sẵn (etl_build_trends.py), mọi window của một biến."""
+    engine = get_engine()
+    q = """
+        SELECT date, window_days, roll_mean, roll_sum, roll_max, roll_min
+        FROM weather_trends
+        WHERE station_id = :s AND variable = :v
+        ORDER BY window_days, date
+    """
+    return pd.read_sql(text(q), engine, params={"s": station_id, "v": variable}, parse_dates=["date"])
+
+@bounded_cache()
+def load_loess(station_id, variable):
+    engine = get_engine()
+    q = "SELECT date, loess FROM weather_loess WHERE station_id = :s AND variable = :v ORDER BY date"
+    return pd.read_sql(text(q), engine, params={"s": station_id, "v": variable}, parse_dates=["date"])
+
+st.title("📈 Trends & Long-term Changes")
+
+station, _ = select_station()
+
+with st.sidebar:
+    st.header("Trend settings")
+    variable = st.selectbox(
+        "Variable",
+        TREND_VARIABLES,
+        format_func=lambda v: VARIABLE_LABELS.get(v, v),
+    )
+    windows = st.multiselect(
+        "Rolling windows (days)",
+        list(TREND_WINDOWS),
+        default=[30, 365],
+    )
+    show_daily = st.checkbox("Show daily values", value=False)
+
+loader = PageLoader()
+loader.submit("daily", load_daily_variable, station, variable)
+loader.submit("trends", load_trends, station, variable)
+loader.submit("loess", load_loess, station, variable)
+
+df_trends = loader.result("trends")
+if df_trends.empty:
+    st.warning("No trend data available. Run `python db/etl_build_trends.py` first.")
+    st.stop()
+
+df_daily = loader.result("daily")
+df_loess = loader.result("loess")
+label = VARIABLE_LABELS.get(variable, variable)
+by_window = {w: g for w, g in df_trends.groupby("window_days")}
+
+# ---------- Rolling means + LOESS ----------
+
+st.subheader("Rolling averages and LOESS trend")
+
+fig = go.Figure()
+if show_daily:
+    fig.add_trace(go.Scattergl(
+        x=df_daily["date"], y=df_daily["value"], mode="markers",
+        marker=dict(size=2, color="lightgray"), name="Daily",
+    ))
+for w in windows:
+    g = by_window[w]
+    fig.add_trace(go.Scatter(x=g["date"], y=g["roll_mean"], mode="lines", name=f"{w}-day mean"))
+if not df_loess.empty:
+    fig.add_trace(go.Scatter(
+        x=df_loess["date"], y=df_loess["loess"], mode="lines",
+        line=dict(color="black", width=3), name="LOESS",
+    ))
+fig.update_layout(height=450, yaxis_title=label, xaxis_title="Date")
+st.plotly_chart(fig, use_container_width=True)
+
+# ---------- Rolling extremes ----------
+
+col_ext, col_sum = st.columns(2)
+
+with col_ext:
+    ext_window = st.selectbox("Extremes window (days)", list(TREND_WINDOWS), index=len(TREND_WINDOWS) - 1)
+    g = by_window[ext_window]
+    fig_ext = go.Figure()
+    fig_ext.add_trace(go.Scatter(
+        x=g["date"], y=g["roll_max"], mode="lines", line=dict(width=0),
+        showlegend=False, hoverinfo="skip",
+    ))
+    fig_ext.add_trace(go.Scatter(
+        x=g["date"], y=g["roll_min"], mode="lines", line=dict(width=0),
+        fill="tonexty", fillcolor="rgba(99,110,250,0.25)", name=f"{ext_window}-day min–max",
+    ))
+    fig_ext.add_trace(go.Scatter(x=g["date"], y=g["roll_max"], mode="lines", name=f"{ext_window}-day max"))
+    fig_ext.add_trace(go.Scatter(x=g["date"], y=g["roll_min"], mode="lines", name=f"{ext_window}-day min"))
+    fig_ext.update_layout(title="Rolling extremes", yaxis_title=label, height=380)
+    st.plotly_chart(fig_ext, use_container_width=True)
+
+with col_sum:
+    # running totals chỉ có ý nghĩa với biến cộng dồn (rain); biến khác hiện mean
+    if variable == "total_rain":
+        fig_sum = px.line(
+            df_trends,
+            x="date",
+            y="roll_sum",
+            color="window_days",
+            title="Running rainfall totals",
+            labels={"date": "Date", "roll_sum": "Rain (mm)", "window_days": "Window (days)"},
+        )
+    else:
+        g = by_window[max(TREND_WINDOWS)]
+        anomaly = g["roll_mean"] - g["roll_mean"].mean()
+        fig_sum = px.bar(
+            x=g["date"],
+            y=anomaly,
+            title=f"{max(TREND_WINDOWS)}-day mean vs long-term mean",
+            labels={"x": "Date", "y": "Anomaly"},
+        )
+    fig_sum.update_layout(height=380)
+    st.plotly_chart(fig_sum, use_container_width=True)
+
+# ---------- Multi-year changes ----------
+
+st.subheader("Multi-year changes")
+
+yearly = (
+    df_daily.assign(year=df_daily["date"].dt.year)
+    .groupby("year")["value"]
+    .agg(["mean", "min", "max", "count"])
+    .reset_index()
+)
+# năm thiếu quá nhiều ngày làm lệch trung bình
+yearly = yearly[yearly["count"] >= 300]
+
+if len(yearly) < 2:
+    st.info("Not enough complete years for multi-year comparison.")
+else:
+    agg = "sum" if variable == "total_rain" else "mean"
+    if agg == "sum":
+        yearly["mean"] = yearly["mean"] * 365
+    baseline = yearly["mean"].iloc[: max(1, len(yearly) // 3)].mean()
+    yearly["change"] = yearly["mean"] - baseline
+
+    c1, c2 = st.columns([2, 1])
+    with c1:
+        fig_y = px.bar(
+            yearly,
+            x="year",
+            y="change",
+            color="change",
+            color_continuous_scale="RdBu_r" if variable != "total_rain" else "BrBG",
+            title="Annual value vs early-period baseline",
+            labels={"year": "Year", "change": "Change"},
+        )
+        st.plotly_chart(fig_y, use_container_width=True)
+    with c2:
+        first, last = yearly.iloc[0], yearly.iloc[-1]
+        n_years = last["year"] - first["year"]
+        slope = np.polyfit(yearly["year"], yearly["mean"], 1)[0]
+        st.metric("Linear trend per decade", f"{slope * 10:+.2f}")
+        st.metric(f"{int(first['year'])} → {int(last['year'])}", f"{last['mean']:.1f}",
+                  delta=f"{last['mean'] - first['mean']:+.1f} over {int(n_years)} years")
+        st.caption("Yearly " + ("total" if agg == "sum" else "mean") + " for years with ≥ 300 days of data.")
+
+with st.expander("Query timings"):
+    st.caption(f"Page run time: {loader.elapsed:.2f}s (queries run concurrently)")
+    st.dataframe(loader.timings(), hide_index=True)
@@ -0,0 +1,90 @@
+# bench/import_time.py
+"""
+Cold-start import benchmark cho các page Streamlit và ETL script.
+
+Với mỗi file, các câu lệnh import ở top-level được chạy trong một process
+Python mới với `-X importtime`; tổng cumulative time của các module top-level
+được so với IMPORT_TIME_BUDGET_S. Exit code 1 nếu có file vượt budget.
+
+    python bench/import_time.py                  # mọi page + ETL script
+    python bench/import_time.py app/pages/4_DimensionalityReduction.py --repeat 5
+"""
+
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.constants import IMPORT_TIME_BUDGET_S  # noqa: E402
+
+DEFAULT_TARGETS = ["app/Home.py", "app/pages/*.py", "db/*.py"]
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_statements(path: Path) -> str:
+    """Các import ở top-level của file (bỏ qua import trong hàm / nhánh)."""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    nodes = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(n) for n in nodes)
+
+
+def measure(code: str, skip: frozenset = frozenset()) -> tuple[float, list[tuple[str, float]]]:
+    """(tổng giây, [(module top-level, giây)]) của một lần chạy cold; bỏ qua module trong skip."""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    top = []
+    for m in LINE.finditer(proc.stderr):
+        _, cumulative, indent, name = m.groups()
+        # module không thụt lề = được import trực tiếp từ file
+        if len(indent) <= 1 and name not in skip:
+            top.append((name, int(cumulative) / 1e6))
+    return sum(s for _, s in top), top
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("targets", nargs="*", help="files / glob patterns relative to the project root")
+    parser.add_argument("--budget", type=float, default=IMPORT_TIME_BUDGET_S, help="seconds per file")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per file, the fastest one counts")
+    parser.add_argument("--top", type=int, default=3, help="slowest imports to list per file")
+    args = parser.parse_args(argv)
+
+    # module interpreter tự import lúc khởi động (site, encodings, ...) không tính
+    startup = frozenset(name for name, _ in measure("pass")[1])
+
+    files = sorted({p for pattern in (args.targets or DEFAULT_TARGETS)
+                    for p in PROJECT_ROOT.glob(pattern)})
+    failed = []
+    for path in files:
+        code = import_statements(path)
+        rel = path.relative_to(PROJECT_ROOT)
+        try:
+            total, top = min((measure(code, startup) for _ in range(args.repeat)), key=lambda r: r[0])
+        except RuntimeError as exc:
+            print(f"ERROR {rel}: {exc}")
+            failed.append(rel)
+            continue
+        over = total > args.budget
+        if over:
+            failed.append(rel)
+        slow = ", ".join(f"{n} {s:.2f}s" for n, s in sorted(top, key=lambda t: -t[1])[: args.top])
+        print(f"{'OVER' if over else 'ok  '} {total:6.2f}s  {rel}  ({slow})")
+
+    print(f"\nbudget {args.budget:.2f}s per file: {len(files) - len(failed)}/{len(files)} within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# bench/read_sql.py
+"""
+Benchmark đọc kết quả query lớn: pd.read_sql vs read_sql_arrow (COPY + Arrow).
+
+Mỗi cách đọc chạy --repeat lần, lần nhanh nhất được tính; in thời gian,
+rows/s, bộ nhớ DataFrame kết quả và speedup so với pd.read_sql. Exit code 1
+nếu speedup < --min-speedup. Cần DATABASE_URL trỏ tới Postgres đã chạy ETL.
+
+    python bench/read_sql.py                     # SELECT * FROM weather_raw
+    python bench/read_sql.py --query "SELECT * FROM weather_daily" --repeat 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from src.constants import ARROW_CHUNK_ROWS  # noqa: E402
+from src.db_utils import get_engine, iter_sql_arrow, read_sql_arrow  # noqa: E402
+
+DEFAULT_QUERY = "SELECT * FROM weather_raw ORDER BY timestamp"
+
+
+def best_of(repeat: int, func) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per reader, the fastest one counts")
+    parser.add_argument("--chunk-rows", type=int, default=ARROW_CHUNK_ROWS)
+    parser.add_argument("--min-speedup", type=float, default=3.0)
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    readers = {
+        "pd.read_sql": lambda: pd.read_sql(text(args.query), engine),
+        "read_sql_arrow": lambda: read_sql_arrow(args.query, engine=engine),
+        # out-of-core: chỉ đếm dòng, không giữ cả kết quả
+        "iter_sql_arrow": lambda: sum(
+            len(c) for c in iter_sql_arrow(args.query, engine=engine, chunk_rows=args.chunk_rows)
+        ),
+    }
+
+    print(f"query: {args.query}")
+    results = {}
+    for name, func in readers.items():
+        seconds, out = best_of(args.repeat, func)
+        rows = out if isinstance(out, int) else len(out)
+        mem = "" if isinstance(out, int) else f"  {out.memory_usage(deep=True).sum() / 1024 ** 2:8.1f} MB"
+        results[name] = seconds
+        print(f"{name:<15} {seconds:7.2f}s  {rows / seconds:>12,.0f} rows/s{mem}")
+
+    speedup = results["pd.read_sql"] / results["read_sql_arrow"]
+    print(f"\nspeedup read_sql_arrow vs pd.read_sql: {speedup:.1f}x (target {args.min_speedup:.1f}x)")
+    return 0 if speedup >= args.min_speedup else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# db/etl_build_climatology.py
+
+import pandas as pd
+from sqlalchemy import text
+from src.db_utils import get_engine, bump_dataset_version, read_sql_arrow, bulk_insert, truncate_tables
+from src.climatology import daily_climatology, diurnal_climatology
+from src.constants import CLIM_DAILY_FEATURES, CLIM_RAW_VARIABLES
+from src.stations import list_stations, map_stations
+
+def build_station(station_id: str):
+    engine = get_engine()
+
+    daily = pd.read_sql(
+        text(f"SELECT date, {', '.join(CLIM_DAILY_FEATURES)} FROM weather_daily "
+             "WHERE station_id = :s ORDER BY date;"),
+        engine,
+        params={"s": station_id},
+        parse_dates=["date"],
+    )
+    raw = read_sql_arrow(
+        f"SELECT month, hour, {', '.join(CLIM_RAW_VARIABLES)} FROM weather_raw WHERE station_id = :s;",
+        {"s": station_id},
+        engine,
+    )
+
+    # Normals theo day-of-year (smoothed) và theo hour x month
+    clim_daily = daily_climatology(daily)
+    clim_diurnal = diurnal_climatology(raw)
+    clim_daily.insert(0, "station_id", station_id)
+    clim_diurnal.insert(0, "station_id", station_id)
+    return clim_daily, clim_diurnal
+
+def main():
+    engine = get_engine()
+    stations = list_stations(engine)
+
+    with engine.begin() as conn:
+        truncate_tables(conn, "weather_clim_daily", "weather_clim_diurnal")
+
+    for station_id, (clim_daily, clim_diurnal) in map_stations(build_station, stations):
+        bulk_insert(clim_daily, "weather_clim_daily", engine)
+        bulk_insert(clim_diurnal, "weather_clim_diurnal", engine)
+
+        print(f"Inserted {len(clim_daily)} rows into weather_clim_daily ({station_id})")
+        print(f"Inserted {len(clim_diurnal)} rows into weather_clim_diurnal ({station_id})")
+    bump_dataset_version(engine)
+
+if __name__ == "__main__":
+    main()
@@ -2,32 +2,75 @@
 
 import pandas as pd
 from sqlalchemy import text
-from src.db_utils import get_engine
-from src.preprocessing import aggregate_daily, label_extremes
+from src.db_utils import get_engine, bump_dataset_version, read_sql_arrow, bulk_insert, truncate_tables
+from src.preprocessing import aggregate_daily, label_extremes, condition_codes
+from src.constants import EXTREME_VALUES, EXTREME_QUANTILES, TREND_VARIABLES
+from src.sketches import load_sketches, save_sketches, update_sketches, new_days, thresholds
+from src.stations import list_stations, map_stations
+from src.trends import first_changed_date, invalidate_trends
 
-def main():
+def build_station(station_id: str):
+    """weather_daily + quantile sketches của một trạm (chạy trong worker process)."""
     engine = get_engine()
 
     # Load từ weather_raw với các cột cần thiết
     query = """
         SELECT
-          timestamp, date, year, month, season,
+          station_id, timestamp, date, year, month, season,
           temp_out, out_hum, wind_speed,
           bar, solar_rad, rain
         FROM weather_raw
-        WHERE timestamp IS NOT NULL;
+        WHERE station_id = :s AND timestamp IS NOT NULL;
     """
-    df = pd.read_sql(query, engine, parse_dates=["timestamp"])
+    # toàn bộ weather_raw của trạm: đọc qua COPY + Arrow thay vì pd.read_sql
+    df = read_sql_arrow(query, {"s": station_id}, engine, parse_dates=["timestamp"])
 
     daily = aggregate_daily(df)
-    daily = label_extremes(daily)
+
+    # Quantile sketches: chỉ đưa các ngày mới vào, không quét lại toàn bộ lịch sử
+    sketches, last_date = load_sketches(engine, station_id)
+    if last_date is not None and pd.Timestamp(daily["date"].max()) < pd.Timestamp(last_date):
+        sketches, last_date = {}, None  # dữ liệu bị load lại từ đầu -> build lại
+    fresh = new_days(daily, last_date)
+    if not fresh.empty:
+        update_sketches(sketches, fresh)
+        # ngày cuối (có thể còn dở) chưa vào sketch -> lần sau được thêm lại
+        last_date = fresh["date"].max()
+
+    # trạm mới chỉ có một ngày: chưa có sketch, label_extremes tính trực tiếp
+    thr = thresholds(sketches, {
+        EXTREME_VALUES[t][0]: q for t, q in EXTREME_QUANTILES.items()
+    }) if sketches else {}
+    daily = label_extremes(daily, thresholds=thr)
+    daily["condition_code"] = condition_codes(daily)
+    return daily, sketches, last_date, len(fresh)
+
+def main():
+    engine = get_engine()
+    stations = list_stations(engine)
+
+    # bản cũ để biết trend từ ngày nào không còn đúng
+    old = pd.read_sql(text(f"SELECT station_id, date, {', '.join(TREND_VARIABLES)} FROM weather_daily;"),
+                      engine, parse_dates=["date"])
 
     with engine.begin() as conn:
-        # CASCADE để truncate cả weather_embeddings (có FK reference)
-        conn.execute(text("TRUNCATE TABLE weather_daily CASCADE;"))
-    daily.to_sql("weather_daily", engine, if_exists="append", index=False)
+        # cascade để xoá cả weather_embeddings / weather_serving (có FK reference)
+        truncate_tables(conn, "weather_daily", cascade=True)
+
+    for station_id, (daily, sketches, last_date, n_fresh) in map_stations(build_station, stations):
+        if n_fresh:
+            save_sketches(engine, sketches, last_date, station_id)
+        bulk_insert(daily, "weather_daily", engine)
+        print(f"Inserted {len(daily)} rows into weather_daily ({station_id}, "
+              f"{n_fresh} new days in quantile sketches)")
+
+        changed = first_changed_date(old[old["station_id"] == station_id], daily)
+        if changed is not None:
+            with engine.begin() as conn:
+                invalidate_trends(conn, station_id, changed)
+            print(f"weather_trends of {station_id} invalidated from {changed:%Y-%m-%d}")
 
-    print(f"Inserted {len(daily)} rows into weather_daily")
+    bump_dataset_version(engine)
 
 if __name__ == "__main__":
     main()
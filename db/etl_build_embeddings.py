@@ -2,14 +2,38 @@
 
 import pandas as pd
 from sqlalchemy import text
-from src.db_utils import get_engine
+from src.db_utils import get_engine, bump_dataset_version, bulk_insert, truncate_tables
 from src.dim_reduction import prepare_matrix, run_pca, run_tsne, run_umap
 from src.clustering import kmeans_clusters
+from src.analogs import AnalogIndex, dataset_version
+from src.feature_store import station_root, write_store
+from src.constants import ANALOG_SPACES
+from src.constants import CLUSTER_KS, DEFAULT_CLUSTER_K, EMBEDDINGS_MIN_DAYS
+from src.preprocessing import condition_codes
+from src.stations import list_stations, map_stations
 
-def main():
+# Các cột của weather_daily được copy sang weather_serving
+SERVING_DAILY_COLS = [
+    "mean_temp", "max_temp", "min_temp", "temp_range",
+    "mean_humidity", "humidity_range",
+    "total_rain",
+    "mean_wind_speed", "max_wind_speed",
+    "mean_pressure", "pressure_range",
+    "mean_solar",
+]
+
+def build_station(station_id: str):
+    """
+    Embeddings + serving rows của một trạm (chạy trong worker process), None
+    nếu trạm có ít hơn EMBEDDINGS_MIN_DAYS ngày hợp lệ.
+    Feature store và analog index là file riêng của trạm nên được ghi luôn ở đây.
+    """
     engine = get_engine()
 
-    daily = pd.read_sql("SELECT * FROM weather_daily ORDER BY date;", engine)
+    daily = pd.read_sql(
+        text("SELECT * FROM weather_daily WHERE station_id = :s ORDER BY date;"),
+        engine, params={"s": station_id},
+    )
 
     X_scaled, features, scaler, valid_mask = prepare_matrix(daily)
     
@@ -18,8 +42,13 @@ def main():
     
     n_dropped = (~valid_mask).sum()
     if n_dropped > 0:
-        print(f"Warning: Dropped {n_dropped} rows with NaN values (out of {len(daily)} total)")
-    print(f"Processing {len(daily_clean)} rows for embeddings")
+        print(f"Warning: Dropped {n_dropped} rows with NaN values (out of {len(daily)} total, {station_id})")
+    if len(daily_clean) < EMBEDDINGS_MIN_DAYS:
+        # trạm mới (vd. vừa được ingest thêm): chưa đủ ngày cho PCA / t-SNE,
+        # không được làm hỏng lượt build của các trạm khác
+        print(f"Skipping {station_id}: {len(daily_clean)} valid days < {EMBEDDINGS_MIN_DAYS}")
+        return None
+    print(f"Processing {len(daily_clean)} rows for embeddings ({station_id})")
 
     # PCA
     pca, X_pca = run_pca(X_scaled, n_components=3)
@@ -30,10 +59,15 @@ def main():
     # UMAP
     _, X_umap = run_umap(X_scaled, n_components=2)
 
-    # Clustering trên PCA (hoặc X_scaled)
-    _, labels = kmeans_clusters(X_pca[:, :2], n_clusters=4)
+    # Clustering trên PCA (hoặc X_scaled), một lần cho mỗi k
+    clusters = {
+        k: kmeans_clusters(X_pca[:, :2], n_clusters=k)[1]
+        for k in CLUSTER_KS
+    }
+    labels = clusters[DEFAULT_CLUSTER_K]
 
     emb = pd.DataFrame({
+        "station_id": station_id,
         "date": daily_clean["date"],
         "pca1": X_pca[:, 0],
         "pca2": X_pca[:, 1],
@@ -45,31 +79,63 @@ def main():
         "cluster_kmeans": labels,
     })
 
-    # extreme_label (optional)
-    def label_row(row):
-        if row["rain_flag"]:
-            return "heavy_rain"
-        if row["wind_flag"]:
-            return "strong_wind"
-        return "normal"
-
-    daily_flags = daily_clean[["date", "rain_flag", "wind_flag"]].copy()
-    emb = emb.merge(daily_flags, on="date", how="left")
-    emb["extreme_label"] = emb.apply(label_row, axis=1)
+    # extreme_label đã được tính (vectorized) trong etl_build_daily
+    emb["extreme_label"] = daily_clean["extreme_label"].to_numpy()
 
-    # Drop helper flags before insert
     emb_to_db = emb[[
-        "date", "pca1", "pca2", "pca3",
+        "station_id", "date", "pca1", "pca2", "pca3",
         "tsne1", "tsne2",
         "umap1", "umap2",
         "cluster_kmeans", "extreme_label"
     ]]
 
+    # Serving table: embeddings + nhãn cho mọi k + daily attributes,
+    # để dashboard đọc bằng một scan không JOIN
+    serving = pd.concat([
+        daily_clean[["station_id", "date", "year", "month", "season"]],
+        emb_to_db.drop(columns=["station_id", "date"]),
+        pd.DataFrame({f"cluster_k{k}": clusters[k] for k in CLUSTER_KS}),
+        pd.DataFrame({"condition_code": condition_codes(daily_clean)}),
+        daily_clean[SERVING_DAILY_COLS],
+    ], axis=1)
+
+    # Memory-mapped store: features đã scale + toạ độ + nhãn, dùng chung giữa các process
+    version = dataset_version(daily_clean["date"], X_scaled)
+    store_dir = write_store(
+        version,
+        daily_clean["date"],
+        X_scaled,
+        features,
+        scaler,
+        coords={c: emb[c].to_numpy() for c in ["pca1", "pca2", "pca3", "tsne1", "tsne2", "umap1", "umap2"]},
+        labels={f"cluster_k{k}": clusters[k] for k in CLUSTER_KS},
+        root=station_root(station_id),
+    )
+    print(f"Wrote feature store {store_dir}")
+
+    # Analog-day KD-tree, persist một lần cho mỗi version của dataset
+    for space in ANALOG_SPACES:
+        index = AnalogIndex.build(daily, space, station_id)
+        index.save()
+        print(f"Saved analog index ({station_id}, {space}, version {index.version}, {len(index)} days)")
+    return emb_to_db, serving
+
+def main():
+    engine = get_engine()
+    stations = list_stations(engine)
+
     with engine.begin() as conn:
-        conn.execute(text("TRUNCATE TABLE weather_embeddings;"))
-    emb_to_db.to_sql("weather_embeddings", engine, if_exists="append", index=False)
+        truncate_tables(conn, "weather_embeddings", "weather_serving")
 
-    print(f"Inserted {len(emb_to_db)} rows into weather_embeddings")
+    # PCA / t-SNE / UMAP / KMeans fit riêng cho từng trạm, song song theo trạm
+    for station_id, result in map_stations(build_station, stations):
+        if result is None:
+            continue
+        emb, serving = result
+        bulk_insert(emb, "weather_embeddings", engine)
+        bulk_insert(serving, "weather_serving", engine)
+        print(f"Inserted {len(emb)} rows into weather_embeddings / weather_serving ({station_id})")
+    bump_dataset_version(engine)
 
 if __name__ == "__main__":
     main()
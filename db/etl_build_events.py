@@ -0,0 +1,36 @@
+# db/etl_build_events.py
+
+import pandas as pd
+from sqlalchemy import text
+from src.db_utils import get_engine, bump_dataset_version, bulk_insert, truncate_tables
+from src.events import build_events
+from src.stations import list_stations, map_stations
+
+def build_station(station_id: str) -> pd.DataFrame:
+    engine = get_engine()
+
+    daily = pd.read_sql(
+        text("SELECT * FROM weather_daily WHERE station_id = :s ORDER BY date;"),
+        engine, params={"s": station_id}, parse_dates=["date"],
+    )
+
+    # Gộp ngày extreme liên tiếp thành episode + return period (GEV trên annual maxima)
+    events = build_events(daily)
+    events.insert(0, "station_id", station_id)
+    return events
+
+def main():
+    engine = get_engine()
+    stations = list_stations(engine)
+
+    with engine.begin() as conn:
+        truncate_tables(conn, "weather_events", restart_identity=True)
+
+    for station_id, events in map_stations(build_station, stations):
+        bulk_insert(events, "weather_events", engine)
+        print(f"Inserted {len(events)} rows into weather_events ({station_id})")
+        print(events.groupby("event_type").size().to_string())
+    bump_dataset_version(engine)
+
+if __name__ == "__main__":
+    main()
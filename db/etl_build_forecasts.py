@@ -0,0 +1,44 @@
+# db/etl_build_forecasts.py
+
+import pandas as pd
+from sqlalchemy import text
+from src.db_utils import get_engine, bump_dataset_version, bulk_insert, truncate_tables
+from src.constants import FORECAST_VARIABLES
+from src.forecasting import build_forecasts
+from src.stations import list_stations, map_stations
+
+def build_station(station_id: str):
+    engine = get_engine()
+
+    daily = pd.read_sql(
+        text(f"SELECT date, {', '.join(FORECAST_VARIABLES)} FROM weather_daily "
+             "WHERE station_id = :s ORDER BY date;"),
+        engine,
+        params={"s": station_id},
+        parse_dates=["date"],
+    )
+
+    # Dự báo lead 1..6 cho mọi ngày trong một batch + skill trên hold-out
+    forecasts, skill = build_forecasts(daily)
+    forecasts.insert(0, "station_id", station_id)
+    skill.insert(0, "station_id", station_id)
+    return forecasts, skill
+
+def main():
+    engine = get_engine()
+    stations = list_stations(engine)
+
+    with engine.begin() as conn:
+        truncate_tables(conn, "weather_forecasts", "weather_forecast_skill")
+
+    for station_id, (forecasts, skill) in map_stations(build_station, stations):
+        bulk_insert(forecasts, "weather_forecasts", engine)
+        bulk_insert(skill, "weather_forecast_skill", engine)
+
+        print(f"Inserted {len(forecasts)} rows into weather_forecasts ({station_id})")
+        print(skill.pivot(index="lead_days", columns="variable", values="skill_vs_climatology")
+                   .round(2).to_string())
+    bump_dataset_version(engine)
+
+if __name__ == "__main__":
+    main()
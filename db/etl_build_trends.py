@@ -0,0 +1,74 @@
+# db/etl_build_trends.py
+
+import pandas as pd
+from sqlalchemy import text
+from src.db_utils import get_engine, bump_dataset_version, bulk_insert, truncate_tables
+from src.constants import TREND_VARIABLES
+from src.trends import compute_trends, context_start, build_loess
+from src.stations import list_stations, map_stations
+
+def build_station(station_id: str):
+    """
+    (trends, loess, last_trend) của một trạm; last_trend = None nghĩa là trends
+    được tính lại từ đầu (bản cũ của trạm phải xoá trước khi ghi).
+    """
+    engine = get_engine()
+    params = {"s": station_id}
+
+    cols = ", ".join(TREND_VARIABLES)
+    bounds = pd.read_sql(
+        text("SELECT (SELECT MAX(date) FROM weather_trends WHERE station_id = :s) AS last_trend, "
+             "(SELECT MAX(date) FROM weather_daily WHERE station_id = :s) AS last_daily;"),
+        engine, params=params,
+    ).iloc[0]
+    # SQLite trả về chuỗi, Postgres / DuckDB trả về date
+    last_trend, last_daily = (
+        pd.Timestamp(bounds[c]) if pd.notna(bounds[c]) else None for c in ("last_trend", "last_daily")
+    )
+
+    # weather_daily bị build lại ngắn hơn -> tính lại từ đầu
+    if last_trend is not None and (last_daily is None or last_daily < last_trend):
+        last_trend = None
+
+    full_q = text(f"SELECT date, {cols} FROM weather_daily WHERE station_id = :s ORDER BY date;")
+    if last_trend is None:
+        daily = pd.read_sql(full_q, engine, params=params, parse_dates=["date"])
+        trends = compute_trends(daily)
+    else:
+        # chỉ đọc lại context đủ cho cửa sổ dài nhất trước ngày mới
+        daily = pd.read_sql(
+            text(f"SELECT date, {cols} FROM weather_daily "
+                 "WHERE station_id = :s AND date >= :d ORDER BY date;"),
+            engine, params={**params, "d": context_start(last_trend).date()}, parse_dates=["date"],
+        )
+        trends = compute_trends(daily, since=last_trend)
+
+    # LOESS là fit toàn cục trên dữ liệu đã gom bin -> rẻ, build lại mỗi lần
+    full = daily if last_trend is None else pd.read_sql(full_q, engine, params=params, parse_dates=["date"])
+    loess = build_loess(full)
+
+    trends.insert(0, "station_id", station_id)
+    loess.insert(0, "station_id", station_id)
+    return trends, loess, last_trend
+
+def main():
+    engine = get_engine()
+    stations = list_stations(engine)
+
+    with engine.begin() as conn:
+        truncate_tables(conn, "weather_loess")
+
+    for station_id, (trends, loess, last_trend) in map_stations(build_station, stations):
+        if last_trend is None:
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM weather_trends WHERE station_id = :s;"), {"s": station_id})
+        bulk_insert(trends, "weather_trends", engine)
+        print(f"Inserted {len(trends)} rows into weather_trends ({station_id}"
+              + (")" if last_trend is None else f", days after {last_trend})"))
+
+        bulk_insert(loess, "weather_loess", engine)
+        print(f"Inserted {len(loess)} rows into weather_loess ({station_id})")
+    bump_dataset_version(engine)
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,33 @@
 # db/etl_load_raw.py
 
+import io
+
 import pandas as pd
 from sqlalchemy import text
-from src.db_utils import get_engine, execute_sql_file
-from src.preprocessing import parse_timestamp, clean_numeric
-from src.constants import PROJECT_ROOT
+from src.db_utils import get_engine, bump_dataset_version, execute_sql_file, bulk_insert, truncate_tables
+from src.preprocessing import raw_rows
+from src.constants import PROJECT_ROOT, RAW_DIR, STATION_CSV_MARKER
+from src.ingest import save_offsets
+from src.stations import map_stations, station_files, station_name
 
-RAW_CSV_PATH = PROJECT_ROOT / "data" / "raw" / "Bradford_Weather_Data.csv"
 SCHEMA_SQL_PATH = PROJECT_ROOT / "db" / "schema.sql"
 
-# Tất cả cột numeric (mọi thứ trừ Date, Time, Wind_Dir)
-NUMERIC_COLS = [
-    "Temp_Out", "Hi_Temp", "Low_Temp",
-    "Out_Hum", "Dew_Pt",
-    "Wind_Speed", "Wind_Run", "Hi_Speed", "Hi_Dir",
-    "Wind_Chill", "Heat_Index", "THW_Index", "THSW_Index",
-    "Bar  ", "Rain", "Rain_Rate",
-    "Solar_Rad", "Solar_Energy", "Hi Solar_Rad",
-    "UV_Index", "UV_Dose", "Hi_UV",
-    "Heat_D-D", "Cool_D-D",
-    "In_Temp", "In_Hum", "In_Dew", "In_Heat", "In_EMC", "InAir_Density",
-    "ET ", "Wind_Samp", "Wind_Tx", "ISS_Recept", "Arc_Int",
-]
+def load_station_csv(station_id: str):
+    """
+    Các file CSV của một trạm -> (dòng weather_raw, offsets) (chạy trong worker
+    process). Mỗi file được đọc một lần dưới dạng bytes, offset = số byte tới
+    hết dòng hoàn chỉnh cuối cùng, để etl_watch_raw.py nạp tiếp từ đó.
+    """
+    frames, offsets = [], []
+    for path in station_files()[station_id]:
+        data = path.read_bytes()
+        end = data.rfind(b"\n") + 1
+        frames.append(raw_rows(pd.read_csv(io.BytesIO(data[:end])), station_id))
+        offsets.append((path.name, station_id, end))
+    if len(frames) == 1:
+        return frames[0], offsets
+    # các bản export của logger có thể chồng lên nhau: giữ bản mới nhất
+    return pd.concat(frames, ignore_index=True).drop_duplicates("timestamp", keep="last"), offsets
 
 def main():
     engine = get_engine()
@@ -29,84 +35,34 @@ def main():
     # Tạo schema
     execute_sql_file(engine, str(SCHEMA_SQL_PATH))
 
-    # Load CSV
-    df = pd.read_csv(RAW_CSV_PATH)
-
-    # Parse timestamp + thêm year/month/day/hour/season
-    df = parse_timestamp(df, date_col="Date", time_col="Time")
-    df = clean_numeric(df, NUMERIC_COLS)
-
-    # Chuẩn hoá tên cột theo schema
-    rename_map = {
-        "Temp_Out": "temp_out",
-        "Hi_Temp": "hi_temp",
-        "Low_Temp": "low_temp",
-        "Out_Hum": "out_hum",
-        "Dew_Pt": "dew_pt",
-
-        "Wind_Speed": "wind_speed",
-        "Wind_Dir": "wind_dir",
-        "Wind_Run": "wind_run",
-        "Hi_Speed": "hi_speed",
-        "Hi_Dir": "hi_dir",
-
-        "Wind_Chill": "wind_chill",
-        "Heat_Index": "heat_index",
-        "THW_Index": "thw_index",
-        "THSW_Index": "thsw_index",
-
-        "Bar  ": "bar",
-        "Rain": "rain",
-        "Rain_Rate": "rain_rate",
-
-        "Solar_Rad": "solar_rad",
-        "Solar_Energy": "solar_energy",
-        "Hi Solar_Rad": "hi_solar_rad",
+    files = station_files()
+    if not files:
+        raise SystemExit(f"No *{STATION_CSV_MARKER}*.csv files in {RAW_DIR}")
 
-        "UV_Index": "uv_index",
-        "UV_Dose": "uv_dose",
-        "Hi_UV": "hi_uv",
-
-        "Heat_D-D": "heat_dd",
-        "Cool_D-D": "cool_dd",
-
-        "In_Temp": "in_temp",
-        "In_Hum": "in_hum",
-        "In_Dew": "in_dew",
-        "In_Heat": "in_heat",
-        "In_EMC": "in_emc",
-        "InAir_Density": "in_air_density",
-
-        "ET ": "et",
-        "Wind_Samp": "wind_samp",
-        "Wind_Tx": "wind_tx",
-        "ISS_Recept": "iss_recept",
-        "Arc_Int": "arc_int",
-    }
-    df = df.rename(columns=rename_map)
-
-    # Chọn đúng thứ sẽ insert vào weather_raw
-    cols_order = [
-        "timestamp", "date", "year", "month", "day", "hour", "season",
-        "temp_out", "hi_temp", "low_temp",
-        "out_hum", "dew_pt",
-        "wind_speed", "wind_dir", "wind_run", "hi_speed", "hi_dir",
-        "wind_chill", "heat_index", "thw_index", "thsw_index",
-        "bar", "rain", "rain_rate",
-        "solar_rad", "solar_energy", "hi_solar_rad",
-        "uv_index", "uv_dose", "hi_uv",
-        "heat_dd", "cool_dd",
-        "in_temp", "in_hum", "in_dew", "in_heat", "in_emc", "in_air_density",
-        "et", "wind_samp", "wind_tx", "iss_recept", "arc_int",
-    ]
-    df = df[cols_order]
-
-    # Đổ vào DB
+    # Đổ vào DB: full reload của mọi trạm
     with engine.begin() as conn:
-        conn.execute(text("TRUNCATE TABLE weather_raw RESTART IDENTITY;"))
-    df.to_sql("weather_raw", engine, if_exists="append", index=False)
-
-    print(f"Inserted {len(df)} rows into weather_raw")
+        truncate_tables(conn, "weather_raw", restart_identity=True)
+        truncate_tables(conn, "weather_stations", "ingest_offsets")
+        # full reload -> quantile sketches và rolling trends phải build lại từ đầu
+        conn.execute(text("DELETE FROM weather_sketches;"))
+        conn.execute(text("DELETE FROM weather_trends;"))
+    bulk_insert(pd.DataFrame({
+        "station_id": list(files),
+        "name": [station_name(s) for s in files],
+        "source_file": [paths[0].name for paths in files.values()],
+    }), "weather_stations", engine)
+
+    # Parse CSV song song theo trạm, trạm nào xong thì ghi trước
+    total = 0
+    for station_id, (df, offsets) in map_stations(load_station_csv, list(files)):
+        bulk_insert(df, "weather_raw", engine)
+        save_offsets(engine, offsets)
+        total += len(df)
+        print(f"Inserted {len(df)} rows into weather_raw ({station_id})")
+
+    print(f"Inserted {total} rows into weather_raw from {len(files)} stations "
+          f"(etl_watch_raw.py continues from the recorded file offsets)")
+    bump_dataset_version(engine)
 
 if __name__ == "__main__":
     main()
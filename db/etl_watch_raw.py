@@ -0,0 +1,48 @@
+# db/etl_watch_raw.py
+
+import argparse
+import time
+
+from src.db_utils import get_engine, bump_dataset_version, execute_sql_file, station_version_name
+from src.constants import PROJECT_ROOT, RAW_DIR, INGEST_POLL_S
+from src.ingest import ingest_once
+
+SCHEMA_SQL_PATH = PROJECT_ROOT / "db" / "schema.sql"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Watch data/raw and append new logger rows to weather_raw / weather_daily in micro-batches.")
+    parser.add_argument("--interval", type=float, default=INGEST_POLL_S, help="seconds between scans")
+    parser.add_argument("--once", action="store_true", help="run a single scan and exit")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    # CREATE IF NOT EXISTS: thêm ingest_offsets cho DB tạo từ schema cũ
+    execute_sql_file(engine, str(SCHEMA_SQL_PATH))
+    print(f"Watching {RAW_DIR} every {args.interval:g}s")
+
+    try:
+        while True:
+            started = time.monotonic()
+            stats, new_stations = ingest_once(engine)
+            if new_stations:
+                # danh sách trạm (load_stations) không thuộc trạm nào: bump version chung
+                version = bump_dataset_version(engine)
+                print(f"Registered stations {', '.join(new_stations)}, dataset version -> {version}")
+            # chỉ bump version của trạm vừa nhận dữ liệu: cache của các trạm khác
+            # (BoundedCache, figure cache, cache đĩa dùng chung) vẫn dùng được;
+            # dashboard thấy version mới sau tối đa DATASET_VERSION_TTL_S
+            for station_id, (n_raw, n_days) in stats.items():
+                version = bump_dataset_version(engine, station_version_name(station_id))
+                print(f"Appended {n_raw} rows into weather_raw, updated {n_days} days "
+                      f"in weather_daily ({station_id}, version -> {version})")
+            if stats:
+                print(f"Batch done in {time.monotonic() - started:.2f}s")
+            if args.once:
+                break
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print("Stopped")
+
+if __name__ == "__main__":
+    main()
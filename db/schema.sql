@@ -1,5 +1,19 @@
 -- db/schema.sql
 -- OPTION 1: tất cả attributes của Bradford Weather Data là cột
+-- Mọi bảng dữ liệu có station_id: mỗi trạm là một file CSV trong data/raw
+-- (src/stations.py), ETL chạy song song theo trạm
+
+---------------------------------------------------------
+-- BẢNG 0: STATIONS
+-- Được ghi bởi etl_load_raw.py (một dòng cho mỗi file CSV)
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS weather_stations (
+    station_id      VARCHAR(32) PRIMARY KEY,   -- Bradford_Weather_Data.csv -> 'bradford'
+    name            VARCHAR(64) NOT NULL,
+    source_file     VARCHAR(255)
+);
+
 
 ---------------------------------------------------------
 -- BẢNG 1: RAW 30-MIN DATA
@@ -7,6 +21,7 @@
 
 CREATE TABLE IF NOT EXISTS weather_raw (
     id              SERIAL PRIMARY KEY,
+    station_id      VARCHAR(32) NOT NULL,
 
     -- Thời gian & thông tin thời gian
     timestamp       TIMESTAMP NOT NULL,
@@ -65,11 +80,11 @@ CREATE TABLE IF NOT EXISTS weather_raw (
     arc_int         REAL         -- Arc_Int
 );
 
-CREATE INDEX IF NOT EXISTS idx_weather_raw_timestamp
-    ON weather_raw (timestamp);
+CREATE INDEX IF NOT EXISTS idx_weather_raw_station_timestamp
+    ON weather_raw (station_id, timestamp);
 
-CREATE INDEX IF NOT EXISTS idx_weather_raw_date
-    ON weather_raw (date);
+CREATE INDEX IF NOT EXISTS idx_weather_raw_station_date
+    ON weather_raw (station_id, date);
 
 CREATE INDEX IF NOT EXISTS idx_weather_raw_season
     ON weather_raw (season);
@@ -80,7 +95,8 @@ CREATE INDEX IF NOT EXISTS idx_weather_raw_season
 ---------------------------------------------------------
 
 CREATE TABLE IF NOT EXISTS weather_daily (
-    date            DATE PRIMARY KEY,
+    station_id      VARCHAR(32) NOT NULL,
+    date            DATE NOT NULL,
     year            INT NOT NULL,
     month           INT NOT NULL,
     season          VARCHAR(10),
@@ -103,7 +119,13 @@ CREATE TABLE IF NOT EXISTS weather_daily (
     mean_solar      REAL,
 
     rain_flag       BOOLEAN,
-    wind_flag       BOOLEAN
+    wind_flag       BOOLEAN,
+    heat_flag       BOOLEAN,
+    cold_flag       BOOLEAN,
+    extreme_label   VARCHAR(32),  -- heavy_rain / strong_wind / heatwave / cold_spell / normal
+
+    condition_code  SMALLINT,    -- xem src/constants.py CONDITIONS
+    PRIMARY KEY (station_id, date)
 );
 
 
@@ -112,7 +134,8 @@ CREATE TABLE IF NOT EXISTS weather_daily (
 ---------------------------------------------------------
 
 CREATE TABLE IF NOT EXISTS weather_embeddings (
-    date            DATE PRIMARY KEY REFERENCES weather_daily(date),
+    station_id      VARCHAR(32) NOT NULL,
+    date            DATE NOT NULL,
 
     -- PCA
     pca1            REAL,
@@ -129,5 +152,251 @@ CREATE TABLE IF NOT EXISTS weather_embeddings (
 
     -- Clustering
     cluster_kmeans  INT,
-    extreme_label   VARCHAR(32)
+    extreme_label   VARCHAR(32),
+    PRIMARY KEY (station_id, date),
+    FOREIGN KEY (station_id, date) REFERENCES weather_daily (station_id, date)
+);
+
+
+
+---------------------------------------------------------
+-- BẢNG 4: SERVING (denormalized cho dashboard, không cần JOIN)
+-- Được build lại hoàn toàn bởi etl_build_embeddings.py
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS weather_serving (
+    station_id      VARCHAR(32) NOT NULL,
+    date            DATE NOT NULL,
+    year            INT NOT NULL,
+    month           INT NOT NULL,
+    season          VARCHAR(10),
+
+    -- Embeddings
+    pca1            REAL,
+    pca2            REAL,
+    pca3            REAL,
+    tsne1           REAL,
+    tsne2           REAL,
+    umap1           REAL,
+    umap2           REAL,
+
+    -- KMeans cho mỗi k trong CLUSTER_KS (cluster_kmeans = DEFAULT_CLUSTER_K)
+    cluster_kmeans  INT,
+    cluster_k3      INT,
+    cluster_k4      INT,
+    cluster_k5      INT,
+    cluster_k6      INT,
+
+    extreme_label   VARCHAR(32),
+    condition_code  SMALLINT,
+
+    -- Daily attributes dùng bởi các trang
+    mean_temp       REAL,
+    max_temp        REAL,
+    min_temp        REAL,
+    temp_range      REAL,
+    mean_humidity   REAL,
+    humidity_range  REAL,
+    total_rain      REAL,
+    mean_wind_speed REAL,
+    max_wind_speed  REAL,
+    mean_pressure   REAL,
+    pressure_range  REAL,
+    mean_solar      REAL,
+    PRIMARY KEY (station_id, date),
+    FOREIGN KEY (station_id, date) REFERENCES weather_daily (station_id, date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_weather_serving_season
+    ON weather_serving (station_id, season);
+
+
+---------------------------------------------------------
+-- BẢNG 5: EXTREME EPISODES (nhiều ngày liên tiếp = 1 event)
+-- Được build bởi etl_build_events.py
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS weather_events (
+    event_id             SERIAL PRIMARY KEY,
+    station_id           VARCHAR(32) NOT NULL,
+    event_type           VARCHAR(32) NOT NULL,  -- key của EXTREME_TYPES
+    start_date           DATE NOT NULL,
+    end_date             DATE NOT NULL,
+    duration_days        INT NOT NULL,
+    peak_date            DATE,
+    peak_value           REAL,
+    total_value          REAL,                  -- tổng giá trị trong episode
+    return_period_years  REAL                   -- GEV fit trên annual maxima
+);
+
+CREATE INDEX IF NOT EXISTS idx_weather_events_type_rp
+    ON weather_events (station_id, event_type, return_period_years DESC);
+
+CREATE INDEX IF NOT EXISTS idx_weather_events_start
+    ON weather_events (station_id, start_date);
+
+
+---------------------------------------------------------
+-- BẢNG 6: SUB-DAILY STORMS (từ dữ liệu 30-min)
+-- Được build bởi etl_build_storms.py
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS weather_storms (
+    storm_id           SERIAL PRIMARY KEY,
+    station_id         VARCHAR(32) NOT NULL,
+    start_ts           TIMESTAMP NOT NULL,
+    end_ts             TIMESTAMP NOT NULL,
+    duration_min       INT,
+    n_obs              INT,              -- số quan sát vượt ngưỡng
+    peak_rain_rate     REAL,
+    peak_rain_ts       TIMESTAMP,
+    total_rain         REAL,
+    peak_gust          REAL,
+    peak_gust_ts       TIMESTAMP,
+    max_pressure_drop  REAL,             -- mb trong STORM_TENDENCY_HOURS
+    triggers           VARCHAR(32)       -- rain / gust / pressure, nối bằng '+'
+);
+
+CREATE INDEX IF NOT EXISTS idx_weather_storms_start
+    ON weather_storms (station_id, start_ts);
+
+
+---------------------------------------------------------
+-- BẢNG 7: QUANTILE SKETCHES (t-digest, cập nhật incremental)
+-- scope: 'all', 'season:<Season>', 'month:<1..12>'
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS weather_sketches (
+    station_id      VARCHAR(32) NOT NULL,
+    variable        VARCHAR(32) NOT NULL,
+    scope           VARCHAR(32) NOT NULL,
+    n               BIGINT,
+    last_date       DATE,          -- ngày mới nhất đã được đưa vào sketch
+    digest          TEXT,          -- JSON của TDigest.to_dict()
+    PRIMARY KEY (station_id, variable, scope)
+);
+
+
+---------------------------------------------------------
+-- BẢNG 8: CLIMATOLOGY (normals)
+-- Được build bởi etl_build_climatology.py
+-- weather_clim_daily: day-of-year (1..365, 29/2 gộp với 28/2),
+--   mean/percentiles trên cửa sổ ±CLIM_HALF_WINDOW_DAYS ngày
+-- weather_clim_diurnal: hour-of-day x month từ weather_raw
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS weather_clim_daily (
+    station_id      VARCHAR(32) NOT NULL,
+    variable        VARCHAR(32) NOT NULL,
+    doy             SMALLINT NOT NULL,
+    mean            REAL,
+    p10             REAL,
+    p50             REAL,
+    p90             REAL,
+    PRIMARY KEY (station_id, variable, doy)
+);
+
+CREATE TABLE IF NOT EXISTS weather_clim_diurnal (
+    station_id      VARCHAR(32) NOT NULL,
+    variable        VARCHAR(32) NOT NULL,
+    month           SMALLINT NOT NULL,
+    hour            SMALLINT NOT NULL,
+    mean            REAL,
+    p10             REAL,
+    p50             REAL,
+    p90             REAL,
+    PRIMARY KEY (station_id, variable, month, hour)
+);
+
+
+---------------------------------------------------------
+-- BẢNG 9: ROLLING TRENDS + LOESS
+-- Được build bởi etl_build_trends.py (incremental theo date)
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS weather_trends (
+    station_id      VARCHAR(32) NOT NULL,
+    date            DATE NOT NULL,
+    variable        VARCHAR(32) NOT NULL,
+    window_days     SMALLINT NOT NULL,   -- 7 / 30 / 365
+    roll_mean       REAL,
+    roll_sum        REAL,
+    roll_max        REAL,
+    roll_min        REAL,
+    PRIMARY KEY (station_id, variable, window_days, date)
+);
+
+CREATE TABLE IF NOT EXISTS weather_loess (
+    station_id      VARCHAR(32) NOT NULL,
+    variable        VARCHAR(32) NOT NULL,
+    date            DATE NOT NULL,       -- tâm bin
+    loess           REAL,
+    n               INT,                 -- số ngày trong bin
+    PRIMARY KEY (station_id, variable, date)
+);
+
+
+---------------------------------------------------------
+-- BẢNG 10: BATCH FORECASTS (seasonal AR trên anomaly)
+-- Được build bởi etl_build_forecasts.py
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS weather_forecasts (
+    station_id      VARCHAR(32) NOT NULL,
+    issue_date      DATE NOT NULL,
+    lead_days       SMALLINT NOT NULL,    -- 1..6
+    target_date     DATE NOT NULL,
+    mean_temp       REAL,
+    max_temp        REAL,
+    min_temp        REAL,
+    total_rain      REAL,
+    mean_wind_speed REAL,
+    mean_humidity   REAL,
+    mean_pressure   REAL,
+    mean_solar      REAL,
+    condition_code  SMALLINT,
+    PRIMARY KEY (station_id, issue_date, lead_days)
+);
+
+-- skill trên phần hold-out cuối chuỗi, so với persistence và climatology
+CREATE TABLE IF NOT EXISTS weather_forecast_skill (
+    station_id            VARCHAR(32) NOT NULL,
+    variable              VARCHAR(32) NOT NULL,
+    lead_days             SMALLINT NOT NULL,
+    n                     INT,
+    mae_model             REAL,
+    mae_persistence       REAL,
+    mae_climatology       REAL,
+    skill_vs_persistence  REAL,       -- 1 - MSE_model / MSE_persistence
+    skill_vs_climatology  REAL,       -- 1 - MSE_model / MSE_climatology
+    PRIMARY KEY (station_id, variable, lead_days)
+);
+
+
+---------------------------------------------------------
+-- BẢNG 11: DATASET VERSION
+-- Mỗi ETL script tăng version sau khi ghi xong (bump_dataset_version trong
+-- src/db_utils.py), dashboard dùng version làm một phần key của figure cache.
+-- Micro-batch ingest chỉ tăng version của trạm vừa nhận dữ liệu.
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS dataset_version (
+    name            VARCHAR(64) PRIMARY KEY,   -- "weather" hoặc "weather:<station_id>"
+    version         BIGINT NOT NULL,
+    updated_at      TIMESTAMP NOT NULL DEFAULT now()
+);
+
+
+---------------------------------------------------------
+-- BẢNG 12: INGEST OFFSETS
+-- Byte offset đã nạp của mỗi file CSV trong data/raw. etl_load_raw.py ghi lại
+-- sau full reload, etl_watch_raw.py chỉ parse phần sau offset (các dòng
+-- logger mới ghi thêm) rồi tiến offset cùng micro-batch
+---------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS ingest_offsets (
+    source_file     VARCHAR(255) PRIMARY KEY,  -- tên file trong data/raw
+    station_id      VARCHAR(32) NOT NULL,
+    byte_offset     BIGINT NOT NULL,           -- luôn ở đầu một dòng
+    updated_at      TIMESTAMP NOT NULL DEFAULT now()
 );
@@ -0,0 +1,185 @@
+# src/analogs.py
+
+import hashlib
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from .constants import (
+    EMBEDDINGS_DIR, ANALOG_K, ANALOG_EXCLUDE_DAYS,
+    ANALOG_PCA_COMPONENTS, DEFAULT_STATION,
+)
+from .dim_reduction import prepare_matrix, run_pca
+
+ANALOG_COLUMNS = ["date", "rank", "analog_date", "distance"]
+_BRUTE_MAX_QUERIES = 64  # weighted query: brute-force tới số query này, lớn hơn thì dùng tree tạm
+
+
+def _kdtree(X: np.ndarray):
+    from sklearn.neighbors import KDTree  # import lúc build, không phải lúc load trang
+
+    return KDTree(X)
+
+
+def dataset_version(dates, X: np.ndarray) -> str:
+    """Hash nội dung (ngày + ma trận) -> id version ngắn của dataset."""
+    h = hashlib.sha1()
+    h.update(pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]").tobytes())
+    h.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    return h.hexdigest()[:12]
+
+
+class AnalogIndex:
+    """
+    KD-tree trên các ngày đã chuẩn hoá (features của prepare_matrix hoặc PCA)
+    để tìm "những ngày trong quá khứ giống ngày này nhất".
+
+    Không có weights -> query qua tree. Có per-feature weights -> khoảng cách
+    Euclid có trọng số được tính brute-force vectorized (vài nghìn ngày x
+    ~10 chiều, vẫn chỉ vài ms); batch lớn dùng một tree tạm đã co giãn.
+    """
+
+    def __init__(self, X: np.ndarray, dates, columns: list[str], space: str, version: str,
+                 station_id: str = DEFAULT_STATION):
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+        self.dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]")
+        self.columns = list(columns)
+        self.space = space
+        self.version = version
+        self.station_id = station_id
+        self._pos = {d: i for i, d in enumerate(self.dates)}
+        self.tree = _kdtree(self.X)
+
+    @classmethod
+    def build(cls, daily: pd.DataFrame, space: str = "features",
+              station_id: str = DEFAULT_STATION) -> "AnalogIndex":
+        X_scaled, features, _, valid_mask = prepare_matrix(daily)
+        dates = daily.loc[valid_mask, "date"]
+        version = dataset_version(dates, X_scaled)
+        if space == "pca":
+            _, X = run_pca(X_scaled, n_components=ANALOG_PCA_COMPONENTS)
+            columns = [f"pca{i + 1}" for i in range(ANALOG_PCA_COMPONENTS)]
+        else:
+            X, columns = X_scaled, features
+        return cls(X, dates, columns, space, version, station_id)
+
+    @property
+    def nbytes(self) -> int:
+        # tree giữ một bản copy data + index arrays
+        return int(2 * self.X.nbytes + self.dates.nbytes)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def position(self, date) -> int:
+        return self._pos[np.datetime64(pd.Timestamp(date).date(), "D")]
+
+    def _weights(self, weights: dict[str, float] | None) -> np.ndarray | None:
+        if not weights:
+            return None
+        w = np.array([float(weights.get(c, 1.0)) for c in self.columns])
+        return None if np.allclose(w, w[0]) else w
+
+    def _search(self, Q: np.ndarray, k: int, w: np.ndarray | None):
+        """(distances, indices) của k hàng xóm gần nhất cho mỗi dòng của Q."""
+        k = min(k, len(self))
+        if w is None:
+            return self.tree.query(Q, k=k, dualtree=len(Q) > _BRUTE_MAX_QUERIES)
+        if len(Q) > _BRUTE_MAX_QUERIES:
+            # batch lớn: một tree tạm trên không gian đã co giãn theo sqrt(w)
+            sw = np.sqrt(w)
+            return _kdtree(self.X * sw).query(Q * sw, k=k, dualtree=True)
+        # (q, n) khoảng cách có trọng số
+        d2 = (((self.X[None, :, :] - Q[:, None, :]) ** 2) * w).sum(axis=2)
+        idx = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        part = np.take_along_axis(d2, idx, axis=1)
+        order = np.argsort(part, axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        return np.sqrt(np.take_along_axis(part, order, axis=1)), idx
+
+    def _exclude(self, query_pos: np.ndarray, dist: np.ndarray, idx: np.ndarray,
+                 k: int, exclude_days: int):
+        """Bỏ chính ngày truy vấn và các ngày trong ±exclude_days, giữ k kết quả."""
+        gap = np.abs(self.dates[idx] - self.dates[query_pos][:, None]).astype(int)
+        bad = gap <= exclude_days
+        dist = np.where(bad, np.inf, dist)
+        order = np.argsort(dist, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(dist, order, axis=1), np.take_along_axis(idx, order, axis=1)
+
+    def query(self, date, k: int = ANALOG_K,
+              weights: dict[str, float] | None = None,
+              exclude_days: int = ANALOG_EXCLUDE_DAYS) -> pd.DataFrame:
+        """k ngày tương tự nhất với date (date phải có trong index)."""
+        return self.query_many([date], k, weights, exclude_days)
+
+    def query_many(self, dates, k: int = ANALOG_K,
+                   weights: dict[str, float] | None = None,
+                   exclude_days: int = ANALOG_EXCLUDE_DAYS) -> pd.DataFrame:
+        """Analog của nhiều ngày cùng lúc; ngày không có trong index bị bỏ qua."""
+        pos = np.array([self._pos[d] for d in
+                        pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]")
+                        if d in self._pos], dtype=int)
+        if len(pos) == 0:
+            return pd.DataFrame(columns=ANALOG_COLUMNS)
+        return self._table(pos, k, weights, exclude_days)
+
+    def all_pairs(self, k: int = ANALOG_K,
+                  weights: dict[str, float] | None = None,
+                  exclude_days: int = ANALOG_EXCLUDE_DAYS) -> pd.DataFrame:
+        """Bảng analog cho mọi ngày trong index (batch query một lần)."""
+        return self._table(np.arange(len(self)), k, weights, exclude_days)
+
+    def _table(self, pos: np.ndarray, k: int, weights, exclude_days: int) -> pd.DataFrame:
+        w = self._weights(weights)
+        # query dư để còn đủ k sau khi bỏ các ngày lân cận
+        dist, idx = self._search(self.X[pos], k + 2 * exclude_days + 1, w)
+        dist, idx = self._exclude(pos, dist, idx, k, exclude_days)
+        ok = np.isfinite(dist)
+        return pd.DataFrame({
+            "date": np.repeat(self.dates[pos], dist.shape[1])[ok.ravel()].astype("datetime64[ns]"),
+            "rank": np.tile(np.arange(1, dist.shape[1] + 1), len(pos))[ok.ravel()],
+            "analog_date": self.dates[idx][ok].astype("datetime64[ns]"),
+            "distance": dist[ok],
+        })[ANALOG_COLUMNS]
+
+    # ---------- Persistence ----------
+
+    @staticmethod
+    def path_for(space: str, version: str, station_id: str = DEFAULT_STATION):
+        return EMBEDDINGS_DIR / f"analogs_{station_id}_{space}_{version}.pkl"
+
+    def save(self) -> None:
+        """Ghi index của version này và xoá index cũ của cùng trạm và space."""
+        EMBEDDINGS_DIR.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(self.space, self.version, self.station_id)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+        for old in EMBEDDINGS_DIR.glob(f"analogs_{self.station_id}_{self.space}_*.pkl"):
+            if old != path:
+                old.unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, space: str, version: str, station_id: str = DEFAULT_STATION) -> "AnalogIndex | None":
+        path = cls.path_for(space, version, station_id)
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def get_analog_index(daily: pd.DataFrame, space: str = "features",
+                     station_id: str = DEFAULT_STATION) -> AnalogIndex:
+    """
+    Index của dataset hiện tại (daily của một trạm): đọc file đã persist nếu
+    version khớp, ngược lại build một lần rồi lưu lại.
+    """
+    X_scaled, _, _, valid_mask = prepare_matrix(daily)
+    version = dataset_version(daily.loc[valid_mask, "date"], X_scaled)
+    index = AnalogIndex.load(space, version, station_id)
+    if index is None:
+        index = AnalogIndex.build(daily, space, station_id)
+        index.save()
+    return index
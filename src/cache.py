@@ -0,0 +1,237 @@
+# src/cache.py
+
+import inspect
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+import pandas as pd
+
+from .constants import CACHE_TOTAL_BYTES, CACHE_BUDGETS, CACHE_DEFAULT_BUDGET
+from .db_utils import current_dataset_version, station_dataset_version
+from .shared_cache import NullBackend, get_backend
+
+
+def estimate_nbytes(value) -> int:
+    """Approximate in-memory size of a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if hasattr(value, "nbytes"):  # np.ndarray, EventWindows, ...
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class BoundedCache:
+    """
+    LRU cache dùng chung cho mọi loader của dashboard.
+
+    Bộ nhớ được đếm theo byte: mỗi loader không vượt quá ngân sách riêng,
+    và tổng tất cả loader không vượt quá total_bytes. Khi vượt, entry ít
+    được dùng gần đây nhất bị loại.
+
+    version (callable, vd. current_dataset_version): khi giá trị đổi (một ETL
+    vừa ghi) thì toàn bộ entry bị xoá. Micro-batch ingest chỉ đổi version của
+    một trạm, nằm trong key của entry trạm đó (xem bounded_cache).
+    """
+
+    def __init__(self,
+                 total_bytes: int = CACHE_TOTAL_BYTES,
+                 budgets: dict[str, int] | None = None,
+                 default_budget: int = CACHE_DEFAULT_BUDGET,
+                 version=None):
+        self.total_bytes = total_bytes
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+        self._version_fn = version
+        self._version = None
+        self._entries: OrderedDict = OrderedDict()   # (loader, key) -> (value, nbytes)
+        self._loader_bytes: dict[str, int] = defaultdict(int)
+        self._stats: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "evictions": 0}
+        )
+        self._lock = threading.RLock()
+
+    def budget(self, loader: str) -> int:
+        return min(self.budgets.get(loader, self.default_budget), self.total_bytes)
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(self._loader_bytes.values())
+
+    def _sync_version(self) -> None:
+        if self._version_fn is None:
+            return
+        v = self._version_fn()  # ngoài lock: có thể phải đọc DB
+        with self._lock:
+            if v != self._version:
+                if self._version is not None:
+                    self.clear()
+                self._version = v
+
+    def get(self, loader: str, key) -> tuple[bool, object]:
+        self._sync_version()
+        with self._lock:
+            entry = self._entries.get((loader, key))
+            if entry is None:
+                self._stats[loader]["misses"] += 1
+                return False, None
+            self._entries.move_to_end((loader, key))
+            self._stats[loader]["hits"] += 1
+            return True, entry[0]
+
+    def put(self, loader: str, key, value) -> None:
+        nbytes = estimate_nbytes(value)
+        self._sync_version()
+        with self._lock:
+            if (loader, key) in self._entries:
+                self._remove((loader, key))
+            # quá lớn so với ngân sách thì không cache
+            if nbytes > self.budget(loader):
+                return
+            while self._loader_bytes[loader] + nbytes > self.budget(loader):
+                self._evict_oldest(loader)
+            while self.used_bytes + nbytes > self.total_bytes:
+                self._evict_oldest(None)
+            self._entries[(loader, key)] = (value, nbytes)
+            self._loader_bytes[loader] += nbytes
+
+    def clear(self, loader: str | None = None) -> None:
+        with self._lock:
+            for k in [k for k in self._entries if loader is None or k[0] == loader]:
+                self._remove(k)
+
+    def stats(self) -> pd.DataFrame:
+        """Hit/miss/eviction counters and memory use per loader."""
+        with self._lock:
+            loaders = sorted(set(self._stats) | set(self._loader_bytes))
+            counts = defaultdict(int)
+            for loader, _ in self._entries:
+                counts[loader] += 1
+            rows = [{
+                "loader": name,
+                "entries": counts[name],
+                "bytes": self._loader_bytes[name],
+                "budget": self.budget(name),
+                **self._stats[name],
+            } for name in loaders]
+        return pd.DataFrame(rows, columns=[
+            "loader", "entries", "bytes", "budget", "hits", "misses", "evictions",
+        ])
+
+    def _remove(self, k) -> None:
+        _, nbytes = self._entries.pop(k)
+        self._loader_bytes[k[0]] -= nbytes
+
+    def _evict_oldest(self, loader: str | None) -> None:
+        for k in self._entries:
+            if loader is None or k[0] == loader:
+                self._remove(k)
+                self._stats[k[0]]["evictions"] += 1
+                return
+        raise RuntimeError("BoundedCache accounting out of sync")
+
+
+CACHE = BoundedCache(budgets=CACHE_BUDGETS, version=current_dataset_version)
+
+
+def _freeze(v):
+    if isinstance(v, (list, tuple)):
+        return tuple(_freeze(x) for x in v)
+    if isinstance(v, dict):
+        return tuple(sorted((k, _freeze(x)) for k, x in v.items()))
+    if isinstance(v, set):
+        return frozenset(_freeze(x) for x in v)
+    return v
+
+
+def _share(value):
+    # shallow copy: trang gán thêm cột không làm bẩn bản trong cache
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    return value
+
+
+def shared_get(loader: str, key, version: int | None = None):
+    """
+    Đọc kết quả loader từ cache đĩa dùng chung (None nếu miss / tắt / lỗi).
+    version mặc định là dataset version chung.
+    """
+    backend = get_backend()
+    if isinstance(backend, NullBackend):
+        return None
+    try:
+        return backend.get(loader, key, current_dataset_version() if version is None else version)
+    except (sqlite3.Error, OSError):
+        return None  # cache đĩa lỗi không được làm hỏng trang: query DB như bình thường
+
+
+def shared_put(loader: str, key, value, version: int | None = None) -> None:
+    backend = get_backend()
+    if not backend.supports(value):
+        return
+    try:
+        backend.put(loader, key, current_dataset_version() if version is None else version, value)
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def station_scope(loader: str, station_id: str) -> tuple[str, int]:
+    """
+    (tên loader trong cache đĩa, version) cho dữ liệu của một trạm. Mỗi trạm
+    một tên riêng: put version mới chỉ xoá entry cũ của chính trạm đó.
+    """
+    return f"{loader}:{station_id}", station_dataset_version(station_id)
+
+
+def bounded_cache(name: str | None = None, cache: BoundedCache = CACHE):
+    """
+    Decorator thay cho @st.cache_data trên các loader.
+
+    Key = tên loader + giá trị tham số (sau khi áp default), nên các trang
+    định nghĩa cùng loader với cùng tên sẽ dùng chung entry. Miss trong bộ
+    nhớ thì đọc tiếp cache đĩa dùng chung giữa các replica (shared_cache.py)
+    trước khi gọi loader.
+
+    Loader có tham số station_id được key theo version của trạm đó: micro-batch
+    ingest của trạm khác không làm các entry này miss.
+    """
+    def decorator(func):
+        loader = name or func.__name__
+        sig = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = _freeze(tuple(bound.arguments.items()))
+            shared, version = loader, None
+            if bound.arguments.get("station_id") is not None:
+                shared, version = station_scope(loader, bound.arguments["station_id"])
+                key = (version, key)
+            hit, value = cache.get(loader, key)
+            if not hit:
+                value = shared_get(shared, key, version)
+                if value is None:
+                    value = func(*args, **kwargs)
+                    shared_put(shared, key, value, version)
+                cache.put(loader, key, value)
+            return _share(value)
+
+        wrapper.clear = lambda: cache.clear(loader)
+        wrapper.loader_name = loader
+        return wrapper
+    return decorator
+
+
+def cache_stats() -> pd.DataFrame:
+    return CACHE.stats()
@@ -0,0 +1,125 @@
+# src/climatology.py
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .constants import (
+    CLIM_DAILY_FEATURES, CLIM_RAW_VARIABLES,
+    CLIM_PERCENTILES, CLIM_HALF_WINDOW_DAYS,
+)
+
+STAT_COLS = ["mean"] + [f"p{p}" for p in CLIM_PERCENTILES]
+
+
+def doy_index(dates) -> np.ndarray:
+    """
+    Day-of-year 0..364 bỏ qua ngày nhuận: 29/2 dùng chung slot với 28/2
+    và các ngày sau đó của năm nhuận lùi lại 1.
+    """
+    d = pd.DatetimeIndex(pd.to_datetime(dates))
+    doy = d.dayofyear.to_numpy() - 1
+    after_feb28 = d.is_leap_year & (doy >= 59)
+    return doy - after_feb28.astype(int)
+
+
+def daily_climatology(daily: pd.DataFrame,
+                      features: list[str] | None = None,
+                      half_window: int = CLIM_HALF_WINDOW_DAYS) -> pd.DataFrame:
+    """
+    Normals theo day-of-year cho mỗi feature: mean và percentiles trên cửa sổ
+    ±half_window ngày (vòng qua cuối năm), tính một lần cho mọi feature.
+    Trả về long format: doy (1..365), variable, mean, p10, p50, p90.
+    """
+    features = features or CLIM_DAILY_FEATURES
+    dates = pd.to_datetime(daily["date"])
+    years = dates.dt.year.to_numpy()
+    year_idx = years - years.min()
+    doy = doy_index(dates)
+
+    # năm nhuận: 28/2 và 29/2 cùng một slot -> lấy trung bình hai ngày, gán
+    # thẳng bằng fancy index thì 29/2 ghi đè 28/2
+    slots = daily[features].astype(float).groupby([year_idx, doy]).mean()
+
+    # cube (feature, year, doy) — NaN ở ngày không có dữ liệu
+    cube = np.full((len(features), year_idx.max() + 1, 365), np.nan)
+    cube[:, slots.index.get_level_values(0), slots.index.get_level_values(1)] = slots.to_numpy().T
+
+    # pad vòng để cửa sổ quanh 1/1 lấy cả cuối tháng 12
+    padded = np.concatenate(
+        [cube[..., -half_window:], cube, cube[..., :half_window]], axis=-1
+    )
+    windows = sliding_window_view(padded, 2 * half_window + 1, axis=-1)  # (f, y, 365, w)
+    pooled = windows.transpose(0, 2, 1, 3).reshape(len(features), 365, -1)
+
+    # doy không có dữ liệu nào (vd. dataset ngắn) -> NaN, không cần warning
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(pooled, axis=-1)
+        pct = np.nanpercentile(pooled, CLIM_PERCENTILES, axis=-1)  # (p, f, 365)
+
+    out = pd.DataFrame({
+        "doy": np.tile(np.arange(1, 366), len(features)),
+        "variable": np.repeat(features, 365),
+        "mean": mean.ravel(),
+    })
+    for i, p in enumerate(CLIM_PERCENTILES):
+        out[f"p{p}"] = pct[i].ravel()
+    return out
+
+
+def diurnal_climatology(raw: pd.DataFrame,
+                        variables: list[str] | None = None) -> pd.DataFrame:
+    """
+    Normals theo (month, hour) từ dữ liệu 30-min, một groupby cho mọi biến.
+    Trả về long format: month, hour, variable, mean, p10, p50, p90.
+    """
+    variables = variables or CLIM_RAW_VARIABLES
+    g = raw.groupby(["month", "hour"])[variables]
+    mean = g.mean().stack().rename("mean")
+    q = g.quantile([p / 100 for p in CLIM_PERCENTILES]).stack()
+    q.index = q.index.set_names(["month", "hour", "q", "variable"])
+    pct = q.unstack("q")
+    pct.columns = [f"p{round(c * 100)}" for c in pct.columns]
+
+    mean.index = mean.index.set_names(["month", "hour", "variable"])
+    return pd.concat([mean, pct], axis=1).reset_index()
+
+
+class DailyNormals:
+    """
+    Bảng day-of-year dạng array (variable, 365) cho mỗi stat, để lookup
+    normals / anomalies của cả một khoảng ngày bằng một lần fancy-index.
+    """
+
+    def __init__(self, clim: pd.DataFrame):
+        self.variables = list(dict.fromkeys(clim["variable"]))
+        self._var_idx = {v: i for i, v in enumerate(self.variables)}
+        c = clim.sort_values(["variable", "doy"])
+        c = c.set_index(["variable", "doy"]).reindex(
+            pd.MultiIndex.from_product([self.variables, range(1, 366)])
+        )
+        self.arrays = {
+            stat: c[stat].to_numpy(dtype=float).reshape(len(self.variables), 365)
+            for stat in STAT_COLS
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.arrays.values())
+
+    def lookup(self, variable: str, dates, stat: str = "mean") -> np.ndarray:
+        return self.arrays[stat][self._var_idx[variable], doy_index(dates)]
+
+    def anomalies(self, daily: pd.DataFrame, variables: list[str]) -> pd.DataFrame:
+        """daily[v] - normal mean của ngày đó, cho mọi v."""
+        idx = doy_index(daily["date"])
+        rows = [self._var_idx[v] for v in variables]
+        normal = self.arrays["mean"][np.ix_(rows, idx)].T
+        return pd.DataFrame(
+            daily[variables].to_numpy(dtype=float) - normal,
+            columns=variables,
+            index=daily.index,
+        )
@@ -1,13 +1,14 @@
 # src/clustering.py
 
 import numpy as np
-from sklearn.cluster import KMeans
 
 def kmeans_clusters(
     X: np.ndarray,
     n_clusters: int = 4,
     random_state: int = 42,
 ):
+    from sklearn.cluster import KMeans
+
     model = KMeans(
         n_clusters=n_clusters,
         random_state=random_state,
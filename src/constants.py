@@ -1,5 +1,6 @@
 # src/constants.py
 
+import os
 from pathlib import Path
 
 # Base paths
@@ -18,5 +19,175 @@ SEASON_MAP = {
 }
 
 # Extreme thresholds (sẽ được refine sau bằng quantile)
-RAIN_EXTREME_Q = 0.95
-WIND_EXTREME_Q = 0.95
+RAIN_EXTREME_Q = 0.95   # total_rain >= q
+WIND_EXTREME_Q = 0.95   # max_wind_speed >= q
+HEAT_EXTREME_Q = 0.95   # max_temp >= q
+COLD_EXTREME_Q = 0.05   # min_temp <= q
+
+# event type -> flag column trong weather_daily.
+# Thứ tự = thứ tự ưu tiên khi gán extreme_label (ngày có nhiều flag).
+EXTREME_TYPES = {
+    "heavy_rain": "rain_flag",
+    "strong_wind": "wind_flag",
+    "heatwave": "heat_flag",
+    "cold_spell": "cold_flag",
+}
+
+# event type -> (cột giá trị, "max"/"min") dùng cho peak của episode và annual extremes
+EXTREME_VALUES = {
+    "heavy_rain": ("total_rain", "max"),
+    "strong_wind": ("max_wind_speed", "max"),
+    "heatwave": ("max_temp", "max"),
+    "cold_spell": ("min_temp", "min"),
+}
+# event type -> quantile ngưỡng của cột giá trị trong EXTREME_VALUES
+EXTREME_QUANTILES = {
+    "heavy_rain": RAIN_EXTREME_Q,
+    "strong_wind": WIND_EXTREME_Q,
+    "heatwave": HEAT_EXTREME_Q,
+    "cold_spell": COLD_EXTREME_Q,
+}
+# Số năm tối thiểu để fit phân phối GEV cho return period
+MIN_YEARS_FOR_GEV = 3
+# Block (năm) có ít hơn tỉ lệ ngày này bị bỏ khỏi annual extremes (năm đầu/cuối dở dang)
+ANNUAL_MIN_COVERAGE = 0.9
+# Kiểu "min" (cold spell) dùng năm July–June để không cắt đôi một mùa đông
+MIN_BLOCK_START_MONTH = 7
+
+# Scatter rendering: SVG -> WebGL -> server-side density image
+SCATTERGL_THRESHOLD = 5_000
+DENSITY_THRESHOLD = 100_000
+DENSITY_BINS = 200
+
+# Dashboard data caches (bytes). Tổng bộ nhớ bị chặn bởi CACHE_TOTAL_BYTES,
+# mỗi loader có ngân sách riêng; loader không có trong dict dùng CACHE_DEFAULT_BUDGET.
+MB = 1024 ** 2
+CACHE_TOTAL_BYTES = 512 * MB
+CACHE_DEFAULT_BUDGET = 32 * MB
+CACHE_BUDGETS = {
+    "load_daily": 32 * MB,
+    "load_daily_filtered": 64 * MB,
+    "raw_month_block": 256 * MB,
+    "load_hourly_for_day": 16 * MB,
+    "event_windows": 64 * MB,
+    "load_serving": 32 * MB,
+    "load_regimes": 32 * MB,
+}
+
+# Số thread tối đa để chạy song song các query của một trang
+LOADER_MAX_WORKERS = 4
+
+# KMeans được chạy cho mỗi k; weather_serving có cột cluster_k{k} tương ứng
+CLUSTER_KS = (3, 4, 5, 6)
+DEFAULT_CLUSTER_K = 4
+# trạm có ít ngày hợp lệ hơn thì etl_build_embeddings bỏ qua
+# (t-SNE cần nhiều ngày hơn perplexity=30)
+EMBEDDINGS_MIN_DAYS = 60
+
+# condition_code -> (icon, text), xem preprocessing.condition_codes
+CONDITIONS = {
+    0: ("⛅", "Partly Cloudy"),
+    1: ("🌧️", "Heavy Rain"),
+    2: ("🌦️", "Rain Showers"),
+    3: ("☀️", "Clear Sky"),
+    4: ("💨", "Windy"),
+}
+
+# Sub-daily storm detection (30-min weather_raw)
+STORM_RAIN_RATE = 10.0        # rain_rate (mm/h) >= ngưỡng
+STORM_GUST_SPEED = 15.0       # hi_speed (m/s) >= ngưỡng
+STORM_PRESSURE_DROP = 3.0     # bar giảm >= ngưỡng (mb) trong STORM_TENDENCY_HOURS
+STORM_TENDENCY_HOURS = 3
+STORM_MERGE_GAP_MINUTES = 60  # hai lần vượt ngưỡng cách nhau <= gap thuộc cùng một storm
+STORM_CHUNK_ROWS = 50_000
+
+# Quantile sketches (t-digest) cho các biến dùng làm ngưỡng extreme
+SKETCH_VARIABLES = ["total_rain", "max_wind_speed", "max_temp", "min_temp"]
+SKETCH_COMPRESSION = 200
+
+# Climatology (normals)
+CLIM_DAILY_FEATURES = [
+    "mean_temp", "max_temp", "min_temp", "temp_range",
+    "mean_humidity", "total_rain",
+    "mean_wind_speed", "max_wind_speed",
+    "mean_pressure", "mean_solar",
+]
+CLIM_RAW_VARIABLES = ["temp_out", "out_hum", "wind_speed", "bar", "solar_rad", "rain"]
+CLIM_PERCENTILES = (10, 50, 90)   # -> cột p10, p50, p90
+CLIM_HALF_WINDOW_DAYS = 7         # day-of-year smoothing: ±7 ngày (vòng qua năm)
+
+# Rolling trends (etl_build_trends.py, page 7_Trends)
+TREND_VARIABLES = [
+    "mean_temp", "max_temp", "min_temp", "total_rain",
+    "mean_wind_speed", "max_wind_speed", "mean_humidity", "mean_pressure",
+]
+TREND_WINDOWS = (7, 30, 365)      # ngày (theo lịch, ngày thiếu = NaN)
+TREND_MIN_FRACTION = 0.5          # cần >= 50% ngày có dữ liệu trong cửa sổ
+LOESS_BINS = 600                  # số bin trước khi làm mượt
+LOESS_FRAC = 0.15                 # bandwidth = frac * khoảng thời gian
+
+# Batch forecasts (etl_build_forecasts.py)
+FORECAST_VARIABLES = [
+    "mean_temp", "max_temp", "min_temp", "total_rain",
+    "mean_wind_speed", "mean_humidity", "mean_pressure", "mean_solar",
+]
+FORECAST_HORIZON = 6          # lead 1..6 ngày
+FORECAST_LAGS = 3             # AR order trên anomaly so với climatology
+FORECAST_TEST_FRACTION = 0.3  # phần cuối của chuỗi dùng để đánh giá skill
+
+# Analog-day search (src/analogs.py)
+ANALOG_K = 5
+ANALOG_EXCLUDE_DAYS = 3        # bỏ các ngày trong ±3 ngày quanh ngày truy vấn (cùng đợt thời tiết)
+ANALOG_SPACES = ("features", "pca")
+ANALOG_PCA_COMPONENTS = 3
+
+# Embedding parameter sweeps (src/sweeps.py)
+SWEEP_DIR = EMBEDDINGS_DIR / "sweeps"
+SWEEP_CACHE_BYTES = 256 * MB       # tổng dung lượng file .npy trước khi evict (LRU)
+SWEEP_MAX_WORKERS = 2
+TSNE_PERPLEXITIES = (5, 15, 30, 50, 100)
+UMAP_N_NEIGHBORS = (5, 15, 30, 50, 100)
+UMAP_MIN_DISTS = (0.0, 0.1, 0.25, 0.5, 0.8)
+
+# Memory-mapped feature/embedding store (src/feature_store.py)
+FEATURE_STORE_KEEP = 2   # số version giữ lại trên đĩa (reader cũ vẫn đọc được bản trước)
+
+# Cold-start import budget (bench/import_time.py)
+IMPORT_TIME_BUDGET_S = 3.0     # tổng import time của một page / ETL script
+
+# Background cache warm-up (src/warmup.py, started from app/Home.py)
+WARMUP_BUDGET_S = 60.0   # bước nào bắt đầu sau budget thì bị bỏ qua
+
+# Rendered-figure cache (src/figure_cache.py): JSON của figure Plotly theo
+# (dataset version, page, figure, widget values)
+FIGURE_CACHE_BYTES = 128 * MB
+FIGURE_CACHE_PAGE_BYTES = 48 * MB   # mỗi page không vượt quá
+DATASET_VERSION_TTL_S = 10.0        # đọc lại bảng dataset_version sau mỗi TTL
+
+# Shared on-disk result cache (src/shared_cache.py): kết quả loader dạng Parquet
+# + index SQLite, dùng chung cho mọi replica dashboard trên cùng host.
+# SHARED_CACHE_BACKEND: "sqlite" (mặc định) hoặc "none" để tắt.
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND", "sqlite")
+SHARED_CACHE_DIR = Path(os.getenv("SHARED_CACHE_DIR", DATA_DIR / "cache"))
+SHARED_CACHE_BYTES = int(os.getenv("SHARED_CACHE_MB", "1024")) * MB
+
+# Arrow fast read path (read_sql_arrow / iter_sql_arrow trong src/db_utils.py)
+ARROW_CHUNK_ROWS = 100_000   # số dòng mỗi chunk khi stream COPY output
+
+# Storage backend (src/db_utils.py): Postgres qua DATABASE_URL, không set thì
+# dùng database nhúng (DuckDB nếu có duckdb-engine, ngược lại SQLite) tại đây
+EMBEDDED_DB_PATH = DATA_DIR / "weather"   # + .duckdb / .sqlite
+BULK_LOAD_CHUNK_ROWS = 50_000
+
+# Multi-station network (src/stations.py): file của trạm trong RAW_DIR là
+# <Name>_Weather_Data.csv hoặc <Name>_Weather_Data_<bất kỳ>.csv (các bản export
+# nửa giờ của logger), station_id = <name> viết thường
+STATION_CSV_MARKER = "_Weather_Data"
+DEFAULT_STATION = "bradford"                 # trạm dashboard mở mặc định
+STATION_NAMES = {"bradford": "Bradford, UK"}  # tên hiển thị; trạm khác: Title Case của id
+ETL_MAX_WORKERS = int(os.getenv("ETL_MAX_WORKERS", os.cpu_count() or 1))  # process / ETL script
+
+# Near-real-time ingest (db/etl_watch_raw.py): quét RAW_DIR, chỉ parse phần
+# byte mới của mỗi file từ offset đã lưu trong ingest_offsets
+INGEST_POLL_S = float(os.getenv("INGEST_POLL_S", "15"))   # + DATASET_VERSION_TTL_S < 1 phút
+INGEST_MAX_BATCH_BYTES = 32 * MB   # mỗi file mỗi micro-batch; backfill lớn chia nhiều lượt
@@ -2,10 +2,9 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from sklearn.manifold import TSNE
-import umap
+
+# sklearn / umap được import trong từng hàm: umap (numba JIT) mất hàng chục
+# giây khi import, nên trang và ETL chỉ trả giá đó khi thật sự chạy fit.
 
 DEFAULT_FEATURES = [
     "mean_temp", "temp_range",
@@ -18,6 +17,8 @@ DEFAULT_FEATURES = [
 
 def prepare_matrix(daily: pd.DataFrame,
                    feature_cols: list[str] | None = None):
+    from sklearn.preprocessing import StandardScaler
+
     if feature_cols is None:
         feature_cols = DEFAULT_FEATURES
     X = daily[feature_cols].copy()
@@ -32,6 +33,8 @@ def prepare_matrix(daily: pd.DataFrame,
     return X_scaled, feature_cols, scaler, valid_mask
 
 def run_pca(X_scaled: np.ndarray, n_components: int = 3):
+    from sklearn.decomposition import PCA
+
     pca = PCA(n_components=n_components, random_state=42)
     X_pca = pca.fit_transform(X_scaled)
     return pca, X_pca
@@ -40,6 +43,8 @@ def run_tsne(X_scaled: np.ndarray,
              n_components: int = 2,
              perplexity: float = 30.0,
              random_state: int = 42):
+    from sklearn.manifold import TSNE
+
     tsne = TSNE(
         n_components=n_components,
         perplexity=perplexity,
@@ -55,6 +60,8 @@ def run_umap(X_scaled: np.ndarray,
              random_state: int = 42,
              n_neighbors: int = 15,
              min_dist: float = 0.1):
+    import umap
+
     reducer = umap.UMAP(
         n_components=n_components,
         n_neighbors=n_neighbors,
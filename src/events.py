@@ -0,0 +1,161 @@
+# src/events.py
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from .constants import (
+    EXTREME_TYPES, EXTREME_VALUES, MIN_YEARS_FOR_GEV,
+    ANNUAL_MIN_COVERAGE, MIN_BLOCK_START_MONTH,
+)
+
+EVENT_COLUMNS = [
+    "event_type", "start_date", "end_date", "duration_days",
+    "peak_date", "peak_value", "total_value", "return_period_years",
+]
+
+_gamma = np.vectorize(math.gamma, otypes=[float])
+
+
+def detect_episodes(daily: pd.DataFrame, event_type: str) -> pd.DataFrame:
+    """
+    Gộp các ngày liên tiếp có flag của event_type thành episode
+    (run-length encoding vectorized) và tính duration / peak / total.
+    """
+    flag_col = EXTREME_TYPES[event_type]
+    value_col, how = EXTREME_VALUES[event_type]
+
+    d = daily.sort_values("date")
+    flag = d[flag_col].fillna(False).to_numpy(dtype=bool)
+    dates = pd.to_datetime(d["date"]).to_numpy(dtype="datetime64[D]")
+    values = d[value_col].to_numpy(dtype=float)
+
+    # episode bắt đầu ở ngày flagged mà ngày trước đó không flagged
+    # hoặc không liền kề (thiếu ngày trong dữ liệu)
+    contiguous = np.diff(dates) == np.timedelta64(1, "D")
+    continues = np.r_[False, flag[:-1] & contiguous]
+    starts = flag & ~continues
+    if not starts.any():
+        return pd.DataFrame(columns=EVENT_COLUMNS[:-1])
+
+    ids = (np.cumsum(starts) - 1)[flag]
+    ev_dates = dates[flag]
+    ev_values = values[flag]
+
+    first = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    last = np.r_[first[1:], len(ids)] - 1
+    total = np.add.reduceat(np.nan_to_num(ev_values), first)
+
+    # peak: sort theo (episode, giá trị) -> phần tử đầu mỗi nhóm
+    key = -ev_values if how == "max" else ev_values
+    key = np.where(np.isnan(key), np.inf, key)
+    peak_idx = np.lexsort((key, ids))[first]
+
+    return pd.DataFrame({
+        "event_type": event_type,
+        "start_date": ev_dates[first],
+        "end_date": ev_dates[last],
+        "duration_days": last - first + 1,
+        "peak_date": ev_dates[peak_idx],
+        "peak_value": ev_values[peak_idx],
+        "total_value": total,
+    })
+
+
+def annual_extremes(daily: pd.DataFrame,
+                    min_coverage: float = ANNUAL_MIN_COVERAGE) -> pd.DataFrame:
+    """
+    Annual maxima (years x event types). Với kiểu "min" (cold spell) giá trị
+    bị đổi dấu để mọi cột đều là maxima, và năm là July–June (index = năm
+    bắt đầu) để một mùa đông nằm trọn trong một block. Block có ít hơn
+    min_coverage số ngày có dữ liệu (năm đầu / cuối dở dang) cho NaN.
+    """
+    dates = pd.to_datetime(daily["date"])
+    cols = {}
+    for event_type, (value_col, how) in EXTREME_VALUES.items():
+        sign = 1.0 if how == "max" else -1.0
+        start_month = 1 if how == "max" else MIN_BLOCK_START_MONTH
+        block = dates.dt.year - (dates.dt.month < start_month).astype(int)
+        g = (sign * daily[value_col]).groupby(block.to_numpy())
+
+        starts = pd.to_datetime(pd.DataFrame({"year": g.size().index, "month": start_month, "day": 1}))
+        block_days = ((starts + pd.DateOffset(years=1)) - starts).dt.days.to_numpy()
+        coverage = g.count() / block_days
+        cols[event_type] = g.max().where(coverage >= min_coverage)
+    return pd.DataFrame(cols).sort_index()
+
+
+def fit_gev(annual_max: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit GEV cho từng cột của annual_max cùng lúc bằng L-moments (Hosking 1985).
+    Trả về (xi, alpha, k) theo tham số hoá của Hosking; cột có ít hơn
+    MIN_YEARS_FOR_GEV năm hợp lệ cho NaN.
+    """
+    a = np.asarray(annual_max, dtype=float)
+    if a.ndim == 1:
+        a = a[:, None]
+    n = np.sum(~np.isnan(a), axis=0).astype(float)
+    x = np.sort(a, axis=0)  # NaN xuống cuối mỗi cột
+    j = np.arange(x.shape[0], dtype=float)[:, None]
+    x = np.where(j < n, x, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        b0 = x.sum(axis=0) / n
+        b1 = (x * j / (n - 1)).sum(axis=0) / n
+        b2 = (x * j * (j - 1) / ((n - 1) * (n - 2))).sum(axis=0) / n
+        l1 = b0
+        l2 = 2 * b1 - b0
+        l3 = 6 * b2 - 6 * b1 + b0
+        t3 = l3 / l2
+
+        c = 2 / (3 + t3) - math.log(2) / math.log(3)
+        # xấp xỉ của Hosking chính xác trong khoảng |k| <= 0.5
+        k = np.clip(7.8590 * c + 2.9554 * c ** 2, -0.5, 0.5)
+        g = _gamma(1 + np.nan_to_num(k))
+        alpha = l2 * k / ((1 - 2 ** -k) * g)
+        xi = l1 - alpha * (1 - g) / k
+
+        # k ~ 0: giới hạn Gumbel
+        gumbel = np.abs(k) < 1e-6
+        alpha = np.where(gumbel, l2 / math.log(2), alpha)
+        xi = np.where(gumbel, l1 - np.euler_gamma * alpha, xi)
+
+    bad = (n < MIN_YEARS_FOR_GEV) | ~(l2 > 0)
+    return (np.where(bad, np.nan, xi),
+            np.where(bad, np.nan, alpha),
+            np.where(bad, np.nan, k))
+
+
+def gev_return_period(x, xi, alpha, k) -> np.ndarray:
+    """Return period (years) = 1 / (1 - F(x)) của GEV đã fit."""
+    x = np.asarray(x, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        z = (x - xi) / alpha
+        gumbel = np.abs(k) < 1e-6
+        inner = np.maximum(1 - k * z, np.finfo(float).tiny)
+        y = np.where(gumbel, z, -np.log(inner) / np.where(gumbel, 1.0, k))
+        cdf = np.exp(-np.exp(-y))
+        return 1.0 / (1.0 - cdf)
+
+
+def build_events(daily: pd.DataFrame) -> pd.DataFrame:
+    """Episodes cho mọi event type + return period của peak mỗi episode."""
+    episodes = [detect_episodes(daily, t) for t in EXTREME_TYPES]
+    episodes = [e for e in episodes if not e.empty]
+    if not episodes:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    events = pd.concat(episodes, ignore_index=True)
+
+    # fit một lần cho tất cả event types
+    ams = annual_extremes(daily)
+    xi, alpha, k = fit_gev(ams.to_numpy())
+    col = events["event_type"].map({t: i for i, t in enumerate(ams.columns)}).to_numpy()
+    sign = events["event_type"].map(
+        {t: (1.0 if how == "max" else -1.0) for t, (_, how) in EXTREME_VALUES.items()}
+    ).to_numpy()
+    events["return_period_years"] = gev_return_period(
+        sign * events["peak_value"].to_numpy(dtype=float),
+        xi[col], alpha[col], k[col],
+    )
+    return events[EVENT_COLUMNS]
@@ -0,0 +1,167 @@
+# src/feature_store.py
+
+import json
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .constants import EMBEDDINGS_DIR, FEATURE_STORE_KEEP
+
+CURRENT = "store_current.json"
+
+
+def _store_dir(version: str, root: Path = EMBEDDINGS_DIR) -> Path:
+    return root / f"store_{version}"
+
+
+def station_root(station_id: str, root: Path = EMBEDDINGS_DIR) -> Path:
+    """Thư mục store của một trạm (mỗi trạm có pointer và version riêng)."""
+    return root / "stations" / station_id
+
+
+def _save(path: Path, arr: np.ndarray) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(arr))
+    tmp.replace(path)
+
+
+def write_store(version: str,
+                dates,
+                X_scaled: np.ndarray,
+                features: list[str],
+                scaler,
+                coords: dict[str, np.ndarray],
+                labels: dict[str, np.ndarray],
+                root: Path = EMBEDDINGS_DIR) -> Path:
+    """
+    Ghi ma trận features đã scale, toạ độ embedding và nhãn thành các file
+    .npy của một version, kèm manifest.json (tên cột, tham số scaler, ngày).
+    Pointer store_current.json được đổi sau cùng nên reader luôn thấy một
+    version đầy đủ.
+    """
+    out = _store_dir(version, root)
+    out.mkdir(parents=True, exist_ok=True)
+
+    coord_cols = list(coords)
+    label_cols = list(labels)
+    _save(out / "dates.npy", pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]"))
+    _save(out / "X.npy", np.asarray(X_scaled, dtype=np.float64))
+    _save(out / "coords.npy", np.column_stack([coords[c] for c in coord_cols]).astype(np.float32))
+    _save(out / "labels.npy", np.column_stack([labels[c] for c in label_cols]).astype(np.int16))
+
+    manifest = {
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "n_rows": int(len(X_scaled)),
+        "features": list(features),
+        "scaler_mean": np.asarray(scaler.mean_).tolist(),
+        "scaler_scale": np.asarray(scaler.scale_).tolist(),
+        "coord_columns": coord_cols,
+        "label_columns": label_cols,
+    }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    pointer = root / CURRENT
+    tmp = pointer.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"version": version}))
+    tmp.replace(pointer)
+
+    _prune(root, keep=FEATURE_STORE_KEEP)
+    return out
+
+
+def _prune(root: Path, keep: int) -> None:
+    """Giữ lại `keep` version mới nhất (theo thời gian ghi manifest)."""
+    dirs = sorted(
+        (d for d in root.glob("store_*") if (d / "manifest.json").exists()),
+        key=lambda d: (d / "manifest.json").stat().st_mtime,
+        reverse=True,
+    )
+    for d in dirs[keep:]:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def current_version(root: Path = EMBEDDINGS_DIR) -> str | None:
+    try:
+        return json.loads((root / CURRENT).read_text())["version"]
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+
+class FeatureStore:
+    """
+    Reader read-only của một version: các mảng được mở bằng np.load(mmap_mode="r")
+    nên mọi process (replica dashboard, job phân tích) dùng chung page cache
+    của OS thay vì mỗi process giữ một bản copy.
+    """
+
+    def __init__(self, version: str, root: Path = EMBEDDINGS_DIR):
+        self.path = _store_dir(version, root)
+        self.manifest = json.loads((self.path / "manifest.json").read_text())
+        self.version = version
+        self.features = self.manifest["features"]
+        self.coord_columns = self.manifest["coord_columns"]
+        self.label_columns = self.manifest["label_columns"]
+        self.dates = self._open("dates")
+        self.X = self._open("X")
+        self.coords = self._open("coords")
+        self.labels = self._open("labels")
+
+    @classmethod
+    def open(cls, root: Path = EMBEDDINGS_DIR) -> "FeatureStore | None":
+        """Version hiện tại, hoặc None nếu ETL chưa ghi store."""
+        version = current_version(root)
+        if version is None or not (_store_dir(version, root) / "manifest.json").exists():
+            return None
+        return cls(version, root)
+
+    def _open(self, name: str) -> np.memmap:
+        return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.manifest["n_rows"]
+
+    @property
+    def nbytes(self) -> int:
+        # dữ liệu nằm trong page cache dùng chung, process chỉ giữ mapping
+        return len(json.dumps(self.manifest))
+
+    def coord(self, name: str) -> np.ndarray:
+        return self.coords[:, self.coord_columns.index(name)]
+
+    def label(self, name: str) -> np.ndarray:
+        return self.labels[:, self.label_columns.index(name)]
+
+    def scale(self, raw: np.ndarray) -> np.ndarray:
+        """Chuẩn hoá giá trị gốc (cùng thứ tự features) bằng scaler đã lưu."""
+        mean = np.asarray(self.manifest["scaler_mean"])
+        scale = np.asarray(self.manifest["scaler_scale"])
+        return (np.asarray(raw, dtype=float) - mean) / scale
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        """
+        Store có đúng các dòng của df (vd. weather_serving) không: cùng ngày
+        theo cùng thứ tự, và features của df scale lại bằng scaler đã lưu ra
+        đúng X. Daily bị build lại / ingest sửa giá trị mà số ngày không đổi
+        thì store cũ không còn khớp.
+        """
+        if len(df) != len(self) or not set(self.features) <= set(df.columns):
+            return False
+        dates = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[D]")
+        if not np.array_equal(dates, np.asarray(self.dates)):
+            return False
+        # REAL trên Postgres là float4 -> so sánh có tolerance
+        return bool(np.allclose(self.scale(df[self.features].to_numpy(dtype=float)), self.X,
+                                rtol=1e-4, atol=1e-4, equal_nan=True))
+
+    def frame(self, columns: list[str] | None = None) -> pd.DataFrame:
+        """date + toạ độ + nhãn; các cột toạ độ là view trên memmap (không copy)."""
+        columns = columns or self.coord_columns + self.label_columns
+        data = {"date": np.asarray(self.dates).astype("datetime64[ns]")}
+        for c in columns:
+            data[c] = self.coord(c) if c in self.coord_columns else self.label(c)
+        return pd.DataFrame(data, copy=False)
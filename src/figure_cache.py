@@ -0,0 +1,44 @@
+# src/figure_cache.py
+
+import json
+
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from .cache import BoundedCache, _freeze
+from .constants import FIGURE_CACHE_BYTES, FIGURE_CACHE_PAGE_BYTES
+from .db_utils import current_dataset_version, station_dataset_version
+
+# Một cache riêng cho figure (không tranh ngân sách với data loader);
+# ngân sách tính theo page, entry là chuỗi JSON nên size = số byte.
+FIGURES = BoundedCache(total_bytes=FIGURE_CACHE_BYTES, default_budget=FIGURE_CACHE_PAGE_BYTES)
+
+
+def cached_figure(page: str, name: str, build, **widgets) -> go.Figure:
+    """
+    Figure của build() lấy từ cache nếu đã dựng với cùng version dữ liệu và
+    cùng widget values; ngược lại dựng mới rồi lưu JSON.
+
+    Khi hit, figure được dựng lại từ JSON không qua validate nên bỏ qua cả
+    plotly express lẫn bước serialize/validate tốn kém nhất. Figure có widget
+    station được key theo version của trạm đó (ingest trạm khác không làm miss).
+    """
+    station = widgets.get("station")
+    version = current_dataset_version() if station is None else station_dataset_version(station)
+    key = (version, name, _freeze(tuple(sorted(widgets.items()))))
+    hit, spec = FIGURES.get(page, key)
+    if not hit:
+        spec = pio.to_json(build(), validate=False)
+        FIGURES.put(page, key, spec)
+    return go.Figure(json.loads(spec), skip_invalid=True, _validate=False)
+
+
+def plotly_chart(page: str, name: str, build, widgets: dict | None = None, **kwargs):
+    """st.plotly_chart(cached_figure(...)); kwargs được chuyển cho st.plotly_chart."""
+    fig = cached_figure(page, name, build, **(widgets or {}))
+    return st.plotly_chart(fig, **kwargs)
+
+
+def figure_cache_stats():
+    return FIGURES.stats().rename(columns={"loader": "page"})
@@ -0,0 +1,168 @@
+# src/forecasting.py
+
+import numpy as np
+import pandas as pd
+
+from .climatology import daily_climatology, DailyNormals
+from .constants import (
+    FORECAST_VARIABLES, FORECAST_HORIZON, FORECAST_LAGS,
+    FORECAST_TEST_FRACTION, SEASON_MAP,
+)
+from .preprocessing import condition_codes
+from .trends import to_calendar
+
+FORECAST_COLUMNS = ["issue_date", "lead_days", "target_date"] + FORECAST_VARIABLES + ["condition_code"]
+SKILL_COLUMNS = [
+    "variable", "lead_days", "n",
+    "mae_model", "mae_persistence", "mae_climatology",
+    "skill_vs_persistence", "skill_vs_climatology",
+]
+
+# biến không thể âm
+_NON_NEGATIVE = {"total_rain", "mean_wind_speed", "mean_solar"}
+
+
+def _anomalies(cal: pd.DataFrame, normals: DailyNormals, variables: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """(anomaly, normal) dạng (n_days, n_vars) trên lịch ngày liên tục."""
+    daily = cal.reset_index()
+    normal = np.column_stack([normals.lookup(v, daily["date"]) for v in variables])
+    return cal[variables].to_numpy(dtype=float) - normal, normal
+
+
+def _lagged(anom: np.ndarray, lags: int) -> np.ndarray:
+    """(n_days, n_vars, lags): lag 0 = ngày phát hành, lag k = k ngày trước."""
+    n, v = anom.shape
+    out = np.full((n, v, lags), np.nan)
+    for k in range(lags):
+        out[k:, :, k] = anom[: n - k]
+    return out
+
+
+class SeasonalAR:
+    """
+    Direct multi-step AR trên anomaly so với climatology day-of-year:
+    với mỗi (season, variable, lead) một hồi quy anomaly(t + lead) ~
+    anomaly(t), ..., anomaly(t - lags + 1). Dự báo mọi ngày phát hành trong
+    một lần nhân ma trận.
+    """
+
+    def __init__(self, variables: list[str] | None = None,
+                 horizon: int = FORECAST_HORIZON, lags: int = FORECAST_LAGS):
+        self.variables = variables or FORECAST_VARIABLES
+        self.horizon = horizon
+        self.lags = lags
+        self.normals: DailyNormals | None = None
+        self.coef: dict[str, np.ndarray] = {}  # season -> (vars, horizon, lags + 1)
+
+    def fit(self, daily: pd.DataFrame) -> "SeasonalAR":
+        self.normals = DailyNormals(daily_climatology(daily, self.variables))
+        cal = to_calendar(daily, self.variables)
+        anom, _ = _anomalies(cal, self.normals, self.variables)
+        X = _lagged(anom, self.lags)
+        seasons = cal.index.month.map(SEASON_MAP).to_numpy()
+        n = len(cal)
+
+        for season in dict.fromkeys(SEASON_MAP.values()):
+            coef = np.zeros((len(self.variables), self.horizon, self.lags + 1))
+            for h in range(1, self.horizon + 1):
+                # max(.., 0): chuỗi ngắn hơn lead (trạm mới) không được slice từ cuối
+                rows = np.flatnonzero(seasons[: max(n - h, 0)] == season)
+                y = anom[rows + h]
+                for j in range(len(self.variables)):
+                    xj = X[rows, j]
+                    ok = ~np.isnan(xj).any(axis=1) & ~np.isnan(y[:, j])
+                    if ok.sum() <= self.lags + 1:
+                        continue  # không đủ dữ liệu -> giữ 0 (= climatology)
+                    A = np.column_stack([np.ones(ok.sum()), xj[ok]])
+                    coef[j, h - 1] = np.linalg.lstsq(A, y[ok, j], rcond=None)[0]
+            self.coef[season] = coef
+        return self
+
+    def predict(self, daily: pd.DataFrame) -> pd.DataFrame:
+        """Dự báo lead 1..horizon cho mọi ngày có trong daily (long format)."""
+        cal = to_calendar(daily, self.variables)
+        anom, _ = _anomalies(cal, self.normals, self.variables)
+        # lag thiếu -> anomaly 0 (dự báo lùi về climatology)
+        X = np.nan_to_num(_lagged(anom, self.lags))
+        X = np.concatenate([np.ones(X.shape[:2] + (1,)), X], axis=2)  # (n, vars, lags+1)
+
+        coef = np.stack([self.coef[SEASON_MAP[m]] for m in cal.index.month])  # (n, vars, h, lags+1)
+        pred_anom = np.einsum("nvl,nvhl->nhv", X, coef)                     # (n, h, vars)
+
+        issue = cal.index.to_numpy(dtype="datetime64[D]")
+        leads = np.arange(1, self.horizon + 1)
+        target = issue[:, None] + leads[None, :].astype("timedelta64[D]")  # (n, h)
+        normal = np.stack(
+            [self.normals.lookup(v, target.ravel()).reshape(target.shape) for v in self.variables],
+            axis=-1,
+        )
+        values = normal + pred_anom
+        for j, v in enumerate(self.variables):
+            if v in _NON_NEGATIVE:
+                values[..., j] = np.maximum(values[..., j], 0.0)
+
+        observed = cal.notna().any(axis=1).to_numpy()
+        out = pd.DataFrame(values[observed].reshape(-1, len(self.variables)), columns=self.variables)
+        out.insert(0, "issue_date", np.repeat(issue[observed], self.horizon))
+        out.insert(1, "lead_days", np.tile(leads, observed.sum()))
+        out.insert(2, "target_date", target[observed].ravel())
+        out["condition_code"] = condition_codes(out)
+        return out[FORECAST_COLUMNS]
+
+
+def evaluate_skill(model: SeasonalAR, daily: pd.DataFrame, forecasts: pd.DataFrame) -> pd.DataFrame:
+    """
+    MAE của model, persistence (giá trị ngày phát hành) và climatology theo
+    (variable, lead); skill = 1 - MSE_model / MSE_reference. Tính vectorized
+    trên mảng (n, horizon, vars) ghép theo target_date.
+    """
+    variables = model.variables
+    cal = to_calendar(daily, variables)
+    obs = cal[variables]
+
+    truth = obs.reindex(pd.to_datetime(forecasts["target_date"])).to_numpy(dtype=float)
+    persist = obs.reindex(pd.to_datetime(forecasts["issue_date"])).to_numpy(dtype=float)
+    clim = np.column_stack([model.normals.lookup(v, forecasts["target_date"]) for v in variables])
+    pred = forecasts[variables].to_numpy(dtype=float)
+    lead = forecasts["lead_days"].to_numpy()
+
+    rows = []
+    for h in range(1, model.horizon + 1):
+        m = lead == h
+        err = {name: arr[m] - truth[m] for name, arr in
+               (("model", pred), ("persistence", persist), ("climatology", clim))}
+        ok = ~np.isnan(truth[m]) & ~np.isnan(err["persistence"])
+        for j, v in enumerate(variables):
+            okj = ok[:, j]
+            e = {k: a[okj, j] for k, a in err.items()}
+            mse = {k: np.mean(a ** 2) if len(a) else np.nan for k, a in e.items()}
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rows.append({
+                    "variable": v,
+                    "lead_days": h,
+                    "n": int(okj.sum()),
+                    "mae_model": np.mean(np.abs(e["model"])) if okj.any() else np.nan,
+                    "mae_persistence": np.mean(np.abs(e["persistence"])) if okj.any() else np.nan,
+                    "mae_climatology": np.mean(np.abs(e["climatology"])) if okj.any() else np.nan,
+                    "skill_vs_persistence": 1 - mse["model"] / mse["persistence"],
+                    "skill_vs_climatology": 1 - mse["model"] / mse["climatology"],
+                })
+    return pd.DataFrame(rows, columns=SKILL_COLUMNS)
+
+
+def build_forecasts(daily: pd.DataFrame,
+                    test_fraction: float = FORECAST_TEST_FRACTION) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Skill: fit trên phần đầu, đánh giá trên phần cuối (test_fraction) của chuỗi.
+    Forecasts lưu vào DB: fit lại trên toàn bộ dữ liệu rồi dự báo mọi ngày.
+    """
+    d = daily.sort_values("date")
+    split = pd.to_datetime(d["date"]).iloc[int(len(d) * (1 - test_fraction))]
+    train = d[pd.to_datetime(d["date"]) < split]
+    test = d[pd.to_datetime(d["date"]) >= split]
+
+    holdout = SeasonalAR().fit(train)
+    skill = evaluate_skill(holdout, test, holdout.predict(test))
+
+    model = SeasonalAR().fit(d)
+    return model.predict(d), skill
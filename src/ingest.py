@@ -0,0 +1,174 @@
+# src/ingest.py
+
+import io
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .constants import RAW_DIR, INGEST_MAX_BATCH_BYTES, EXTREME_VALUES, EXTREME_QUANTILES
+from .db_utils import bulk_insert, bulk_update
+from .preprocessing import raw_rows, aggregate_daily, label_extremes, condition_codes
+from .sketches import load_sketches, thresholds
+from .stations import station_files, station_name
+from .trends import invalidate_trends
+
+# cột weather_raw mà aggregate_daily cần (giống etl_build_daily)
+_DAILY_INPUT_COLS = [
+    "station_id", "timestamp", "date", "year", "month", "season",
+    "temp_out", "out_hum", "wind_speed", "bar", "solar_rad", "rain",
+]
+
+
+# ---------- Offsets ----------
+
+def load_offsets(engine: Engine) -> dict[str, int]:
+    """source_file -> byte offset đã nạp."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT source_file, byte_offset FROM ingest_offsets"))
+        return {r[0]: int(r[1]) for r in rows}
+
+
+def save_offsets(engine: Engine, offsets: list[tuple[str, str, int]]) -> None:
+    """Ghi (source_file, station_id, byte_offset), thay offset cũ của các file đó."""
+    if not offsets:
+        return
+    rows = [{"f": f, "s": s, "o": int(o)} for f, s, o in offsets]
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM ingest_offsets WHERE source_file = :f"), rows)
+        conn.execute(text(
+            "INSERT INTO ingest_offsets (source_file, station_id, byte_offset, updated_at) "
+            "VALUES (:f, :s, :o, CURRENT_TIMESTAMP)"
+        ), rows)
+
+
+# ---------- Đọc phần mới của file ----------
+
+def read_new_lines(path: Path, offset: int,
+                   max_bytes: int = INGEST_MAX_BATCH_BYTES) -> tuple[bytes, int]:
+    """
+    Các dòng hoàn chỉnh sau offset (tối đa ~max_bytes) -> (bytes, offset mới).
+    Dòng cuối logger đang ghi dở (chưa có newline) để lại cho lượt sau.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(max_bytes)
+    end = data.rfind(b"\n") + 1
+    return data[:end], offset + end
+
+
+def parse_new_lines(path: Path, data: bytes, offset: int, station_id: str) -> pd.DataFrame:
+    """Bytes đọc từ offset -> dòng weather_raw; offset > 0 thì mượn header ở dòng đầu file."""
+    if offset > 0:
+        with open(path, "rb") as f:
+            data = f.readline() + data
+    df = pd.read_csv(io.BytesIO(data))
+    # dòng hỏng (timestamp không parse được) không vào được weather_raw (NOT NULL)
+    return raw_rows(df, station_id).dropna(subset=["timestamp"])
+
+
+# ---------- Micro-batch ----------
+
+def _daily_thresholds(engine: Engine, station_id: str) -> dict[str, float]:
+    sketches, _ = load_sketches(engine, station_id)
+    if not sketches:
+        # etl_build_daily chưa chạy cho trạm: label_extremes tính trên các ngày
+        # của batch, lần build daily kế tiếp sẽ gán lại flag
+        return {}
+    return thresholds(sketches, {EXTREME_VALUES[t][0]: q for t, q in EXTREME_QUANTILES.items()})
+
+
+def append_station_batch(engine: Engine, station_id: str, rows: pd.DataFrame) -> tuple[int, int]:
+    """
+    Append rows (dòng weather_raw mới của một trạm) rồi tính lại weather_daily
+    của đúng các ngày bị chạm tới. Trả về (số dòng raw đã ghi, số ngày daily).
+
+    Dòng đã có (cùng station_id + timestamp, vd. file bị export lại hoặc
+    lượt trước dừng giữa chừng) bị bỏ qua, nên chạy lại một batch là an toàn.
+    """
+    rows = rows.drop_duplicates("timestamp", keep="last").copy()
+    rows["date"] = pd.to_datetime(rows["date"])
+    dates = rows["date"].drop_duplicates()
+    params = {"s": station_id, "d0": dates.min().date(), "d1": dates.max().date()}
+
+    # một query: vừa để lọc trùng, vừa là phần còn lại của các ngày cần tính lại
+    known = pd.read_sql(
+        text(f"SELECT {', '.join(_DAILY_INPUT_COLS)} FROM weather_raw "
+             "WHERE station_id = :s AND date BETWEEN :d0 AND :d1;"),
+        engine, params=params, parse_dates=["timestamp", "date"],
+    )
+    known = known[known["date"].isin(dates)]
+    fresh = rows[~rows["timestamp"].isin(known["timestamp"])]
+    if fresh.empty:
+        return 0, 0
+    bulk_insert(fresh, "weather_raw", engine)
+
+    touched = fresh["date"].drop_duplicates()
+    day_rows = pd.concat([known[known["date"].isin(touched)], fresh[_DAILY_INPUT_COLS]],
+                         ignore_index=True)
+    daily = label_extremes(aggregate_daily(day_rows), thresholds=_daily_thresholds(engine, station_id))
+    daily["condition_code"] = condition_codes(daily)
+
+    # ngày đã có thì UPDATE (weather_embeddings / weather_serving giữ FK tới
+    # dòng daily), ngày mới thì INSERT
+    existing = pd.read_sql(
+        text("SELECT date FROM weather_daily WHERE station_id = :s AND date BETWEEN :d0 AND :d1;"),
+        engine, params=params, parse_dates=["date"],
+    )["date"]
+    is_update = daily["date"].isin(existing)
+    bulk_update(daily[is_update], "weather_daily", ["station_id", "date"], engine)
+    bulk_insert(daily[~is_update], "weather_daily", engine)
+    # trend của các ngày đã đổi (và mọi ngày sau) được etl_build_trends tính lại
+    with engine.begin() as conn:
+        invalidate_trends(conn, station_id, touched.min())
+    return len(fresh), len(daily)
+
+
+def _register_stations(engine: Engine, files: dict[str, list[Path]]) -> list[str]:
+    """Trạm mới xuất hiện trong RAW_DIR -> thêm vào weather_stations; trả về các trạm mới."""
+    with engine.connect() as conn:
+        known = {r[0] for r in conn.execute(text("SELECT station_id FROM weather_stations"))}
+    new = [s for s in files if s not in known]
+    bulk_insert(pd.DataFrame({
+        "station_id": new,
+        "name": [station_name(s) for s in new],
+        "source_file": [files[s][0].name for s in new],
+    }), "weather_stations", engine)
+    return new
+
+
+def ingest_once(engine: Engine, raw_dir: Path = RAW_DIR) -> tuple[dict[str, tuple[int, int]], list[str]]:
+    """
+    Một lượt quét raw_dir: với mỗi file mới hoặc dài thêm, parse phần byte sau
+    offset đã lưu, append vào weather_raw, cập nhật weather_daily của các ngày
+    đó rồi tiến offset. File ngắn đi (bị ghi đè / export lại) được đọc lại từ
+    đầu, các dòng đã có bị bỏ qua.
+
+    Trả về (station_id -> (số dòng raw mới, số ngày daily được tính lại) cho
+    các trạm có dữ liệu mới, các trạm vừa thêm vào weather_stations). Không
+    bump dataset version, việc đó là của caller.
+    """
+    files = station_files(raw_dir)
+    offsets = load_offsets(engine)
+    new_stations = _register_stations(engine, files)
+
+    stats: dict[str, tuple[int, int]] = {}
+    for station_id, paths in files.items():
+        batches, advanced = [], []
+        for path in paths:
+            offset = offsets.get(path.name, 0)
+            if path.stat().st_size < offset:
+                offset = 0
+            data, new_offset = read_new_lines(path, offset)
+            if new_offset == offset:
+                continue
+            batches.append(parse_new_lines(path, data, offset, station_id))
+            advanced.append((path.name, station_id, new_offset))
+
+        batches = [b for b in batches if not b.empty]
+        if batches:
+            stats[station_id] = append_station_batch(engine, station_id, pd.concat(batches, ignore_index=True))
+        # offset chỉ tiến sau khi batch đã ghi xong
+        save_offsets(engine, advanced)
+    return {s: n for s, n in stats.items() if n[0]}, new_stations
@@ -0,0 +1,89 @@
+# src/loaders.py
+
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import text
+
+from .cache import bounded_cache
+from .db_utils import get_engine
+from .feature_store import FeatureStore, station_root
+
+# Loader dùng chung giữa các trang và warm-up (src/warmup.py): cùng một hàm
+# nên cùng một entry trong cache, warm-up nạp trước thì trang đọc được ngay.
+
+
+@bounded_cache()
+def load_stations():
+    """station_id + tên hiển thị của các trạm (weather_stations)."""
+    engine = get_engine()
+    return pd.read_sql("SELECT station_id, name FROM weather_stations ORDER BY station_id;", engine)
+
+
+@bounded_cache()
+def load_daily(station_id: str):
+    engine = get_engine()
+    q = "SELECT * FROM weather_daily WHERE station_id = :s ORDER BY date;"
+    df = pd.read_sql(text(q), engine, params={"s": station_id}, parse_dates=["date"])
+    return df
+
+
+@bounded_cache()
+def load_serving(station_id: str, exclude: tuple[str, ...] = ()):
+    """weather_serving của trạm, bỏ các cột trong exclude."""
+    engine = get_engine()
+    cols = pd.read_sql(text("SELECT * FROM weather_serving LIMIT 0"), engine).columns
+    q = (f"SELECT {', '.join(c for c in cols if c not in exclude)} FROM weather_serving "
+         "WHERE station_id = :s ORDER BY date")
+    return pd.read_sql(text(q), engine, params={"s": station_id}, parse_dates=["date"])
+
+
+@bounded_cache()
+def load_feature_store(station_id: str):
+    """
+    FeatureStore (memmap, src/feature_store.py) của trạm nếu nó khớp các dòng
+    hiện tại của weather_serving, ngược lại None.
+    """
+    store = FeatureStore.open(station_root(station_id))
+    if store is None:
+        return None
+    attrs = load_serving(station_id, tuple(store.coord_columns + store.label_columns))
+    return store if store.matches(attrs) else None
+
+
+def load_embeddings(station_id: str) -> pd.DataFrame:
+    """
+    weather_serving của trạm. Khi feature store khớp, toạ độ embedding và nhãn
+    cluster là view trên memmap (các process dùng chung page cache của OS);
+    chỉ các cột còn lại được đọc từ DB và giữ trong cache của process.
+    """
+    store = load_feature_store(station_id)
+    if store is None:
+        return load_serving(station_id)
+    attrs = load_serving(station_id, tuple(store.coord_columns + store.label_columns))
+    return pd.concat([attrs, store.frame().drop(columns="date")], axis=1)
+
+
+@bounded_cache()
+def load_hourly_for_day(station_id: str, d: date):
+    """Lấy dữ liệu theo giờ cho một ngày cụ thể của một trạm từ weather_raw."""
+    engine = get_engine()
+    q = """
+        SELECT timestamp, date,
+               temp_out, out_hum,
+               wind_speed, bar, solar_rad, rain
+        FROM weather_raw
+        WHERE station_id = :s AND date = :d
+        ORDER BY timestamp;
+    """
+    params = {"s": station_id, "d": d}
+    df = pd.read_sql(text(q), engine, params=params, parse_dates=["timestamp", "date"])
+    if not df.empty:
+        # resample 1H
+        df = (
+            df.set_index("timestamp")
+              .resample("1h")
+              .mean()
+              .reset_index()
+        )
+    return df
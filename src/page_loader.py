@@ -0,0 +1,59 @@
+# src/page_loader.py
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+
+from .constants import LOADER_MAX_WORKERS
+
+# Pool dùng chung cho mọi session; các loader dùng chung engine của get_engine()
+_pool = ThreadPoolExecutor(max_workers=LOADER_MAX_WORKERS, thread_name_prefix="page-loader")
+
+
+class PageLoader:
+    """
+    Khai báo trước các query của một trang rồi chạy chúng song song.
+
+        loader = PageLoader()
+        loader.submit("daily", load_daily)
+        loader.submit("hourly", load_hourly_for_day, focus_date)
+        df_daily = loader.result("daily")
+
+    Thời gian chờ của trang ~ query chậm nhất thay vì tổng các query.
+    """
+
+    def __init__(self):
+        self._futures: dict[str, Future] = {}
+        self._timings: dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    def submit(self, name: str, func, *args, **kwargs) -> Future:
+        """Chạy func(*args, **kwargs) trên pool; submit lại cùng name trả về Future cũ."""
+        if name in self._futures:
+            return self._futures[name]
+
+        def timed():
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._timings[name] = time.perf_counter() - t0
+
+        fut = _pool.submit(timed)
+        self._futures[name] = fut
+        return fut
+
+    def result(self, name: str):
+        return self._futures[name].result()
+
+    def timings(self) -> pd.DataFrame:
+        """Per-query wall time (s) of finished queries, slowest first."""
+        df = pd.DataFrame(
+            {"query": list(self._timings), "seconds": list(self._timings.values())}
+        )
+        return df.sort_values("seconds", ascending=False, ignore_index=True)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
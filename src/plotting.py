@@ -0,0 +1,155 @@
+# src/plotting.py
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from .constants import SCATTERGL_THRESHOLD, DENSITY_THRESHOLD, DENSITY_BINS
+
+
+def scatter_mode(n_points: int) -> str:
+    """Chọn kiểu render theo số điểm: 'svg', 'webgl' hoặc 'density'."""
+    if n_points > DENSITY_THRESHOLD:
+        return "density"
+    if n_points > SCATTERGL_THRESHOLD:
+        return "webgl"
+    return "svg"
+
+
+def _is_numeric(s: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
+
+
+def _to_float(s: pd.Series) -> tuple[np.ndarray, bool]:
+    """Datetime -> int64 ns để histogram được; trả về (values, is_datetime)."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.astype("int64").to_numpy(dtype=float), True
+    return s.to_numpy(dtype=float), False
+
+
+def _centers(edges: np.ndarray, is_dt: bool):
+    c = (edges[:-1] + edges[1:]) / 2
+    return pd.to_datetime(c.astype("int64")) if is_dt else c
+
+
+def _bin_index(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    # giống histogram2d: mép phải của bin cuối thuộc bin cuối
+    return np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+
+
+def _modal_layer(xi: np.ndarray, yi: np.ndarray, cats: pd.Series, shape) -> np.ndarray:
+    """Category xuất hiện nhiều nhất trong mỗi bin ('' ở bin rỗng), layout (y, x)."""
+    layer = np.full(shape, "", dtype=object)
+    s = pd.DataFrame({"x": xi, "y": yi, "c": cats.astype(str).to_numpy()})[cats.notna().to_numpy()]
+    # value_counts sort giảm dần -> dòng đầu của mỗi bin là mode
+    top = s.value_counts(["x", "y", "c"]).reset_index().drop_duplicates(["x", "y"])
+    layer[top["y"].to_numpy(), top["x"].to_numpy()] = top["c"].to_numpy()
+    return layer
+
+
+def density_scatter(df: pd.DataFrame,
+                    x: str,
+                    y: str,
+                    agg_cols: list[str] | None = None,
+                    cat_cols: list[str] | None = None,
+                    bins: int = DENSITY_BINS,
+                    title: str | None = None,
+                    labels: dict | None = None) -> go.Figure:
+    """
+    Rasterize điểm thành ảnh mật độ 2D ở server (np.histogram2d).
+    Hover hiển thị số điểm, giá trị trung bình của agg_cols và category phổ
+    biến nhất của cat_cols (vd. season, cluster) trong từng bin, nên payload
+    chỉ phụ thuộc bins, không phụ thuộc số điểm.
+    """
+    labels = labels or {}
+    agg_cols = [c for c in (agg_cols or []) if c not in (x, y)]
+    cat_cols = [c for c in (cat_cols or []) if c not in (x, y) and c not in agg_cols]
+    data = df[[x, y] + agg_cols + cat_cols].dropna(subset=[x, y])
+
+    xv, x_dt = _to_float(data[x])
+    yv, y_dt = _to_float(data[y])
+    counts, x_edges, y_edges = np.histogram2d(xv, yv, bins=bins)
+
+    layers = [counts.T]
+    for c in agg_cols:
+        w = data[c].to_numpy(dtype=float)
+        ok = ~np.isnan(w)
+        sums, _, _ = np.histogram2d(xv[ok], yv[ok], bins=[x_edges, y_edges], weights=w[ok])
+        n, _, _ = np.histogram2d(xv[ok], yv[ok], bins=[x_edges, y_edges])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            layers.append((sums / n).T)
+    if cat_cols:
+        xi, yi = _bin_index(xv, x_edges), _bin_index(yv, y_edges)
+        layers = [l.astype(object) for l in layers]
+        layers += [_modal_layer(xi, yi, data[c], counts.T.shape) for c in cat_cols]
+    customdata = np.dstack(layers)
+
+    # log màu để vùng thưa vẫn nhìn thấy được; bin rỗng để trong suốt
+    with np.errstate(divide="ignore"):
+        z = np.where(counts.T > 0, np.log10(counts.T), np.nan)
+
+    x_label = labels.get(x, x)
+    y_label = labels.get(y, y)
+    hover = [f"{x_label}: %{{x}}", f"{y_label}: %{{y}}", "points: %{customdata[0]:.0f}"]
+    for i, c in enumerate(agg_cols, start=1):
+        hover.append(f"mean {labels.get(c, c)}: %{{customdata[{i}]:.2f}}")
+    for i, c in enumerate(cat_cols, start=1 + len(agg_cols)):
+        hover.append(f"most common {labels.get(c, c)}: %{{customdata[{i}]}}")
+
+    fig = go.Figure(go.Heatmap(
+        x=_centers(x_edges, x_dt),
+        y=_centers(y_edges, y_dt),
+        z=z,
+        customdata=customdata,
+        colorscale="Viridis",
+        colorbar=dict(title="log10(points)"),
+        hovertemplate="<br>".join(hover) + "<extra></extra>",
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_label,
+        yaxis_title=y_label,
+    )
+    return fig
+
+
+def adaptive_scatter(df: pd.DataFrame,
+                     x: str,
+                     y: str,
+                     color: str | None = None,
+                     size: str | None = None,
+                     symbol: str | None = None,
+                     hover_data: list[str] | None = None,
+                     title: str | None = None,
+                     labels: dict | None = None) -> go.Figure:
+    """
+    Thay thế px.scatter cho dữ liệu lớn:
+      - <= SCATTERGL_THRESHOLD điểm: SVG như cũ
+      - <= DENSITY_THRESHOLD điểm: Scattergl (WebGL)
+      - lớn hơn: ảnh mật độ 2D (density_scatter), hover theo bin
+    """
+    mode = scatter_mode(len(df))
+    if mode == "density":
+        agg_cols = [c for c in [color, size] + list(hover_data or [])
+                    if c is not None and c in df.columns and _is_numeric(df[c])]
+        agg_cols = list(dict.fromkeys(agg_cols))
+        # màu / symbol dạng category không vẽ được trên ảnh mật độ -> mode theo bin
+        cat_cols = [c for c in [color, symbol]
+                    if c is not None and c in df.columns and not _is_numeric(df[c])]
+        cat_cols = list(dict.fromkeys(cat_cols))
+        return density_scatter(df, x, y, agg_cols=agg_cols, cat_cols=cat_cols,
+                               title=title, labels=labels)
+
+    return px.scatter(
+        df,
+        x=x,
+        y=y,
+        color=color,
+        size=size,
+        symbol=symbol,
+        hover_data=hover_data,
+        title=title,
+        labels=labels,
+        render_mode="webgl" if mode == "webgl" else "svg",
+    )
@@ -2,11 +2,19 @@
 
 import pandas as pd
 import numpy as np
-from .constants import SEASON_MAP
+from .constants import (
+    SEASON_MAP,
+    RAIN_EXTREME_Q, WIND_EXTREME_Q, HEAT_EXTREME_Q, COLD_EXTREME_Q,
+    EXTREME_TYPES,
+)
 
-def parse_timestamp(df: pd.DataFrame, date_col: str, time_col: str) -> pd.DataFrame:
+def parse_timestamp(df: pd.DataFrame, date_col: str, time_col: str,
+                    station_id: str | None = None) -> pd.DataFrame:
+    """timestamp + date/year/month/day/hour/season; station_id (nếu có) thành một cột."""
     ts = pd.to_datetime(df[date_col] + " " + df[time_col], dayfirst=True, errors="coerce")
     df = df.copy()
+    if station_id is not None:
+        df["station_id"] = station_id
     df["timestamp"] = ts
     df["date"] = df["timestamp"].dt.date
     df["year"] = df["timestamp"].dt.year
@@ -22,8 +30,95 @@ def clean_numeric(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
         df[c] = pd.to_numeric(df[c], errors="coerce")
     return df
 
+# ---------- CSV của logger -> dòng weather_raw ----------
+
+# Tất cả cột numeric (mọi thứ trừ Date, Time, Wind_Dir)
+RAW_NUMERIC_COLS = [
+    "Temp_Out", "Hi_Temp", "Low_Temp",
+    "Out_Hum", "Dew_Pt",
+    "Wind_Speed", "Wind_Run", "Hi_Speed", "Hi_Dir",
+    "Wind_Chill", "Heat_Index", "THW_Index", "THSW_Index",
+    "Bar  ", "Rain", "Rain_Rate",
+    "Solar_Rad", "Solar_Energy", "Hi Solar_Rad",
+    "UV_Index", "UV_Dose", "Hi_UV",
+    "Heat_D-D", "Cool_D-D",
+    "In_Temp", "In_Hum", "In_Dew", "In_Heat", "In_EMC", "InAir_Density",
+    "ET ", "Wind_Samp", "Wind_Tx", "ISS_Recept", "Arc_Int",
+]
+
+# Chuẩn hoá tên cột theo schema
+RAW_RENAME_MAP = {
+    "Temp_Out": "temp_out",
+    "Hi_Temp": "hi_temp",
+    "Low_Temp": "low_temp",
+    "Out_Hum": "out_hum",
+    "Dew_Pt": "dew_pt",
+
+    "Wind_Speed": "wind_speed",
+    "Wind_Dir": "wind_dir",
+    "Wind_Run": "wind_run",
+    "Hi_Speed": "hi_speed",
+    "Hi_Dir": "hi_dir",
+
+    "Wind_Chill": "wind_chill",
+    "Heat_Index": "heat_index",
+    "THW_Index": "thw_index",
+    "THSW_Index": "thsw_index",
+
+    "Bar  ": "bar",
+    "Rain": "rain",
+    "Rain_Rate": "rain_rate",
+
+    "Solar_Rad": "solar_rad",
+    "Solar_Energy": "solar_energy",
+    "Hi Solar_Rad": "hi_solar_rad",
+
+    "UV_Index": "uv_index",
+    "UV_Dose": "uv_dose",
+    "Hi_UV": "hi_uv",
+
+    "Heat_D-D": "heat_dd",
+    "Cool_D-D": "cool_dd",
+
+    "In_Temp": "in_temp",
+    "In_Hum": "in_hum",
+    "In_Dew": "in_dew",
+    "In_Heat": "in_heat",
+    "In_EMC": "in_emc",
+    "InAir_Density": "in_air_density",
+
+    "ET ": "et",
+    "Wind_Samp": "wind_samp",
+    "Wind_Tx": "wind_tx",
+    "ISS_Recept": "iss_recept",
+    "Arc_Int": "arc_int",
+}
+
+# Đúng thứ tự cột của weather_raw
+RAW_COLUMNS = [
+    "station_id", "timestamp", "date", "year", "month", "day", "hour", "season",
+    "temp_out", "hi_temp", "low_temp",
+    "out_hum", "dew_pt",
+    "wind_speed", "wind_dir", "wind_run", "hi_speed", "hi_dir",
+    "wind_chill", "heat_index", "thw_index", "thsw_index",
+    "bar", "rain", "rain_rate",
+    "solar_rad", "solar_energy", "hi_solar_rad",
+    "uv_index", "uv_dose", "hi_uv",
+    "heat_dd", "cool_dd",
+    "in_temp", "in_hum", "in_dew", "in_heat", "in_emc", "in_air_density",
+    "et", "wind_samp", "wind_tx", "iss_recept", "arc_int",
+]
+
+def raw_rows(df: pd.DataFrame, station_id: str) -> pd.DataFrame:
+    """DataFrame đọc từ CSV của logger (header gốc) -> các dòng của weather_raw."""
+    df = parse_timestamp(df, date_col="Date", time_col="Time", station_id=station_id)
+    df = clean_numeric(df, RAW_NUMERIC_COLS)
+    return df.rename(columns=RAW_RENAME_MAP)[RAW_COLUMNS]
+
 def aggregate_daily(df: pd.DataFrame) -> pd.DataFrame:
-    group = df.groupby("date")
+    """Một dòng cho mỗi ngày (mỗi (station_id, date) nếu df có cột station_id)."""
+    keys = ["station_id", "date"] if "station_id" in df.columns else "date"
+    group = df.groupby(keys)
 
     agg = pd.DataFrame({
         "year": group["year"].first(),
@@ -53,12 +148,48 @@ def aggregate_daily(df: pd.DataFrame) -> pd.DataFrame:
     return agg
 
 def label_extremes(daily: pd.DataFrame,
-                   rain_q: float = 0.95,
-                   wind_q: float = 0.95) -> pd.DataFrame:
+                   rain_q: float = RAIN_EXTREME_Q,
+                   wind_q: float = WIND_EXTREME_Q,
+                   heat_q: float = HEAT_EXTREME_Q,
+                   cold_q: float = COLD_EXTREME_Q,
+                   thresholds: dict[str, float] | None = None) -> pd.DataFrame:
+    """
+    Flag extreme days for every type in EXTREME_TYPES and assign a single
+    extreme_label (first matching type in priority order, else "normal").
+
+    thresholds ({column: value}, vd. từ quantile sketches) thay cho việc
+    tính quantile trên toàn bộ lịch sử; cột nào thiếu thì vẫn tính trực tiếp.
+    """
     daily = daily.copy()
-    rain_thr = daily["total_rain"].quantile(rain_q)
-    wind_thr = daily["max_wind_speed"].quantile(wind_q)
+    thresholds = thresholds or {}
+
+    def thr(col, q):
+        return thresholds[col] if col in thresholds else daily[col].quantile(q)
+
+    rain_thr = thr("total_rain", rain_q)
+    wind_thr = thr("max_wind_speed", wind_q)
+    heat_thr = thr("max_temp", heat_q)
+    cold_thr = thr("min_temp", cold_q)
 
     daily["rain_flag"] = daily["total_rain"] >= rain_thr
     daily["wind_flag"] = daily["max_wind_speed"] >= wind_thr
+    daily["heat_flag"] = daily["max_temp"] >= heat_thr
+    daily["cold_flag"] = daily["min_temp"] <= cold_thr
+
+    daily["extreme_label"] = np.select(
+        [daily[col].to_numpy() for col in EXTREME_TYPES.values()],
+        list(EXTREME_TYPES),
+        default="normal",
+    )
     return daily
+
+def condition_codes(daily: pd.DataFrame) -> np.ndarray:
+    """Vectorized daily weather condition, codes as in constants.CONDITIONS."""
+    rain = daily["total_rain"].fillna(0).to_numpy()
+    solar = daily["mean_solar"].fillna(0).to_numpy()
+    wind = daily["mean_wind_speed"].fillna(0).to_numpy()
+    return np.select(
+        [rain > 10, rain > 0.5, (solar > 250) & (rain == 0), wind > 8],
+        [1, 2, 3, 4],
+        default=0,
+    )
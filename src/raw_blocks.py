@@ -0,0 +1,252 @@
+# src/raw_blocks.py
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .cache import CACHE, bounded_cache, shared_get, shared_put, station_scope
+from .db_utils import get_engine, read_sql_arrow, station_dataset_version
+
+BLOCK_LOADER = "raw_month_block"
+WINDOWS_LOADER = "event_windows"
+
+# Các cột 30-min mà các trang explorer / extreme events dùng
+RAW_WINDOW_COLUMNS = [
+    "timestamp", "date",
+    "temp_out", "out_hum",
+    "wind_speed", "bar", "solar_rad", "rain", "rain_rate",
+]
+
+
+@bounded_cache()
+def raw_date_bounds(station_id: str):
+    """(min_date, max_date) của weather_raw của trạm, dùng khi trang không chọn range."""
+    engine = get_engine()
+    with engine.connect() as conn:
+        lo, hi = conn.execute(
+            text("SELECT MIN(date), MAX(date) FROM weather_raw WHERE station_id = :s"), {"s": station_id}
+        ).one()
+    return lo, hi
+
+
+def _contiguous_runs(months: list[pd.Period]) -> list[tuple[pd.Period, pd.Period]]:
+    """[2020-01, 2020-02, 2020-05] -> [(2020-01, 2020-02), (2020-05, 2020-05)]"""
+    runs = []
+    for m in months:
+        if runs and m == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], m)
+        else:
+            runs.append((m, m))
+    return runs
+
+
+def _fetch_months(station_id: str, first: pd.Period, last: pd.Period) -> dict[pd.Period, pd.DataFrame]:
+    """One query for a run of consecutive months of a station, split into per-month blocks."""
+    engine = get_engine()
+    q = f"""
+        SELECT {", ".join(RAW_WINDOW_COLUMNS)}
+        FROM weather_raw
+        WHERE station_id = :s AND date BETWEEN :start AND :end
+        ORDER BY timestamp
+    """
+    params = {"s": station_id, "start": first.start_time.date(), "end": last.end_time.date()}
+    # nhiều năm = hàng trăm nghìn dòng: COPY + Arrow (src/db_utils.py)
+    df = read_sql_arrow(q, params, engine, parse_dates=["timestamp", "date"])
+
+    by_month = dict(iter(df.groupby(df["date"].dt.to_period("M"), sort=False)))
+    # tháng không có dữ liệu vẫn được cache (block rỗng) để khỏi query lại
+    return {
+        m: by_month.get(m, df.iloc[0:0]).reset_index(drop=True)
+        for m in pd.period_range(first, last, freq="M")
+    }
+
+
+def load_raw_range(station_id: str, date_from=None, date_to=None) -> pd.DataFrame:
+    """
+    Đọc weather_raw của trạm trong [date_from, date_to] qua cache block theo tháng.
+
+    Chỉ những tháng chưa có trong cache mới được query, mỗi dãy tháng liên
+    tiếp bị thiếu là một query. Kéo range thêm một ngày thường chỉ tốn
+    nhiều nhất một query cho tháng mới.
+    """
+    if date_from is None or date_to is None:
+        lo, hi = raw_date_bounds(station_id)
+        if lo is None:
+            return pd.DataFrame(columns=RAW_WINDOW_COLUMNS)
+        date_from = date_from or lo
+        date_to = date_to or hi
+
+    start = pd.Timestamp(date_from).normalize()
+    end = pd.Timestamp(date_to).normalize()
+    if start > end:
+        return pd.DataFrame(columns=RAW_WINDOW_COLUMNS)
+
+    # block được key theo version của trạm: ingest trạm khác không làm miss
+    shared, version = station_scope(BLOCK_LOADER, station_id)
+    blocks: dict[pd.Period, pd.DataFrame] = {}
+    missing = []
+    for m in pd.period_range(start, end, freq="M"):
+        key = (station_id, version, str(m))
+        hit, block = CACHE.get(BLOCK_LOADER, key)
+        if not hit:
+            # replica khác đã đọc tháng này -> lấy từ cache đĩa dùng chung
+            block = shared_get(shared, key, version)
+            if block is not None:
+                CACHE.put(BLOCK_LOADER, key, block)
+        if block is None:
+            missing.append(m)
+        else:
+            blocks[m] = block
+
+    for first, last in _contiguous_runs(missing):
+        for m, block in _fetch_months(station_id, first, last).items():
+            key = (station_id, version, str(m))
+            CACHE.put(BLOCK_LOADER, key, block)
+            shared_put(shared, key, block, version)
+            blocks[m] = block
+
+    frames = [blocks[m] for m in sorted(blocks) if not blocks[m].empty]
+    if not frames:
+        return pd.DataFrame(columns=RAW_WINDOW_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    mask = (df["date"] >= start) & (df["date"] <= end)
+    return df[mask].reset_index(drop=True)
+
+
+def clear_raw_blocks() -> None:
+    CACHE.clear(BLOCK_LOADER)
+    raw_date_bounds.clear()
+
+
+# ---------- Bulk prefetch of event windows ----------
+
+class EventWindows:
+    """
+    Kết quả prefetch: một frame chung cho mọi cửa sổ + offset theo sự kiện.
+    Cắt cửa sổ của một sự kiện chỉ là iloc trên frame đã có trong bộ nhớ.
+    """
+
+    def __init__(self, frame: pd.DataFrame,
+                 offsets: dict[pd.Timestamp, tuple[int, int, pd.Timestamp]],
+                 days_before: int, days_after: int):
+        self.frame = frame
+        self.offsets = offsets          # start -> (lo, hi, end)
+        self.days_before = days_before
+        self.days_after = days_after
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.frame.memory_usage(index=True, deep=True).sum())
+
+    def __contains__(self, event_start) -> bool:
+        return pd.Timestamp(event_start).normalize() in self.offsets
+
+    def window(self, event_start, days_before: int, days_after: int) -> pd.DataFrame:
+        """Cửa sổ quanh sự kiện bắt đầu ở event_start, không vượt quá span đã prefetch."""
+        start = pd.Timestamp(event_start).normalize()
+        if days_before > self.days_before or days_after > self.days_after:
+            raise ValueError("Requested window is wider than the prefetched span")
+        lo, hi, end = self.offsets[start]
+        df = self.frame.iloc[lo:hi]
+        mask = ((df["date"] >= start - pd.Timedelta(days=days_before))
+                & (df["date"] <= end + pd.Timedelta(days=days_after)))
+        return df[mask].reset_index(drop=True)
+
+
+def _as_span(event) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Một ngày hoặc (start, end) -> (start, end) đã normalize."""
+    if isinstance(event, tuple):
+        start, end = event
+    else:
+        start = end = event
+    return pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+
+
+def merge_ranges(ranges: list[tuple[pd.Timestamp, pd.Timestamp]]) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """Gộp các khoảng ngày chồng nhau hoặc liền kề."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + pd.Timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def fetch_event_windows(station_id: str, events, days_before: int, days_after: int) -> EventWindows:
+    """
+    Đọc hợp của tất cả cửa sổ [start - days_before, end + days_after] của trạm
+    bằng một query (các khoảng chồng nhau được gộp trước) rồi đánh index theo sự kiện.
+    Mỗi event là một ngày hoặc một tuple (start, end).
+    """
+    spans = sorted({_as_span(e) for e in events})
+    before = pd.Timedelta(days=days_before)
+    after = pd.Timedelta(days=days_after)
+    ranges = merge_ranges([(a - before, b + after) for a, b in spans])
+    if not ranges:
+        return EventWindows(pd.DataFrame(columns=RAW_WINDOW_COLUMNS), {}, days_before, days_after)
+
+    clauses = []
+    params = {"station": station_id}
+    for i, (start, end) in enumerate(ranges):
+        clauses.append(f"date BETWEEN :s{i} AND :e{i}")
+        params[f"s{i}"] = start.date()
+        params[f"e{i}"] = end.date()
+    q = f"""
+        SELECT {", ".join(RAW_WINDOW_COLUMNS)}
+        FROM weather_raw
+        WHERE station_id = :station AND ({" OR ".join(clauses)})
+        ORDER BY timestamp
+    """
+    engine = get_engine()
+    frame = pd.read_sql(text(q), engine, params=params, parse_dates=["timestamp", "date"])
+
+    # frame đã sort theo timestamp -> searchsorted trên cột date cho mỗi sự kiện
+    dates = frame["date"].to_numpy(dtype="datetime64[ns]")
+    starts = np.array([a - before for a, _ in spans], dtype="datetime64[ns]")
+    ends = np.array([b + after for _, b in spans], dtype="datetime64[ns]")
+    lo = np.searchsorted(dates, starts, side="left")
+    hi = np.searchsorted(dates, ends, side="right")
+    offsets = {a: (int(i), int(j), b) for (a, b), i, j in zip(spans, lo, hi)}
+    return EventWindows(frame, offsets, days_before, days_after)
+
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="raw-prefetch")
+_inflight: dict[tuple, Future] = {}
+_inflight_lock = threading.RLock()
+
+
+def prefetch_event_windows(station_id: str, events, days_before: int, days_after: int) -> Future:
+    """
+    Chạy fetch_event_windows trong background, trả về Future[EventWindows].
+
+    Kết quả được giữ trong cache "event_windows"; gọi lại với cùng danh sách
+    sự kiện trả về ngay Future đã xong (hoặc Future đang chạy).
+    """
+    key = (station_id, tuple(sorted({_as_span(e) for e in events})), days_before, days_after,
+           station_dataset_version(station_id))
+    hit, windows = CACHE.get(WINDOWS_LOADER, key)
+    if hit:
+        done = Future()
+        done.set_result(windows)
+        return done
+
+    def run():
+        result = fetch_event_windows(station_id, key[1], days_before, days_after)
+        CACHE.put(WINDOWS_LOADER, key, result)
+        return result
+
+    def forget(_):
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+    with _inflight_lock:
+        fut = _inflight.get(key)
+        if fut is None:
+            fut = _prefetch_pool.submit(run)
+            _inflight[key] = fut
+            fut.add_done_callback(forget)
+    return fut
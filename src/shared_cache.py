@@ -0,0 +1,188 @@
+# src/shared_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from .constants import SHARED_CACHE_BACKEND, SHARED_CACHE_BYTES, SHARED_CACHE_DIR
+
+# Tầng cache thứ hai phía sau BoundedCache (in-process): khi một replica miss
+# trong bộ nhớ, nó đọc kết quả mà replica khác đã ghi xuống đĩa thay vì query
+# lại Postgres. Chỉ DataFrame được lưu (Parquet); giá trị khác chỉ ở tầng RAM.
+
+
+class NullBackend:
+    """Backend tắt (SHARED_CACHE_BACKEND=none): mọi get đều miss."""
+
+    def supports(self, value) -> bool:
+        return False
+
+    def get(self, loader: str, key, version: int):
+        return None
+
+    def put(self, loader: str, key, version: int, value) -> None:
+        pass
+
+    def clear(self, loader: str | None = None) -> None:
+        pass
+
+    def stats(self) -> pd.DataFrame:
+        return pd.DataFrame(columns=["loader", "entries", "bytes", "versions"])
+
+
+class SQLiteParquetBackend:
+    """
+    Mỗi entry là một file <hash>.parquet; index SQLite (WAL) giữ loader,
+    dataset version, kích thước và thời điểm dùng gần nhất.
+
+    - ghi file vào *.tmp rồi os.replace -> reader không thấy file ghi dở,
+    - key gồm dataset version; put của version mới xoá entry version cũ
+      của cùng loader,
+    - tổng dung lượng vượt max_bytes thì xoá entry ít dùng nhất (LRU),
+    - DataFrame không ghi được Parquet thì bỏ qua (miss ở tầng đĩa).
+
+    Mỗi thao tác mở connection riêng nên dùng được từ nhiều thread và nhiều
+    process cùng lúc.
+    """
+
+    def __init__(self, directory: Path = SHARED_CACHE_DIR, max_bytes: int = SHARED_CACHE_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._index = self.directory / "index.sqlite"
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key          TEXT PRIMARY KEY,
+                    loader       TEXT NOT NULL,
+                    version      INTEGER NOT NULL,
+                    file         TEXT NOT NULL,
+                    nbytes       INTEGER NOT NULL,
+                    last_access  REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        # autocommit; transaction chỉ mở tường minh (evict)
+        conn = sqlite3.connect(self._index, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(loader: str, key, version: int) -> str:
+        return hashlib.sha1(repr((loader, version, key)).encode()).hexdigest()
+
+    def supports(self, value) -> bool:
+        return isinstance(value, pd.DataFrame)
+
+    def get(self, loader: str, key, version: int) -> pd.DataFrame | None:
+        k = self._key(loader, key, version)
+        with self._connect() as conn:
+            row = conn.execute("SELECT file FROM entries WHERE key = ?", (k,)).fetchone()
+            if row is None:
+                return None
+            try:
+                df = pd.read_parquet(self.directory / row[0])
+            except (FileNotFoundError, OSError, ValueError):
+                # file bị xoá / hỏng (evict từ process khác): coi như miss
+                conn.execute("DELETE FROM entries WHERE key = ?", (k,))
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), k))
+        return df
+
+    def put(self, loader: str, key, version: int, value: pd.DataFrame) -> None:
+        k = self._key(loader, key, version)
+        name = f"{k}.parquet"
+        path = self.directory / name
+        tmp = path.with_name(f"{k}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            value.to_parquet(tmp)
+            tmp.replace(path)
+        except (ValueError, TypeError, NotImplementedError):
+            # cột object lẫn kiểu... Parquet không ghi được (ArrowInvalid /
+            # ArrowTypeError / ArrowNotImplementedError): chỉ cache trong RAM
+            return
+        finally:
+            tmp.unlink(missing_ok=True)  # không để lại *.tmp khi ghi lỗi
+        nbytes = path.stat().st_size
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (k, loader, version, name, nbytes, time.time()),
+            )
+            stale = conn.execute(
+                "SELECT key, file FROM entries WHERE loader = ? AND version < ?", (loader, version)
+            ).fetchall()
+            self._delete(conn, stale)
+        self.evict()
+
+    def _delete(self, conn: sqlite3.Connection, rows) -> None:
+        for key, file in rows:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            (self.directory / file).unlink(missing_ok=True)
+
+    def evict(self) -> int:
+        """Xoá entry ít dùng nhất tới khi tổng dung lượng <= max_bytes."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+            victims = []
+            if total > self.max_bytes:
+                for key, file, nbytes in conn.execute(
+                    "SELECT key, file, nbytes FROM entries ORDER BY last_access"
+                ):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((key, file))
+                    total -= nbytes
+            self._delete(conn, victims)
+            conn.execute("COMMIT")
+        return len(victims)
+
+    def clear(self, loader: str | None = None) -> None:
+        with self._connect() as conn:
+            if loader is None:
+                rows = conn.execute("SELECT key, file FROM entries").fetchall()
+            else:
+                rows = conn.execute("SELECT key, file FROM entries WHERE loader = ?", (loader,)).fetchall()
+            self._delete(conn, rows)
+
+    def stats(self) -> pd.DataFrame:
+        """Số entry, dung lượng và các version đang có, theo loader."""
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT loader, COUNT(*), SUM(nbytes), GROUP_CONCAT(DISTINCT version)
+                FROM entries GROUP BY loader ORDER BY loader
+            """).fetchall()
+        return pd.DataFrame(rows, columns=["loader", "entries", "bytes", "versions"])
+
+
+BACKENDS = {
+    "none": NullBackend,
+    "sqlite": SQLiteParquetBackend,
+}
+
+
+def make_backend(kind: str = SHARED_CACHE_BACKEND):
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown SHARED_CACHE_BACKEND: {kind!r} (expected one of {sorted(BACKENDS)})")
+    return BACKENDS[kind]()
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """Backend dùng chung của process (tạo lúc dùng lần đầu, không phải lúc import)."""
+    return make_backend()
@@ -0,0 +1,202 @@
+# src/sketches.py
+
+import json
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .constants import SKETCH_VARIABLES, SKETCH_COMPRESSION, SEASON_MAP
+
+
+class TDigest:
+    """
+    Mergeable t-digest (merging variant) để ước lượng quantile.
+
+    Giá trị mới được đệm rồi nén theo lô: sort, tính quantile tích luỹ rồi
+    gom các điểm có cùng bucket của hàm scale k1 (arcsin) thành một centroid.
+    Số centroid ~ compression, không phụ thuộc số điểm đã thấy.
+    """
+
+    def __init__(self, compression: float = SKETCH_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer: list[np.ndarray] = []
+        self._buffered = 0
+        self._interp = None  # (xp, fp) cache cho quantile()
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.means.nbytes + self.weights.nbytes)
+
+    @property
+    def n(self) -> float:
+        return float(self.weights.sum()) + self._buffered
+
+    def update(self, values) -> "TDigest":
+        v = np.asarray(values, dtype=float).ravel()
+        v = v[~np.isnan(v)]
+        if len(v):
+            self._interp = None
+            self._buffer.append(v)
+            self._buffered += len(v)
+            self.min = min(self.min, float(v.min()))
+            self.max = max(self.max, float(v.max()))
+            if self._buffered > 10 * self.compression:
+                self._compress()
+        return self
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        other._compress()
+        self._compress()
+        self.means = np.concatenate([self.means, other.means])
+        self.weights = np.concatenate([self.weights, other.weights])
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(force=True)
+        return self
+
+    def _compress(self, force: bool = False) -> None:
+        if not self._buffer and not force:
+            return
+        means = np.concatenate([self.means] + self._buffer)
+        weights = np.concatenate([self.weights] + [np.ones(len(b)) for b in self._buffer])
+        self._buffer, self._buffered = [], 0
+        self._interp = None
+        if len(means) == 0:
+            return
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+        # k1 scale function: bucket hẹp ở hai đuôi, rộng ở giữa
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+        bucket = np.floor(k)
+        first = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+
+        w = np.add.reduceat(weights, first)
+        self.means = np.add.reduceat(means * weights, first) / w
+        self.weights = w
+
+    def quantile(self, q):
+        """Quantile (scalar hoặc array q trong [0, 1])."""
+        if self._interp is None:
+            self._compress()
+            if len(self.means) == 0:
+                return np.nan if np.ndim(q) == 0 else np.full(np.shape(q), np.nan)
+            cum = np.cumsum(self.weights)
+            xp = np.concatenate([[0.0], (cum - self.weights / 2) / cum[-1], [1.0]])
+            fp = np.concatenate([[self.min], self.means, [self.max]])
+            self._interp = (xp, fp)
+        xp, fp = self._interp
+        return np.interp(q, xp, fp)
+
+    def to_dict(self) -> dict:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "means": self.means.tolist(),
+            "weights": self.weights.tolist(),
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "TDigest":
+        td = cls(d["compression"])
+        td.means = np.asarray(d["means"], dtype=float)
+        td.weights = np.asarray(d["weights"], dtype=float)
+        td.min = d["min"]
+        td.max = d["max"]
+        return td
+
+
+# ---------- Sketch set cho daily variables ----------
+
+def _scopes(daily: pd.DataFrame) -> dict[str, np.ndarray]:
+    """scope -> mask. "all", "season:<name>" và "month:<m>"."""
+    month = pd.to_datetime(daily["date"]).dt.month.to_numpy()
+    scopes = {"all": np.ones(len(daily), dtype=bool)}
+    for season in dict.fromkeys(SEASON_MAP.values()):
+        scopes[f"season:{season}"] = np.isin(
+            month, [m for m, s in SEASON_MAP.items() if s == season]
+        )
+    for m in range(1, 13):
+        scopes[f"month:{m}"] = month == m
+    return scopes
+
+
+def update_sketches(sketches: dict, daily: pd.DataFrame) -> dict:
+    """
+    Thêm các ngày trong daily vào sketches {(variable, scope): TDigest}.
+    Chỉ nên truyền các ngày mới (xem new_days).
+    """
+    for scope, mask in _scopes(daily).items():
+        if not mask.any():
+            continue
+        for var in SKETCH_VARIABLES:
+            td = sketches.setdefault((var, scope), TDigest())
+            td.update(daily.loc[mask, var].to_numpy(dtype=float))
+    return sketches
+
+
+def new_days(daily: pd.DataFrame, last_date) -> pd.DataFrame:
+    """
+    Các ngày sau last_date, trừ ngày cuối cùng của daily: ngày đó có thể còn
+    dở (logger đang ghi, ingest sẽ cập nhật lại) nên chỉ được đưa vào sketch
+    khi đã có ngày sau nó. Một ngày đã vào t-digest thì không sửa được nữa.
+    """
+    dates = pd.to_datetime(daily["date"])
+    mask = dates < dates.max()
+    if last_date is not None:
+        mask &= dates > pd.Timestamp(last_date)
+    return daily[mask]
+
+
+def thresholds(sketches: dict, quantiles: dict[str, float], scope: str = "all") -> dict[str, float]:
+    """{variable: q} -> {variable: threshold} từ sketch của scope."""
+    return {var: float(sketches[(var, scope)].quantile(q)) for var, q in quantiles.items()}
+
+
+def seasonal_thresholds(sketches: dict, variable: str, q: float) -> dict[str, float]:
+    return {
+        scope.split(":", 1)[1]: float(td.quantile(q))
+        for (var, scope), td in sketches.items()
+        if var == variable and scope.startswith("season:")
+    }
+
+
+def load_sketches(engine: Engine, station_id: str) -> tuple[dict, object]:
+    """Đọc sketch của một trạm -> (sketches, last_date đã được đưa vào sketch)."""
+    df = pd.read_sql(
+        text("SELECT variable, scope, last_date, digest FROM weather_sketches WHERE station_id = :s;"),
+        engine, params={"s": station_id},
+    )
+    sketches = {
+        (r.variable, r.scope): TDigest.from_dict(json.loads(r.digest))
+        for r in df.itertuples(index=False)
+    }
+    last_date = df["last_date"].min() if not df.empty else None
+    return sketches, last_date
+
+
+def save_sketches(engine: Engine, sketches: dict, last_date, station_id: str) -> None:
+    rows = pd.DataFrame([
+        {
+            "station_id": station_id,
+            "variable": var,
+            "scope": scope,
+            "n": int(td.n),
+            "last_date": last_date,
+            "digest": json.dumps(td.to_dict()),
+        }
+        for (var, scope), td in sketches.items()
+    ])
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM weather_sketches WHERE station_id = :s;"), {"s": station_id})
+        rows.to_sql("weather_sketches", conn, if_exists="append", index=False)
@@ -0,0 +1,33 @@
+# src/station_picker.py
+
+import streamlit as st
+
+from .constants import DEFAULT_STATION
+from .loaders import load_stations
+from .warmup import start_warmup
+
+_WIDGET_KEY = "station_select"
+
+
+def select_station() -> tuple[str, str]:
+    """
+    Selectbox chọn trạm trong sidebar -> (station_id, tên hiển thị).
+
+    Trạm đã chọn được giữ trong st.session_state["station_id"] nên khi chuyển
+    trang vẫn là trạm đó (state của widget bị xoá khi trang không còn vẽ nó).
+    Mọi trang đều gọi hàm này nên warm-up cache nền cũng được start ở đây.
+    """
+    start_warmup()
+    stations = load_stations()
+    if stations.empty:
+        st.warning("No stations loaded. Run `python db/etl_load_raw.py` first.")
+        st.stop()
+    names = dict(zip(stations["station_id"], stations["name"]))
+
+    if st.session_state.get(_WIDGET_KEY) not in names:
+        current = st.session_state.get("station_id", DEFAULT_STATION)
+        st.session_state[_WIDGET_KEY] = current if current in names else next(iter(names))
+
+    station_id = st.sidebar.selectbox("Station", list(names), format_func=names.get, key=_WIDGET_KEY)
+    st.session_state["station_id"] = station_id
+    return station_id, names[station_id]
@@ -0,0 +1,62 @@
+# src/stations.py
+
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .constants import ETL_MAX_WORKERS, RAW_DIR, STATION_CSV_MARKER, STATION_NAMES
+from .db_utils import backend_name, get_engine
+
+
+def station_id_for(path) -> str:
+    """
+    Bradford_Weather_Data.csv -> 'bradford', West_Leeds_Weather_Data.csv -> 'west_leeds',
+    Bradford_Weather_Data_20240101T1030.csv (bản export của logger) -> 'bradford'.
+    """
+    stem = Path(path).name.split(STATION_CSV_MARKER)[0]
+    return re.sub(r"[^a-z0-9]+", "_", stem.lower()).strip("_")
+
+
+def station_files(raw_dir: Path = RAW_DIR) -> dict[str, list[Path]]:
+    """station_id -> các file CSV của trạm trong raw_dir (theo tên, file gốc trước)."""
+    files: dict[str, list[Path]] = {}
+    for p in sorted(Path(raw_dir).glob(f"*{STATION_CSV_MARKER}*.csv")):
+        files.setdefault(station_id_for(p), []).append(p)
+    return files
+
+
+def station_name(station_id: str) -> str:
+    return STATION_NAMES.get(station_id, station_id.replace("_", " ").title())
+
+
+def list_stations(engine: Engine) -> list[str]:
+    """Các trạm đã được etl_load_raw ghi vào weather_stations."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT station_id FROM weather_stations ORDER BY station_id"))
+        return [r[0] for r in rows]
+
+
+def map_stations(func, station_ids: list[str], *args, max_workers: int = ETL_MAX_WORKERS):
+    """
+    Chạy func(station_id, *args) cho mỗi trạm trên một process pool, yield
+    (station_id, kết quả) theo thứ tự trạm nào xong trước.
+
+    Worker chỉ đọc DB và tính toán; process gọi (một writer duy nhất) ghi kết
+    quả trong lúc các trạm khác còn đang chạy. func phải là hàm top-level để
+    pickle được (spawn, giống SweepRunner). DuckDB khoá file theo process nên
+    trên DuckDB, và khi chỉ có một trạm, các trạm chạy tuần tự trong process này.
+    """
+    workers = min(max_workers, len(station_ids))
+    if workers <= 1 or backend_name(get_engine()) == "duckdb":
+        for sid in station_ids:
+            yield sid, func(sid, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(func, sid, *args): sid for sid in station_ids}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
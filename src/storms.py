@@ -0,0 +1,182 @@
+# src/storms.py
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from .constants import (
+    STORM_RAIN_RATE, STORM_GUST_SPEED, STORM_PRESSURE_DROP,
+    STORM_TENDENCY_HOURS, STORM_MERGE_GAP_MINUTES,
+)
+
+STORM_COLUMNS = [
+    "start_ts", "end_ts", "duration_min", "n_obs",
+    "peak_rain_rate", "peak_rain_ts", "total_rain",
+    "peak_gust", "peak_gust_ts",
+    "max_pressure_drop", "triggers",
+]
+
+
+def _peak_per_group(gid: np.ndarray, first: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Index (trong mảng đã group) của giá trị lớn nhất mỗi nhóm; NaN bị bỏ qua."""
+    key = np.where(np.isnan(values), np.inf, -values)
+    return np.lexsort((key, gid))[first]
+
+
+def _merge(a: dict, b: dict) -> dict:
+    """Gộp hai phần của cùng một storm (vd. hai bên ranh giới chunk)."""
+    out = dict(a)
+    out["start_ts"] = min(a["start_ts"], b["start_ts"])
+    out["end_ts"] = max(a["end_ts"], b["end_ts"])
+    out["n_obs"] = a["n_obs"] + b["n_obs"]
+    out["total_rain"] = a["total_rain"] + b["total_rain"]
+    for peak, at in (("peak_rain_rate", "peak_rain_ts"), ("peak_gust", "peak_gust_ts")):
+        if np.isnan(a[peak]) or b[peak] > a[peak]:
+            out[peak], out[at] = b[peak], b[at]
+    out["max_pressure_drop"] = np.fmax(a["max_pressure_drop"], b["max_pressure_drop"])
+    for flag in ("rain_hit", "gust_hit", "pressure_hit"):
+        out[flag] = a[flag] or b[flag]
+    return out
+
+
+class StormDetector:
+    """
+    Streaming detector chạy qua weather_raw theo từng chunk (đã sort theo timestamp).
+
+    Một quan sát "active" khi rain_rate, hi_speed (gust) hoặc pressure tendency
+    vượt ngưỡng; các quan sát active cách nhau <= merge gap tạo thành một storm.
+    Trạng thái (đuôi áp suất cho tendency và storm đang mở) được giữ qua các
+    chunk nên kết quả không phụ thuộc vào cách chia chunk.
+    """
+
+    def __init__(self,
+                 rain_rate: float = STORM_RAIN_RATE,
+                 gust_speed: float = STORM_GUST_SPEED,
+                 pressure_drop: float = STORM_PRESSURE_DROP,
+                 tendency_hours: float = STORM_TENDENCY_HOURS,
+                 merge_gap_minutes: float = STORM_MERGE_GAP_MINUTES):
+        self.rain_rate = rain_rate
+        self.gust_speed = gust_speed
+        self.pressure_drop = pressure_drop
+        self.window = np.timedelta64(int(tendency_hours * 3600), "s")
+        self.gap = np.timedelta64(int(merge_gap_minutes * 60), "s")
+
+        self._tail_ts = np.array([], dtype="datetime64[ns]")
+        self._tail_bar = np.array([], dtype=float)
+        self._open: dict | None = None
+        self.rows = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else float("nan")
+
+    def _pressure_tendency(self, ts: np.ndarray, bar: np.ndarray) -> np.ndarray:
+        """bar(t) - bar(quan sát đầu tiên >= t - window), dùng cả đuôi chunk trước."""
+        n_tail = len(self._tail_ts)
+        all_ts = np.concatenate([self._tail_ts, ts])
+        all_bar = np.concatenate([self._tail_bar, bar])
+        j = np.searchsorted(all_ts, all_ts - self.window, side="left")
+        tendency = (all_bar - all_bar[j])[n_tail:]
+
+        keep = all_ts > all_ts[-1] - self.window
+        self._tail_ts = all_ts[keep]
+        self._tail_bar = all_bar[keep]
+        return tendency
+
+    def feed(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Xử lý một chunk; trả về các storm đã kết thúc chắc chắn."""
+        t0 = time.perf_counter()
+        chunk = chunk.sort_values("timestamp")
+        ts = chunk["timestamp"].to_numpy(dtype="datetime64[ns]")
+        if len(ts) == 0:
+            return pd.DataFrame(columns=STORM_COLUMNS)
+        rain_rate = chunk["rain_rate"].to_numpy(dtype=float)
+        gust = chunk["hi_speed"].to_numpy(dtype=float)
+        rain = np.nan_to_num(chunk["rain"].to_numpy(dtype=float))
+        drop = -self._pressure_tendency(ts, chunk["bar"].to_numpy(dtype=float))
+
+        rain_hit = rain_rate >= self.rain_rate
+        gust_hit = gust >= self.gust_speed
+        pressure_hit = drop >= self.pressure_drop
+        act = np.flatnonzero(rain_hit | gust_hit | pressure_hit)
+
+        closed = []
+        if len(act):
+            a_ts = ts[act]
+            starts = np.r_[True, np.diff(a_ts) > self.gap]
+            # quan sát active đầu tiên nối tiếp storm đang mở từ chunk trước
+            continues = self._open is not None and a_ts[0] - self._open["end_ts"] <= self.gap
+            if continues:
+                starts[0] = False
+            gid = np.cumsum(starts)  # gid 0 = phần nối tiếp storm đang mở
+            first = np.flatnonzero(np.r_[True, gid[1:] != gid[:-1]])
+            last = np.r_[first[1:], len(gid)] - 1
+
+            a_rain_rate, a_gust, a_drop = rain_rate[act], gust[act], drop[act]
+            rp = _peak_per_group(gid, first, a_rain_rate)
+            gp = _peak_per_group(gid, first, a_gust)
+            agg = {
+                "start_ts": a_ts[first],
+                "end_ts": a_ts[last],
+                "n_obs": last - first + 1,
+                "total_rain": np.add.reduceat(rain[act], first),
+                "peak_rain_rate": a_rain_rate[rp],
+                "peak_rain_ts": a_ts[rp],
+                "peak_gust": a_gust[gp],
+                "peak_gust_ts": a_ts[gp],
+                "max_pressure_drop": np.fmax.reduceat(a_drop, first),
+                "rain_hit": np.logical_or.reduceat(rain_hit[act], first),
+                "gust_hit": np.logical_or.reduceat(gust_hit[act], first),
+                "pressure_hit": np.logical_or.reduceat(pressure_hit[act], first),
+            }
+            parts = [dict(zip(agg, vals)) for vals in zip(*agg.values())]
+
+            if continues:
+                self._open = _merge(self._open, parts.pop(0))
+            if parts:
+                if self._open is not None:
+                    closed.append(self._open)
+                closed.extend(parts[:-1])
+                self._open = parts[-1]
+
+        # không còn quan sát active nào có thể nối vào storm đang mở
+        if self._open is not None and ts[-1] - self._open["end_ts"] > self.gap:
+            closed.append(self._open)
+            self._open = None
+
+        self.rows += len(ts)
+        self.seconds += time.perf_counter() - t0
+        return self._to_frame(closed)
+
+    def close(self) -> pd.DataFrame:
+        """Kết thúc stream: trả về storm còn đang mở (nếu có)."""
+        closed = [self._open] if self._open is not None else []
+        self._open = None
+        return self._to_frame(closed)
+
+    @staticmethod
+    def _to_frame(parts: list[dict]) -> pd.DataFrame:
+        if not parts:
+            return pd.DataFrame(columns=STORM_COLUMNS)
+        df = pd.DataFrame(parts)
+        df["duration_min"] = (
+            (df["end_ts"] - df["start_ts"]) / pd.Timedelta(minutes=1)
+        ).astype(int)
+        df["triggers"] = [
+            "+".join(name for name, hit in (("rain", r), ("gust", g), ("pressure", p)) if hit)
+            for r, g, p in zip(df["rain_hit"], df["gust_hit"], df["pressure_hit"])
+        ]
+        return df[STORM_COLUMNS]
+
+
+def detect_storms(chunks, detector: StormDetector | None = None) -> pd.DataFrame:
+    """Chạy detector qua một iterable các chunk, gom tất cả storm."""
+    detector = detector or StormDetector()
+    frames = [detector.feed(c) for c in chunks]
+    frames.append(detector.close())
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=STORM_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,178 @@
+# src/sweeps.py
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .constants import SWEEP_DIR, SWEEP_CACHE_BYTES, SWEEP_MAX_WORKERS
+
+METHODS = ("tsne", "umap")
+
+
+def sweep_key(X: np.ndarray, method: str, params: dict) -> str:
+    """Content hash của (ma trận features, method, params) -> tên file cache."""
+    h = hashlib.sha1()
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    h.update(str(X.shape).encode())
+    h.update(X.tobytes())
+    h.update(json.dumps({"method": method, "params": params}, sort_keys=True).encode())
+    return h.hexdigest()[:20]
+
+
+def _fit(method: str, X: np.ndarray, params: dict) -> np.ndarray:
+    """Chạy trong worker process (import nặng chỉ xảy ra ở đó)."""
+    from .dim_reduction import run_tsne, run_umap
+
+    runner = run_tsne if method == "tsne" else run_umap
+    _, coords = runner(X, n_components=2, **params)
+    return np.asarray(coords, dtype=np.float32)
+
+
+class DiskResultCache:
+    """
+    Kết quả embedding dạng <key>.npy trong một thư mục, giới hạn tổng dung
+    lượng. mtime của file được dùng làm thời điểm truy cập gần nhất (LRU):
+    đọc thì touch, ghi vượt giới hạn thì xoá file cũ nhất.
+    """
+
+    def __init__(self, directory=SWEEP_DIR, max_bytes: int = SWEEP_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str):
+        return self.directory / f"{key}.npy"
+
+    def get(self, key: str) -> np.ndarray | None:
+        path = self._path(key)
+        try:
+            coords = np.load(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)
+        return coords
+
+    def contains(self, key: str) -> bool:
+        """Chỉ stat file: không đọc kết quả và không touch mtime (thứ tự LRU giữ nguyên)."""
+        return self._path(key).exists()
+
+    def put(self, key: str, coords: np.ndarray) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, coords)
+        tmp.replace(path)  # atomic: reader không bao giờ thấy file ghi dở
+        self.evict()
+
+    def evict(self) -> int:
+        """Xoá file ít dùng nhất tới khi tổng dung lượng <= max_bytes."""
+        files = []
+        for p in self.directory.glob("*.npy"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, p in sorted(files, key=lambda f: f[0]):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        sizes = [p.stat().st_size for p in self.directory.glob("*.npy")] if self.directory.exists() else []
+        return {"files": len(sizes), "bytes": int(sum(sizes)), "max_bytes": self.max_bytes}
+
+
+class SweepRunner:
+    """
+    Chạy các fit t-SNE/UMAP với tham số tuỳ chọn trên một process pool nền.
+
+    request() không bao giờ chờ fit: trả về kết quả nếu đã có trong cache
+    đĩa, ngược lại submit job (một lần cho mỗi key) và trả về None. Trang
+    poll status() để hiển thị tiến độ. Job lỗi không được submit lại tự động.
+    """
+
+    def __init__(self, cache: DiskResultCache | None = None, max_workers: int = SWEEP_MAX_WORKERS):
+        self.cache = cache or DiskResultCache()
+        self.max_workers = max_workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._jobs: dict[str, dict] = {}
+        self._lock = threading.RLock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: không fork server Streamlit đa luồng
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def request(self, X: np.ndarray, method: str, params: dict) -> tuple[str, np.ndarray | None]:
+        """(key, coords) — coords là None khi job còn đang chạy / vừa được submit."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown embedding method: {method}")
+        key = sweep_key(X, method, params)
+        coords = self.cache.get(key)
+        if coords is not None:
+            return key, coords
+
+        with self._lock:
+            job = self._jobs.get(key)
+            # "done" mà không còn trong cache -> file đã bị evict, fit lại
+            if job is None or job["state"] == "done":
+                fut = self._executor().submit(_fit, method, np.asarray(X), params)
+                job = {
+                    "key": key, "method": method, "params": params,
+                    "state": "running", "submitted": time.time(),
+                    "finished": None, "error": None, "future": fut,
+                }
+                self._jobs[key] = job
+                fut.add_done_callback(lambda f, job=job: self._done(job, f))
+        return key, None
+
+    def _done(self, job: dict, fut: Future) -> None:
+        try:
+            self.cache.put(job["key"], fut.result())
+            state, error = "done", None
+        except Exception as exc:  # lỗi fit được báo lên trang qua status()
+            state, error = "failed", repr(exc)
+        with self._lock:
+            job.update(state=state, error=error, finished=time.time())
+
+    def job(self, key: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(key)
+            return None if job is None else {k: v for k, v in job.items() if k != "future"}
+
+    def status(self) -> pd.DataFrame:
+        """Một dòng cho mỗi job: method, params, state, seconds."""
+        now = time.time()
+        with self._lock:
+            rows = [
+                {
+                    "method": j["method"],
+                    "params": json.dumps(j["params"], sort_keys=True),
+                    "state": j["state"],
+                    "seconds": (j["finished"] or now) - j["submitted"],
+                    "error": j["error"],
+                }
+                for j in self._jobs.values()
+            ]
+        return pd.DataFrame(rows, columns=["method", "params", "state", "seconds", "error"])
+
+
+# runner dùng chung cho mọi session trong process (giống pool của page_loader)
+RUNNER = SweepRunner()
@@ -0,0 +1,190 @@
+# src/trends.py
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .constants import (
+    TREND_VARIABLES, TREND_WINDOWS, TREND_MIN_FRACTION,
+    LOESS_BINS, LOESS_FRAC,
+)
+
+TREND_COLUMNS = [
+    "date", "variable", "window_days",
+    "roll_mean", "roll_sum", "roll_max", "roll_min",
+]
+
+
+def to_calendar(daily: pd.DataFrame, variables: list[str]) -> pd.DataFrame:
+    """Reindex về lịch ngày liên tục để cửa sổ N dòng = N ngày (ngày thiếu = NaN)."""
+    d = daily.assign(date=pd.to_datetime(daily["date"])).set_index("date")[variables]
+    full = pd.date_range(d.index.min(), d.index.max(), freq="D", name="date")
+    return d.reindex(full)
+
+
+def rolling_sum_mean(values: np.ndarray, window: int, min_periods: int):
+    """
+    Rolling sum / mean O(n) bằng cumulative sum của giá trị và số ngày hợp lệ.
+    Vị trí có ít hơn min_periods giá trị hợp lệ cho NaN.
+    """
+    valid = ~np.isnan(values)
+    csum = np.r_[0.0, np.cumsum(np.where(valid, values, 0.0))]
+    ccnt = np.r_[0, np.cumsum(valid)]
+    hi = np.arange(1, len(values) + 1)
+    lo = np.maximum(hi - window, 0)
+    s = csum[hi] - csum[lo]
+    n = ccnt[hi] - ccnt[lo]
+    ok = n >= min_periods
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(ok, s, np.nan), np.where(ok, s / n, np.nan)
+
+
+class RollingExtreme:
+    """
+    Rolling max (hoặc min) bằng monotonic deque: mỗi giá trị được push/pop
+    tối đa một lần nên cả chuỗi là O(n). Có thể push tiếp khi có dữ liệu mới.
+    """
+
+    def __init__(self, window: int, how: str = "max"):
+        self.window = window
+        self.sign = 1.0 if how == "max" else -1.0
+        self._q: deque = deque()  # (index, sign * value), giảm dần
+        self._i = 0
+
+    def push(self, value: float) -> float:
+        i, v = self._i, self.sign * value
+        self._i += 1
+        if v == v:  # bỏ qua NaN
+            while self._q and self._q[-1][1] <= v:
+                self._q.pop()
+            self._q.append((i, v))
+        while self._q and self._q[0][0] <= i - self.window:
+            self._q.popleft()
+        return self.sign * self._q[0][1] if self._q else np.nan
+
+    def run(self, values: np.ndarray) -> np.ndarray:
+        return np.fromiter((self.push(v) for v in values), dtype=float, count=len(values))
+
+
+def compute_trends(daily: pd.DataFrame,
+                   variables: list[str] | None = None,
+                   windows=TREND_WINDOWS,
+                   since=None) -> pd.DataFrame:
+    """
+    Rolling mean/sum/max/min cho mọi (variable, window). Nếu có since thì chỉ
+    trả về các ngày > since; daily chỉ cần chứa thêm max(windows) - 1 ngày
+    trước since làm context (xem context_start).
+    """
+    variables = variables or TREND_VARIABLES
+    cal = to_calendar(daily, variables)
+    keep = np.ones(len(cal), dtype=bool) if since is None else cal.index > pd.Timestamp(since)
+    dates = cal.index[keep]
+
+    frames = []
+    for var in variables:
+        values = cal[var].to_numpy(dtype=float)
+        for w in windows:
+            min_periods = max(1, int(np.ceil(w * TREND_MIN_FRACTION)))
+            roll_sum, roll_mean = rolling_sum_mean(values, w, min_periods)
+            roll_max = RollingExtreme(w, "max").run(values)
+            roll_min = RollingExtreme(w, "min").run(values)
+            # extremes cũng theo min_periods như mean
+            enough = ~np.isnan(roll_mean)
+            frames.append(pd.DataFrame({
+                "date": dates,
+                "variable": var,
+                "window_days": w,
+                "roll_mean": roll_mean[keep],
+                "roll_sum": roll_sum[keep],
+                "roll_max": np.where(enough, roll_max, np.nan)[keep],
+                "roll_min": np.where(enough, roll_min, np.nan)[keep],
+            }))
+    if not frames:
+        return pd.DataFrame(columns=TREND_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[TREND_COLUMNS]
+
+
+def context_start(since, windows=TREND_WINDOWS) -> pd.Timestamp:
+    """Ngày đầu tiên cần đọc lại để update incremental các ngày > since."""
+    return pd.Timestamp(since) - pd.Timedelta(days=max(windows) - 1)
+
+
+def first_changed_date(old: pd.DataFrame, new: pd.DataFrame,
+                       variables: list[str] | None = None):
+    """
+    Ngày sớm nhất mà hai bản weather_daily của một trạm khác nhau (ngày thêm /
+    mất, hoặc giá trị một biến trend đổi); None nếu giống nhau. Trend của mọi
+    ngày từ đó trở đi phụ thuộc vào ngày đã đổi.
+    """
+    variables = variables or TREND_VARIABLES
+    a = old.assign(date=pd.to_datetime(old["date"])).set_index("date")[variables]
+    b = new.assign(date=pd.to_datetime(new["date"])).set_index("date")[variables]
+    a, b = a.align(b, join="outer")
+    # REAL trên Postgres là float4 -> so sánh có tolerance
+    same = np.isclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float),
+                      rtol=1e-5, equal_nan=True).all(axis=1)
+    changed = a.index[~same]
+    return changed.min() if len(changed) else None
+
+
+def invalidate_trends(conn: Connection, station_id: str, since) -> None:
+    """Xoá weather_trends của trạm từ ngày since, etl_build_trends tính lại từ đó."""
+    conn.execute(text("DELETE FROM weather_trends WHERE station_id = :s AND date >= :d;"),
+                 {"s": station_id, "d": pd.Timestamp(since).date()})
+
+
+def binned_loess(dates, values, frac: float = LOESS_FRAC, bins: int = LOESS_BINS) -> pd.DataFrame:
+    """
+    LOESS (local linear, tricube) trên dữ liệu đã gom bin theo thời gian.
+
+    Chi phí O(bins^2) thay vì O(n^2) nên vẫn nhanh với hàng chục năm dữ liệu
+    ngày. Trả về DataFrame (date, loess, n) tại tâm các bin có dữ liệu.
+    """
+    t = pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]").astype(float)
+    y = np.asarray(values, dtype=float)
+    ok = ~np.isnan(y)
+    t, y = t[ok], y[ok]
+    if len(t) < 2:
+        return pd.DataFrame(columns=["date", "loess", "n"])
+
+    edges = np.linspace(t.min(), t.max(), bins + 1)
+    n, _ = np.histogram(t, edges)
+    sy, _ = np.histogram(t, edges, weights=y)
+    st, _ = np.histogram(t, edges, weights=t)
+    has = n > 0
+    n, x, ybar = n[has], st[has] / n[has], sy[has] / n[has]
+
+    # trọng số tricube (bins x bins) nhân số điểm mỗi bin
+    h = max(frac * (t.max() - t.min()), 1.0)
+    d = np.abs(x[:, None] - x[None, :]) / h
+    w = np.where(d < 1, (1 - d ** 3) ** 3, 0.0) * n[None, :]
+
+    # weighted local linear regression tại mỗi tâm bin
+    sw = w.sum(axis=1)
+    mx = (w * x).sum(axis=1) / sw
+    my = (w * ybar).sum(axis=1) / sw
+    dx = x[None, :] - mx[:, None]
+    sxx = (w * dx ** 2).sum(axis=1)
+    sxy = (w * dx * (ybar[None, :] - my[:, None])).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+    fit = my + slope * (x - mx)
+
+    return pd.DataFrame({
+        "date": x.astype("datetime64[D]"),
+        "loess": fit,
+        "n": n,
+    })
+
+
+def build_loess(daily: pd.DataFrame, variables: list[str] | None = None) -> pd.DataFrame:
+    """binned_loess cho mọi variable -> long format (variable, date, loess, n)."""
+    variables = variables or TREND_VARIABLES
+    frames = [
+        binned_loess(daily["date"], daily[var]).assign(variable=var)
+        for var in variables
+    ]
+    return pd.concat(frames, ignore_index=True)[["variable", "date", "loess", "n"]]
@@ -0,0 +1,142 @@
+# src/warmup.py
+
+import threading
+import time
+
+import pandas as pd
+
+from .constants import DATASET_VERSION_TTL_S, DEFAULT_STATION, WARMUP_BUDGET_S
+from .db_utils import current_dataset_version, station_dataset_version
+from .loaders import load_daily, load_embeddings, load_hourly_for_day, load_stations
+from .raw_blocks import load_raw_range
+
+
+def _default_station():
+    """Trạm mà dashboard mở mặc định (xem src/station_picker.py)."""
+    ids = load_stations()["station_id"].tolist()
+    return DEFAULT_STATION if DEFAULT_STATION in ids or not ids else ids[0]
+
+
+def _latest_day():
+    d = load_daily(_default_station())
+    return d["date"].max().date() if not d.empty else None
+
+
+def _steps() -> list[tuple[str, callable]]:
+    """(tên, hàm) theo thứ tự ưu tiên: dataset dùng chung trước, raw window sau."""
+
+    def latest_day_hourly():
+        day = _latest_day()
+        if day is not None:
+            load_hourly_for_day(_default_station(), day)
+
+    def latest_month_raw():
+        day = _latest_day()
+        if day is not None:
+            load_raw_range(_default_station(), day.replace(day=1), day)
+
+    return [
+        ("weather_stations", load_stations),
+        ("weather_daily", lambda: load_daily(_default_station())),
+        ("weather_serving (embeddings)", lambda: load_embeddings(_default_station())),
+        ("hourly profile of latest day", latest_day_hourly),
+        ("raw blocks of latest month", latest_month_raw),
+    ]
+
+
+class Warmup:
+    """
+    Nạp trước các dataset dùng chung vào cache của dashboard trong một thread
+    nền (một thread mỗi process). Bước nào bắt đầu khi đã hết budget thì bị
+    bỏ qua.
+
+    Sau mỗi lượt, thread kiểm tra dataset version mỗi poll_s giây: ETL ghi
+    dữ liệu mới (BoundedCache bị xoá) hoặc micro-batch ingest của trạm mặc
+    định (entry của trạm đó miss) thì warm-up chạy lại cho version mới trước
+    khi người xem kế tiếp mở trang.
+    """
+
+    def __init__(self, budget_s: float = WARMUP_BUDGET_S, poll_s: float = DATASET_VERSION_TTL_S):
+        self.budget_s = budget_s
+        self.poll_s = poll_s
+        self.state = "idle"          # idle / running / done / over_budget
+        self.version: tuple | None = None   # (version chung, version trạm mặc định) của lượt gần nhất
+        self.started: float | None = None
+        self.finished: float | None = None
+        self._results: list[dict] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "Warmup":
+        """Idempotent: gọi từ mọi trang, chỉ lần đầu tạo thread."""
+        with self._lock:
+            if self._thread is None:
+                self.state = "running"
+                self.started = time.perf_counter()
+                self._thread = threading.Thread(target=self._loop, name="cache-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                version = (current_dataset_version(), station_dataset_version(_default_station()))
+                if version != self.version:
+                    self.version = version
+                    self._run()
+            except Exception:  # thread phải sống tiếp để bắt version sau
+                pass
+            time.sleep(self.poll_s)
+
+    def _run(self) -> None:
+        with self._lock:
+            self.state = "running"
+            self.started = time.perf_counter()
+            self.finished = None
+            self._results = []
+        over = False
+        for name, func in _steps():
+            elapsed = time.perf_counter() - self.started
+            if elapsed > self.budget_s:
+                over = True
+                self._record(name, "skipped", 0.0, "time budget exceeded")
+                continue
+            t0 = time.perf_counter()
+            try:
+                func()
+                self._record(name, "done", time.perf_counter() - t0)
+            except Exception as exc:  # warm-up không được làm hỏng app; trang sẽ tự load
+                self._record(name, "failed", time.perf_counter() - t0, repr(exc))
+        self.finished = time.perf_counter()
+        self.state = "over_budget" if over else "done"
+
+    def _record(self, step: str, status: str, seconds: float, note: str = "") -> None:
+        with self._lock:
+            self._results.append({"step": step, "status": status, "seconds": seconds, "note": note})
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def progress(self) -> float:
+        with self._lock:
+            return len(self._results) / len(_steps())
+
+    def results(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.DataFrame(self._results, columns=["step", "status", "seconds", "note"])
+
+
+# một warm-up cho cả process (mọi session dùng chung cache), được start từ
+# select_station() nên trang nào mở trước cũng kích hoạt
+WARMUP = Warmup()
+
+
+def start_warmup() -> Warmup:
+    return WARMUP.start()
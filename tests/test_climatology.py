@@ -0,0 +1,27 @@
+# tests/test_climatology.py
+
+import numpy as np
+import pandas as pd
+
+from src.climatology import daily_climatology, doy_index
+
+
+def test_doy_index_leap_day_shares_feb28_slot():
+    doy = doy_index(["2020-02-28", "2020-02-29", "2020-03-01", "2021-03-01"])
+    assert doy.tolist() == [58, 58, 59, 59]
+
+
+def test_leap_year_feb28_is_averaged_with_feb29():
+    dates = pd.date_range("2020-01-01", "2020-12-31", freq="D")
+    daily = pd.DataFrame({"date": dates, "mean_temp": 0.0})
+    daily.loc[daily["date"] == "2020-02-28", "mean_temp"] = 10.0
+    daily.loc[daily["date"] == "2020-02-29", "mean_temp"] = 20.0
+
+    clim = daily_climatology(daily, features=["mean_temp"], half_window=1)
+    mean = clim.set_index("doy")["mean"]
+
+    # slot 28/2 = (10 + 20) / 2, cửa sổ ±1 ngày quanh nó: (0 + 15 + 0) / 3
+    # (nếu 29/2 ghi đè 28/2 thì là 20 / 3)
+    assert np.isclose(mean[59], 5.0)
+    assert np.isclose(mean[58], 5.0)
+    assert np.isclose(mean[61], 0.0)